@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Решатель абсолютных курсов валют проекта AbsCur3.
+
+Абсолютный курс валюты c на дату t - логарифм x[t, c], такой что для каждой
+наблюдаемой пары BASE/QUOTE log(close) ~ x[t, BASE] - x[t, QUOTE].
+На каждую дату решается взвешенная задача наименьших квадратов
+    min  sum_k w_k (x_b - x_q - y_k)^2 + ridge * |x|^2,
+где наблюдения k приходят из всех источников сразу (Twelve Data, ECB, ...)
+как дополнительные ребра одного графа. Нормальные уравнения - взвешенный
+лапласиан графа (C x C); он собирается через np.bincount по всем наблюдениям
+блока дат и решается пакетно np.linalg.solve. Стоимость сборки зависит только
+от числа наблюдений, а не от числа источников.
+
+Малый ridge дает решение минимальной нормы: внутри каждой связной компоненты
+сумма x равна нулю (нормировка на геометрическое среднее). Валюты без
+наблюдений в дату получают NaN.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/absolute_rates.py
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, STORE_DIR, DATE_COLUMN, days_to_dates
+from storage.aggregates import update_matrix_aggregates
+from storage.derived import update_matrix_derived
+from storage.snapshots import atomic_write, atomic_write_json
+from analysis.pair_universe import PairUniverse
+from analysis.panel import Panel, build_panel
+from analysis.data_quality import QUALITY_DIR, load_quality_layer, quality_mask
+from config.sources import ALL_SOURCES, observation_weight
+
+ABSOLUTE_DIR = os.path.join(STORE_DIR, 'absolute')
+ABSOLUTE_SOURCE = 'absolute'   # имя рядов абсолютных курсов в хранилище агрегатов
+DEFAULT_RIDGE = 1e-8
+CHUNK_DAYS = 512
+HUBER_K = 0.01          # порог невязки (в логарифмах, ~1%) для робастного варианта
+HUBER_ITERATIONS = 3
+
+
+class Observations(NamedTuple):
+    """Плоский список наблюдений log(BASE/QUOTE) по всем источникам."""
+    day_idx: np.ndarray    # int32 (M,), индекс даты в календаре
+    base_idx: np.ndarray   # int32 (M,)
+    quote_idx: np.ndarray  # int32 (M,)
+    log_rate: np.ndarray   # float64 (M,)
+    weight: np.ndarray     # float64 (M,)
+
+    @classmethod
+    def empty(cls) -> 'Observations':
+        i32 = np.empty(0, dtype=np.int32)
+        f64 = np.empty(0, dtype=np.float64)
+        return cls(i32, i32, i32, f64, f64)
+
+    @classmethod
+    def concat(cls, parts: List['Observations']) -> 'Observations':
+        parts = [p for p in parts if len(p.day_idx)] or [cls.empty()]
+        return cls(*(np.concatenate(field) for field in zip(*parts)))
+
+    def sorted_by_day(self) -> 'Observations':
+        order = np.argsort(self.day_idx, kind='stable')
+        return Observations(*(field[order] for field in self))
+
+
+class AbsoluteRates(NamedTuple):
+    days: np.ndarray        # int32 (T,)
+    currencies: List[str]   # C валют
+    log_rates: np.ndarray   # float64 (T, C), NaN - валюта не наблюдалась
+
+
+def panel_observations(panel: Panel, universe: PairUniverse, source: str,
+                       weight_fn: Callable[[str, str], float] = observation_weight,
+                       mask: Optional[np.ndarray] = None) -> Observations:
+    """
+    Превращает панель источника в наблюдения; пары с нулевым весом пропускаются.
+    mask (T x N) - маска пригодных ячеек, например из слоя качества.
+    """
+    pair_base = universe.currency_ids(s.split('/')[0] for s in panel.symbols)
+    pair_quote = universe.currency_ids(s.split('/')[1] for s in panel.symbols)
+    pair_weight = np.array([weight_fn(source, s) for s in panel.symbols], dtype=np.float64)
+
+    usable = (pair_base >= 0) & (pair_quote >= 0) & (pair_weight > 0)
+    valid = np.isfinite(panel.values) & (panel.values > 0) & usable[np.newaxis, :]
+    if mask is not None:
+        valid &= mask
+    rows, cols = np.nonzero(valid)
+    return Observations(
+        rows.astype(np.int32),
+        pair_base[cols],
+        pair_quote[cols],
+        np.log(panel.values[rows, cols]),
+        pair_weight[cols],
+    )
+
+
+def build_universe(store: PairStore, sources: List[str]) -> PairUniverse:
+    """Вселенная из config/currencies.py плюс валюты, которые есть только у других источников."""
+    extra = set()
+    for source in sources:
+        for symbol in store.symbols(source):
+            extra.update(symbol.split('/'))
+    return PairUniverse.from_config(extra_currencies=extra)
+
+
+def collect_observations(store: PairStore, universe: PairUniverse, sources: List[str],
+                         days: Optional[np.ndarray] = None,
+                         weight_fn: Callable[[str, str], float] = observation_weight,
+                         quality_dir: Optional[str] = QUALITY_DIR):
+    """
+    Собирает наблюдения всех источников на общем календаре.
+    Если для источника есть слой качества (analysis/data_quality.py), помеченные
+    ячейки исключаются; quality_dir=None отключает фильтр.
+    Возвращает (календарь int32-дат, Observations).
+    """
+    symbols = {source: store.symbols(source) for source in sources}
+    if days is None:
+        all_days = [store.read_series(source, symbol, [])[DATE_COLUMN]
+                    for source in sources for symbol in symbols[source]]
+        days = np.unique(np.concatenate(all_days)) if all_days else np.empty(0, dtype=np.int32)
+    days = np.asarray(days, dtype=np.int32)
+
+    parts = []
+    for source in sources:
+        if not symbols[source]:
+            continue
+        panel = build_panel(store, source, symbols[source], days=days)
+        mask = None
+        if quality_dir and os.path.exists(os.path.join(quality_dir, source, 'flags.npy')):
+            mask = quality_mask(load_quality_layer(source, quality_dir), days, panel.symbols)
+        parts.append(panel_observations(panel, universe, source, weight_fn, mask))
+    return days, Observations.concat(parts)
+
+
+def solve_day_block(obs: Observations, day_start: int, n_days: int, n_currencies: int,
+                    ridge: float = DEFAULT_RIDGE) -> np.ndarray:
+    """
+    Решает блок дат [day_start, day_start + n_days) по наблюдениям этого блока.
+    Возвращает (n_days, C) логарифмов абсолютных курсов.
+    """
+    C = n_currencies
+    d = obs.day_idx.astype(np.int64) - day_start
+    b = obs.base_idx.astype(np.int64)
+    q = obs.quote_idx.astype(np.int64)
+    w = obs.weight
+    wy = w * obs.log_rate
+
+    # Взвешенный лапласиан: +w на (b,b) и (q,q), -w на (b,q) и (q,b)
+    flat = d * C * C
+    index = np.concatenate([flat + b * C + b, flat + q * C + q, flat + b * C + q, flat + q * C + b])
+    weights = np.concatenate([w, w, -w, -w])
+    matrix = np.bincount(index, weights=weights, minlength=n_days * C * C).reshape(n_days, C, C)
+    matrix += ridge * np.eye(C)
+
+    rhs = np.bincount(np.concatenate([d * C + b, d * C + q]),
+                      weights=np.concatenate([wy, -wy]),
+                      minlength=n_days * C).reshape(n_days, C)
+    observed = np.bincount(np.concatenate([d * C + b, d * C + q]),
+                           minlength=n_days * C).reshape(n_days, C) > 0
+
+    solution = np.linalg.solve(matrix, rhs[..., np.newaxis])[..., 0]
+    solution[~observed] = np.nan
+    return solution
+
+
+def solve_day_block_robust(obs: Observations, day_start: int, n_days: int, n_currencies: int,
+                           ridge: float = DEFAULT_RIDGE, iterations: int = HUBER_ITERATIONS,
+                           huber_k: float = HUBER_K) -> np.ndarray:
+    """
+    Робастный вариант solve_day_block (IRLS с весами Хьюбера): наблюдение с
+    невязкой |x_b - x_q - y| > huber_k получает вес w * huber_k / |невязка|,
+    поэтому одиночные выбросы не сдвигают курсы остальных валют.
+    """
+    d = obs.day_idx.astype(np.int64) - day_start
+    weight = obs.weight
+    for _ in range(iterations):
+        solution = solve_day_block(obs._replace(weight=weight), day_start, n_days, n_currencies, ridge)
+        residual = np.abs(solution[d, obs.base_idx] - solution[d, obs.quote_idx] - obs.log_rate)
+        weight = obs.weight * huber_k / np.maximum(residual, huber_k)
+    return solve_day_block(obs._replace(weight=weight), day_start, n_days, n_currencies, ridge)
+
+
+def solve_absolute_rates(obs: Observations, n_days: int, n_currencies: int,
+                         ridge: float = DEFAULT_RIDGE, chunk_days: int = CHUNK_DAYS) -> np.ndarray:
+    """Решение для всего календаря блоками по chunk_days дат."""
+    obs = obs.sorted_by_day()
+    result = np.full((n_days, n_currencies), np.nan)
+    bounds = np.searchsorted(obs.day_idx, np.arange(0, n_days + chunk_days, chunk_days))
+    for block, start in enumerate(range(0, n_days, chunk_days)):
+        size = min(chunk_days, n_days - start)
+        lo, hi = bounds[block], bounds[block + 1]
+        block_obs = Observations(*(field[lo:hi] for field in obs))
+        result[start:start + size] = solve_day_block(block_obs, start, size, n_currencies, ridge)
+    return result
+
+
+def save_absolute_rates(rates: AbsoluteRates, path: str = ABSOLUTE_DIR) -> None:
+    """
+    Сохраняет решение в data/store/absolute (npy + meta.json). Файлы
+    заменяются атомарно, meta.json - последним: читатель, отобразивший
+    старые массивы в память, продолжает видеть их целиком.
+    """
+    os.makedirs(path, exist_ok=True)
+    atomic_write(os.path.join(path, 'datetime.npy'), lambda f: np.save(f, rates.days), mode='wb')
+    atomic_write(os.path.join(path, 'log_rates.npy'), lambda f: np.save(f, rates.log_rates), mode='wb')
+    atomic_write_json(os.path.join(path, 'meta.json'), {
+        'currencies': rates.currencies,
+        'rows': int(len(rates.days)),
+        'updated_at': datetime.now().isoformat(),
+    })
+
+
+def load_absolute_rates(path: str = ABSOLUTE_DIR, mmap: bool = True) -> AbsoluteRates:
+    """Загружает решение; при mmap=True массивы отображаются в память."""
+    mmap_mode = 'r' if mmap else None
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return AbsoluteRates(
+        np.load(os.path.join(path, 'datetime.npy'), mmap_mode=mmap_mode),
+        meta['currencies'],
+        np.load(os.path.join(path, 'log_rates.npy'), mmap_mode=mmap_mode),
+    )
+
+
+def publish_absolute_rates(rates: AbsoluteRates, path: str = ABSOLUTE_DIR):
+    """Сохраняет решение и обновляет его агрегаты и производные данные. Возвращает (периоды, строки)."""
+    save_absolute_rates(rates, path)
+    periods = update_matrix_aggregates(rates.days, rates.currencies, rates.log_rates, ABSOLUTE_SOURCE)
+    derived_rows = update_matrix_derived(rates.days, rates.currencies, rates.log_rates, ABSOLUTE_SOURCE)
+    return periods, derived_rows
+
+
+def main():
+    """Полный пересчет абсолютных курсов по всем источникам хранилища."""
+    print("🚀 РАСЧЕТ АБСОЛЮТНЫХ КУРСОВ")
+    print("=" * 60)
+
+    store = PairStore()
+    sources = [s for s in ALL_SOURCES if store.symbols(s)]
+    if not sources:
+        print("✗ Хранилище пусто. Запустите scripts/initial_load/build_store.py")
+        return 1
+
+    universe = build_universe(store, sources)
+    days, obs = collect_observations(store, universe, sources)
+    print(f"Источники: {', '.join(sources)}")
+    print(f"Валют: {universe.n_currencies}, дат: {len(days)}, наблюдений: {len(obs.day_idx)}")
+
+    log_rates = solve_absolute_rates(obs, len(days), universe.n_currencies)
+    periods, derived_rows = publish_absolute_rates(AbsoluteRates(days, universe.currencies, log_rates))
+
+    coverage = np.isfinite(log_rates).sum(axis=0)
+    print(f"Период: {days_to_dates(days[0])} - {days_to_dates(days[-1])}")
+    print(f"Валют с данными: {int((coverage > 0).sum())}/{universe.n_currencies}")
+    print(f"✓ Результат сохранен: {ABSOLUTE_DIR}")
+    print(f"✓ Агрегаты (неделя/месяц/год) обновлены: {periods} периодов")
+    print(f"✓ Доходности и волатильности: +{derived_rows} строк")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Выравнивание рядов с разными торговыми календарями и датами начала.
+
+Основа - отсортированные int32-даты (дни от 1970-01-01) и np.searchsorted:
+- business_calendar / master_calendar - общий календарь рабочих дней;
+- align_exact - только точные совпадения дат, остальное NaN;
+- align_asof - as-of join: последнее известное значение на дату календаря
+  (forward fill) с ограничением устаревания max_staleness;
+- align_many - то же для набора рядов, результат - матрица (даты x ряды).
+Выравнивание 140 пар по календарю 1979-2025 занимает миллисекунды.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from storage.pair_store import dates_to_days, days_to_dates
+
+BUSINESS_WEEKMASK = '1111100'   # пн-пт
+
+EXACT = 'exact'
+ASOF = 'asof'
+
+
+def business_calendar(first_day: int, last_day: int, weekmask: str = BUSINESS_WEEKMASK,
+                      holidays: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Рабочие дни в [first_day, last_day] (int32, по возрастанию)."""
+    if last_day < first_day:
+        return np.empty(0, dtype=np.int32)
+    dates = days_to_dates(np.arange(first_day, last_day + 1, dtype=np.int32))
+    holiday_dates = days_to_dates(np.asarray(holidays, dtype=np.int32)) if holidays is not None else []
+    business = np.is_busday(dates, weekmask=weekmask, holidays=holiday_dates)
+    return dates_to_days(dates[business])
+
+
+def master_calendar(day_arrays: Sequence[np.ndarray], weekmask: str = BUSINESS_WEEKMASK,
+                    include_observed: bool = True) -> np.ndarray:
+    """
+    Общий календарь рабочих дней от самой ранней до самой поздней даты рядов.
+    include_observed добавляет даты наблюдений вне рабочих дней (торговля в выходные).
+    """
+    arrays = [np.asarray(d, dtype=np.int32) for d in day_arrays if len(d)]
+    if not arrays:
+        return np.empty(0, dtype=np.int32)
+    first = min(int(d[0]) for d in arrays)
+    last = max(int(d[-1]) for d in arrays)
+    calendar = business_calendar(first, last, weekmask)
+    if include_observed:
+        calendar = np.union1d(calendar, np.concatenate(arrays)).astype(np.int32)
+    return calendar
+
+
+def asof_positions(calendar: np.ndarray, days: np.ndarray,
+                   max_staleness: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Для каждой даты календаря - индекс последнего наблюдения с датой <= этой даты
+    и маска пригодности. Наблюдение старше max_staleness календарных дней
+    считается отсутствующим.
+    """
+    pos = np.searchsorted(days, calendar, side='right') - 1
+    valid = pos >= 0
+    if max_staleness is not None and len(days):
+        age = calendar - days[np.maximum(pos, 0)]
+        valid &= age <= max_staleness
+    return pos, valid
+
+
+def align_exact(calendar: np.ndarray, days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Раскладывает ряд по календарю: точные совпадения дат, остальное - NaN."""
+    out = np.full(len(calendar), np.nan)
+    if len(days) == 0 or len(calendar) == 0:
+        return out
+    pos = np.searchsorted(calendar, days)
+    valid = pos < len(calendar)
+    valid[valid] = calendar[pos[valid]] == days[valid]
+    out[pos[valid]] = values[valid]
+    return out
+
+
+def align_asof(calendar: np.ndarray, days: np.ndarray, values: np.ndarray,
+               max_staleness: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    As-of join ряда на календарь. Возвращает значения (NaN до начала ряда и
+    для устаревших наблюдений) и возраст значения в днях (-1, если значения нет).
+    NaN внутри ряда не протягиваются: берется последнее конечное значение.
+    """
+    finite = np.isfinite(values)
+    if not finite.all():
+        days, values = days[finite], values[finite]
+    out = np.full(len(calendar), np.nan)
+    age = np.full(len(calendar), -1, dtype=np.int32)
+    if len(days) == 0 or len(calendar) == 0:
+        return out, age
+    pos, valid = asof_positions(calendar, days, max_staleness)
+    out[valid] = values[pos[valid]]
+    age[valid] = calendar[valid] - days[pos[valid]]
+    return out, age
+
+
+def align_many(calendar: np.ndarray, series: Sequence[Tuple[np.ndarray, np.ndarray]],
+               how: str = EXACT, max_staleness: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Выравнивает набор рядов (days, values) на календарь.
+    Возвращает матрицу значений (T x N) и матрицу возраста значений int32
+    (0 - наблюдение в этот день, -1 - значения нет).
+    """
+    calendar = np.asarray(calendar, dtype=np.int32)
+    # Заполняем по строкам (N x T) - запись ряда в непрерывную память, затем транспонируем
+    values = np.full((len(series), len(calendar)), np.nan)
+    age = np.full((len(series), len(calendar)), -1, dtype=np.int32)
+    for j, (days, column) in enumerate(series):
+        if how == ASOF:
+            values[j], age[j] = align_asof(calendar, days, column, max_staleness)
+        elif how == EXACT:
+            values[j] = align_exact(calendar, days, column)
+            age[j, np.isfinite(values[j])] = 0
+        else:
+            raise ValueError(f"Неизвестный способ выравнивания: {how}")
+    return np.ascontiguousarray(values.T), np.ascontiguousarray(age.T)
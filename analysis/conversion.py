@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Пакетная конвертация сумм по абсолютным курсам.
+
+Строка журнала (amount, from, to, date) конвертируется как
+    amount * exp(x[t, from] - x[t, to]),
+где x - решение analysis/absolute_rates.py, t - последняя дата решения
+не позже date (as-of). Построчных словарей и CSV-пар нет:
+  - трехбуквенные коды упаковываются в целое (A..Z -> 0..25, три разряда
+    по основанию 26) прямо из байтов массива кодов, а таблица 26^3
+    переводит ключ в индекс валюты решения (индексы вселенной пар);
+  - дата -> строка решения - таблица as-of на каждый календарный день
+    между первой и последней датой решения;
+  - курсы выбираются fancy indexing из плоского массива лог-курсов.
+Все шаги - векторные операции над массивами длины N.
+Запускать ИЗ КОРНЯ ПРОЕКТА (самопроверка скорости):
+  python analysis/conversion.py [--rows 10000000]
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import dates_to_days
+from analysis.absolute_rates import ABSOLUTE_DIR, AbsoluteRates, load_absolute_rates
+
+ALPHABET = 26
+KEY_SPACE = ALPHABET ** 3
+BLOCK_ROWS = 1 << 20     # строки обрабатываются блоками, чтобы временные массивы оставались в кэше
+
+Codes = Union[np.ndarray, Sequence[str]]
+
+
+def pack_codes(codes: Codes) -> np.ndarray:
+    """
+    Коды валют ('EUR', b'EUR', массивы '<U3'/'S3') -> int32 ключи 0..26^3-1;
+    коды не из трех латинских заглавных букв (в том числе длиннее трех
+    символов, например 'USDT') -> -1.
+    """
+    codes = np.asarray(codes)
+    # Массив шире трех символов не обрезается: лишние символы должны быть пустыми
+    if codes.dtype.kind == 'U':
+        width = max(codes.dtype.itemsize // 4, 3)
+        chars = np.ascontiguousarray(codes, dtype=f'<U{width}').view(np.uint32).reshape(-1, width)
+    else:
+        width = max(codes.dtype.itemsize, 3)
+        chars = np.ascontiguousarray(codes, dtype=f'S{width}').view(np.uint8).reshape(-1, width)
+    # В беззнаковой арифметике символы меньше 'A' дают большие числа - одна проверка на разряд
+    letters = [chars[:, k].astype(np.uint32) - ord('A') for k in range(3)]
+    keys = ((letters[0] * ALPHABET + letters[1]) * ALPHABET + letters[2]).astype(np.int32)
+    invalid = (letters[0] >= ALPHABET) | (letters[1] >= ALPHABET) | (letters[2] >= ALPHABET)
+    if width > 3:
+        invalid |= (chars[:, 3:] != 0).any(axis=1)
+    keys[invalid] = -1
+    return keys
+
+
+def to_days(dates) -> np.ndarray:
+    """Даты (int дни, datetime64, строки 'YYYY-MM-DD') -> int32 дни от 1970-01-01."""
+    dates = np.asarray(dates)
+    if dates.dtype.kind in 'iu':
+        return dates.astype(np.int32, copy=False)
+    return dates_to_days(dates)
+
+
+class ConversionIndex:
+    """Таблицы поиска для решения: ключ кода -> валюта, день -> строка as-of."""
+
+    def __init__(self, rates: AbsoluteRates):
+        self.currencies: List[str] = list(rates.currencies)
+        self.n_currencies = len(self.currencies)
+        log_rates = np.asarray(rates.log_rates, dtype=np.float64)
+        # Дополнительная строка из NaN - для дат раньше начала решения
+        self.flat = np.concatenate([log_rates, np.full((1, self.n_currencies), np.nan)]).ravel()
+
+        self.currency_table = np.full(KEY_SPACE, -1, dtype=np.int32)
+        keys = pack_codes(self.currencies)
+        self.currency_table[keys[keys >= 0]] = np.flatnonzero(keys >= 0)
+
+        days = np.asarray(rates.days, dtype=np.int32)
+        self.first_day = int(days[0]) if len(days) else 0
+        span = int(days[-1]) - self.first_day + 1 if len(days) else 0
+        calendar = self.first_day + np.arange(span, dtype=np.int32)
+        self.row_table = (np.searchsorted(days, calendar, side='right') - 1).astype(np.int32)
+        self.last_row = len(days) - 1
+        self.missing_row = len(days)
+
+    def currency_ids(self, codes: Codes) -> np.ndarray:
+        """
+        Индексы валют решения (-1 для неизвестных). Целочисленный вход считается
+        уже индексами: значения вне 0..n_currencies-1 тоже дают -1.
+        """
+        codes = np.asarray(codes)
+        if codes.dtype.kind in 'iu':
+            valid = (codes >= 0) & (codes < self.n_currencies)
+            return np.where(valid, codes, -1).astype(np.int32, copy=False)
+        keys = pack_codes(codes)
+        return np.where(keys >= 0, self.currency_table[np.maximum(keys, 0)], -1)
+
+    def day_rows(self, dates) -> np.ndarray:
+        """Строки решения as-of; даты раньше начала решения -> строка из NaN."""
+        offsets = to_days(dates).astype(np.int64) - self.first_day
+        rows = self.row_table[np.clip(offsets, 0, max(len(self.row_table) - 1, 0))]
+        rows = np.where(offsets > len(self.row_table) - 1, self.last_row, rows)
+        return np.where(offsets < 0, self.missing_row, rows)
+
+    def convert(self, amounts: np.ndarray, from_ids: np.ndarray, to_ids: np.ndarray,
+                rows: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Конвертация по готовым индексам; неизвестная валюта или индекс вне решения -> NaN."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        n = len(amounts)
+        out = np.empty(n) if out is None else out
+        C = self.n_currencies
+        for start in range(0, n, BLOCK_ROWS):
+            block = slice(start, min(start + BLOCK_ROWS, n))
+            f, t = from_ids[block], to_ids[block]
+            base = rows[block].astype(np.int64) * C
+            invalid = (f < 0) | (f >= C) | (t < 0) | (t >= C)
+            x = self.flat.take(base + np.where(invalid, 0, f))
+            x -= self.flat.take(base + np.where(invalid, 0, t))
+            x[invalid] = np.nan
+            np.exp(x, out=x)
+            np.multiply(x, amounts[block], out=out[block])
+        return out
+
+
+def convert_batch(amounts, from_ccy: Codes, to_ccy: Codes, dates,
+                  rates: Optional[AbsoluteRates] = None,
+                  index: Optional[ConversionIndex] = None) -> np.ndarray:
+    """
+    Конвертирует массив сумм: amount * exp(x[t, from] - x[t, to]) на дату as-of.
+    from_ccy/to_ccy - коды валют или их индексы в решении, dates - дни/даты;
+    любой аргумент может быть скаляром (расширяется до длины amounts).
+    Неизвестная валюта или дата раньше начала решения -> NaN.
+    Для повторных вызовов передавайте готовый index (ConversionIndex).
+    """
+    if index is None:
+        index = ConversionIndex(rates if rates is not None else load_absolute_rates(ABSOLUTE_DIR))
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=np.float64))
+    n = len(amounts)
+    from_ccy, to_ccy, dates = (np.atleast_1d(np.asarray(a)) for a in (from_ccy, to_ccy, dates))
+    # Скаляры переводятся в индексы один раз, до расширения до длины журнала
+    if len(from_ccy) == 1:
+        from_ccy = index.currency_ids(from_ccy)
+    if len(to_ccy) == 1:
+        to_ccy = index.currency_ids(to_ccy)
+    scalar_date = len(dates) == 1
+    if scalar_date:
+        dates = index.day_rows(dates)
+    from_ccy, to_ccy, dates = (np.broadcast_to(a, (n,)) for a in (from_ccy, to_ccy, dates))
+    out = np.empty(n)
+    # Коды и даты переводятся в индексы тем же блоком, что и выборка курсов
+    for start in range(0, n, BLOCK_ROWS):
+        block = slice(start, min(start + BLOCK_ROWS, n))
+        rows = dates[block] if scalar_date else index.day_rows(dates[block])
+        index.convert(amounts[block], index.currency_ids(from_ccy[block]), index.currency_ids(to_ccy[block]),
+                      rows, out=out[block])
+    return out
+
+
+def main():
+    """Самопроверка скорости на случайном журнале."""
+    parser = argparse.ArgumentParser(description="Скорость пакетной конвертации")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    print("💱 ПАКЕТНАЯ КОНВЕРТАЦИЯ")
+    print("=" * 60)
+    if not os.path.exists(os.path.join(ABSOLUTE_DIR, 'meta.json')):
+        print("✗ Нет абсолютных курсов. Запустите analysis/absolute_rates.py")
+        return 1
+    rates = load_absolute_rates(ABSOLUTE_DIR)
+    index = ConversionIndex(rates)
+    rng = np.random.default_rng(0)
+    codes = np.array(rates.currencies)
+    from_ccy = codes[rng.integers(0, len(codes), args.rows)]
+    to_ccy = codes[rng.integers(0, len(codes), args.rows)]
+    days = rng.integers(rates.days[0], rates.days[-1] + 1, args.rows).astype(np.int32)
+    amounts = rng.uniform(1, 1e6, args.rows)
+
+    started = time.perf_counter()
+    result = convert_batch(amounts, from_ccy, to_ccy, days, index=index)
+    elapsed = time.perf_counter() - started
+    print(f"Строк: {args.rows:,}, время: {elapsed:.3f} сек, {args.rows / elapsed / 1e6:.1f} млн строк/сек")
+    print(f"Без курса (NaN): {int(np.isnan(result).sum()):,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Сканер качества данных пар: векторные проверки всей панели за один проход.
+
+Результат - слой флагов uint8 (даты x пары) в data/store/quality/<источник>/.
+Каждый бит - отдельная проверка; решатели применяют слой одной битовой
+операцией (quality_mask) без повторного анализа данных.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/data_quality.py
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, STORE_DIR, PRICE_COLUMNS, days_to_dates
+from storage.snapshots import atomic_write, atomic_write_json
+from analysis.pair_universe import PairUniverse
+from analysis.panel import build_panel
+
+QUALITY_DIR = os.path.join(STORE_DIR, 'quality')
+
+# --- Биты флагов ---
+FLAG_NONPOSITIVE = 1     # цена <= 0
+FLAG_HIGH_LOW = 2        # high < low или open/close вне [low, high]
+FLAG_FLAT_BAR = 4        # open == high == low == close (вырожденный бар)
+FLAG_GAP = 8             # бар после пропуска > MAX_GAP_BUSINESS_DAYS рабочих дней
+FLAG_SPIKE = 16          # робастный z-score лог-доходности > SPIKE_Z
+FLAG_RECIPROCAL = 32     # close(A/B) * close(B/A) заметно отличается от 1
+
+FLAG_NAMES = {
+    FLAG_NONPOSITIVE: 'nonpositive',
+    FLAG_HIGH_LOW: 'high_low',
+    FLAG_FLAT_BAR: 'flat_bar',
+    FLAG_GAP: 'gap',
+    FLAG_SPIKE: 'spike',
+    FLAG_RECIPROCAL: 'reciprocal',
+}
+# Флаги, исключающие наблюдение из решателей; FLAT_BAR и GAP - информационные
+BAD_FLAGS = FLAG_NONPOSITIVE | FLAG_HIGH_LOW | FLAG_SPIKE | FLAG_RECIPROCAL
+
+MAX_GAP_BUSINESS_DAYS = 5
+SPIKE_Z = 10.0
+# Нижняя граница масштаба доходностей: у привязанных валют MAD почти нулевой
+MIN_RETURN_SCALE = 0.002
+RECIPROCAL_TOLERANCE = 0.01   # |log(close * reciprocal_close)|
+
+
+class QualityLayer(NamedTuple):
+    days: np.ndarray      # int32 (T,)
+    symbols: List[str]    # N пар
+    flags: np.ndarray     # uint8 (T, N)
+
+
+def previous_valid_index(valid: np.ndarray) -> np.ndarray:
+    """Для каждой ячейки - индекс строки предыдущего валидного значения в столбце (-1, если нет)."""
+    rows = np.where(valid, np.arange(valid.shape[0])[:, np.newaxis], -1)
+    shifted = np.vstack([np.full((1, valid.shape[1]), -1), rows[:-1]])
+    return np.maximum.accumulate(shifted, axis=0)
+
+
+def scan_panel(days: np.ndarray, ohlc: Dict[str, np.ndarray], universe: PairUniverse) -> np.ndarray:
+    """Все проверки над панелями open/high/low/close (T x N). Возвращает флаги uint8."""
+    o, h, l, c = (ohlc[col] for col in PRICE_COLUMNS)
+    present = np.isfinite(c)
+    flags = np.zeros(c.shape, dtype=np.uint8)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = np.stack([o, h, l, c])
+        flags[(prices <= 0).any(axis=0)] |= FLAG_NONPOSITIVE
+        flags[(h < l) | (o > h) | (o < l) | (c > h) | (c < l)] |= FLAG_HIGH_LOW
+        flags[present & (o == h) & (h == l) & (l == c)] |= FLAG_FLAT_BAR
+
+        # Пропуски относительно календаря рабочих дней
+        prev = previous_valid_index(present)
+        has_prev = present & (prev >= 0)
+        rows, cols = np.nonzero(has_prev)
+        dates = days_to_dates(days)
+        # Рабочие дни строго между баров: начало интервала - следующий за
+        # предыдущим баром день, даже если тот бар пришелся на выходной
+        gap = np.busday_count(dates[prev[rows, cols]] + np.timedelta64(1, 'D'), dates[rows])
+        flags[rows[gap > MAX_GAP_BUSINESS_DAYS], cols[gap > MAX_GAP_BUSINESS_DAYS]] |= FLAG_GAP
+
+        # Выбросы доходностей: робастный z-score (медиана / MAD) по каждой паре
+        returns = np.full(c.shape, np.nan)
+        returns[rows, cols] = np.log(c[rows, cols] / c[prev[rows, cols], cols])
+        median = np.nanmedian(returns, axis=0)
+        mad = np.nanmedian(np.abs(returns - median), axis=0) * 1.4826
+        z = np.abs(returns - median) / np.maximum(mad, MIN_RETURN_SCALE)
+        flags[z > SPIKE_Z] |= FLAG_SPIKE
+
+        # Согласованность пар-зеркал
+        couples = universe.reciprocal_pairs()
+        if len(couples):
+            product = np.log(c[:, couples[:, 0]] * c[:, couples[:, 1]])
+            bad = np.abs(product) > RECIPROCAL_TOLERANCE
+            for side in (0, 1):
+                flags[:, couples[:, side]] |= np.where(bad, FLAG_RECIPROCAL, 0).astype(np.uint8)
+    return flags
+
+
+def scan_source(store: PairStore, source: str, universe: PairUniverse) -> QualityLayer:
+    """Собирает OHLC-панели источника и сканирует их."""
+    close = build_panel(store, source, universe.symbols, 'close')
+    ohlc = {'close': close.values}
+    for column in ('open', 'high', 'low'):
+        ohlc[column] = build_panel(store, source, universe.symbols, column, days=close.days).values
+    return QualityLayer(close.days, close.symbols, scan_panel(close.days, ohlc, universe))
+
+
+def save_quality_layer(layer: QualityLayer, source: str, root: str = QUALITY_DIR) -> str:
+    path = os.path.join(root, source)
+    os.makedirs(path, exist_ok=True)
+    # Файлы заменяются атомарно: решатели держат слой отображенным в память
+    atomic_write(os.path.join(path, 'datetime.npy'), lambda f: np.save(f, layer.days), mode='wb')
+    atomic_write(os.path.join(path, 'flags.npy'), lambda f: np.save(f, layer.flags), mode='wb')
+    atomic_write_json(os.path.join(path, 'meta.json'), {
+        'symbols': layer.symbols, 'flag_names': {str(k): v for k, v in FLAG_NAMES.items()},
+        'updated_at': datetime.now().isoformat()})
+    return path
+
+
+def load_quality_layer(source: str, root: str = QUALITY_DIR, mmap: bool = True) -> QualityLayer:
+    path = os.path.join(root, source)
+    mmap_mode = 'r' if mmap else None
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return QualityLayer(np.load(os.path.join(path, 'datetime.npy'), mmap_mode=mmap_mode),
+                        meta['symbols'],
+                        np.load(os.path.join(path, 'flags.npy'), mmap_mode=mmap_mode))
+
+
+def flags_panel(layer: QualityLayer, days: np.ndarray, symbols: List[str]) -> np.ndarray:
+    """Флаги слоя качества на календаре days для списка symbols; отсутствующие ячейки - 0."""
+    flags = np.zeros((len(days), len(symbols)), dtype=np.uint8)
+    if not len(layer.days):
+        return flags
+    pos = np.searchsorted(layer.days, days)
+    pos_clipped = np.minimum(pos, len(layer.days) - 1)
+    matched = (pos < len(layer.days)) & (layer.days[pos_clipped] == days)
+    column_of = {s: j for j, s in enumerate(layer.symbols)}
+    for j, symbol in enumerate(symbols):
+        k = column_of.get(symbol)
+        if k is not None:
+            flags[matched, j] = layer.flags[pos_clipped[matched], k]
+    return flags
+
+
+def quality_mask(layer: QualityLayer, days: np.ndarray, symbols: List[str],
+                 bad_flags: int = BAD_FLAGS) -> np.ndarray:
+    """
+    Маска пригодных наблюдений (T x N) для календаря days и списка пар symbols.
+    Даты и пары, которых нет в слое, считаются пригодными.
+    """
+    return (flags_panel(layer, days, symbols) & bad_flags) == 0
+
+
+def summarize(layer: QualityLayer) -> pd.DataFrame:
+    """Количество флагов каждого типа по парам."""
+    data = {'symbol': layer.symbols}
+    for bit, name in FLAG_NAMES.items():
+        data[name] = ((layer.flags & bit) != 0).sum(axis=0)
+    return pd.DataFrame(data)
+
+
+def main():
+    """Основная функция скрипта."""
+    print("🔬 СКАНЕР КАЧЕСТВА ДАННЫХ TWELVE DATA")
+    print("=" * 60)
+
+    store = PairStore()
+    if not store.symbols('twelve_data'):
+        print("✗ В хранилище нет данных. Запустите scripts/initial_load/build_store.py")
+        return 1
+
+    universe = PairUniverse.from_config()
+    layer = scan_source(store, 'twelve_data', universe)
+    path = save_quality_layer(layer, 'twelve_data')
+
+    summary = summarize(layer)
+    os.makedirs('data/analytics', exist_ok=True)
+    summary.to_csv('data/analytics/data_quality_summary.csv', index=False, encoding='utf-8-sig')
+
+    print(f"Панель: {len(layer.days)} дат x {len(layer.symbols)} пар")
+    for bit, name in FLAG_NAMES.items():
+        print(f"  {name:12}: {int(((layer.flags & bit) != 0).sum())}")
+    print(f"\n✓ Слой качества: {path}")
+    print("✓ Сводка: data/analytics/data_quality_summary.csv")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Нормировки абсолютных курсов: геометрическое среднее, числитель-валюта
+(numeraire:USD) или взвешенная корзина (ВВП, SDR из config/baskets.py).
+
+Решение analysis/absolute_rates.py определено с точностью до сдвига на дату.
+Нормировка с весами w (C,) задает сдвиг так, чтобы сумма w * x по валютам,
+у которых есть курс, была равна нулю:
+    x' = x - (x0 @ w) / (M @ w),
+где x0 - лог-курсы с нулями вместо NaN, M - маска наличия курса. Для блока
+дат это одно произведение матрицы на вектор (а для нескольких нормировок
+сразу - на матрицу весов), решатель не перезапускается.
+Результаты кэшируются рядом с решением: data/store/absolute/normalized/<имя>.npy;
+кэш действителен, пока не изменилось само решение.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/numeraire.py
+"""
+
+import os
+import re
+import sys
+import json
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import days_to_dates
+from storage.snapshots import atomic_write_json
+from analysis.absolute_rates import ABSOLUTE_DIR, CHUNK_DAYS, AbsoluteRates, load_absolute_rates
+from config.baskets import BASKETS
+
+NORMALIZED_SUBDIR = 'normalized'
+INDEX_FILE = 'index.json'
+GEOMETRIC = 'geometric'
+NUMERAIRE_PREFIX = 'numeraire:'
+DEFAULT_NORMALIZATIONS = [GEOMETRIC, 'numeraire:USD', 'gdp', 'sdr']
+
+
+def basket_weights(name: str, currencies: List[str]) -> np.ndarray:
+    """Вектор весов (C,) нормировки name для списка валют решения."""
+    weights = np.zeros(len(currencies))
+    if name == GEOMETRIC:
+        weights[:] = 1.0
+    elif name.startswith(NUMERAIRE_PREFIX):
+        code = name[len(NUMERAIRE_PREFIX):]
+        if code not in currencies:
+            raise ValueError(f"Валюты {code} нет в решении")
+        weights[currencies.index(code)] = 1.0
+    elif name in BASKETS:
+        for code, weight in BASKETS[name].items():
+            if code in currencies:
+                weights[currencies.index(code)] = weight
+    else:
+        raise ValueError(f"Неизвестная нормировка: {name}")
+    if not weights.any():
+        raise ValueError(f"В корзине {name} нет валют решения")
+    return weights
+
+
+def normalize_block(log_rates: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Нормирует блок лог-курсов (T x C) сразу для K нормировок: weights (C x K).
+    Возвращает (K x T x C). Даты без валют корзины дают NaN.
+    """
+    present = np.isfinite(log_rates)
+    filled = np.where(present, log_rates, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        offsets = (filled @ weights) / (present @ weights)     # (T x K)
+    return log_rates[np.newaxis] - offsets.T[:, :, np.newaxis]
+
+
+def normalize(log_rates: np.ndarray, currencies: List[str], names: Sequence[str],
+              chunk_days: int = CHUNK_DAYS, out: Optional[Sequence[np.ndarray]] = None) -> List[np.ndarray]:
+    """Нормировки names для всего решения блоками по chunk_days дат (можно писать в memmap)."""
+    weights = np.stack([basket_weights(name, currencies) for name in names], axis=1)
+    n_days = log_rates.shape[0]
+    out = out if out is not None else [np.empty(log_rates.shape) for _ in names]
+    for start in range(0, n_days, chunk_days):
+        block = normalize_block(np.asarray(log_rates[start:start + chunk_days], dtype=np.float64), weights)
+        for k in range(len(names)):
+            out[k][start:start + chunk_days] = block[k]
+    return list(out)
+
+
+def _cache_file(name: str) -> str:
+    """Имя файла кэша: только буквы, цифры, '_' и '-' - имя нормировки не может указать за пределы кэша."""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', name) + '.npy'
+
+
+class NormalizationCache:
+    """Кэш нормировок рядом с решением; сбрасывается при пересчете решения."""
+
+    def __init__(self, rates_dir: str = ABSOLUTE_DIR):
+        self.rates_dir = rates_dir
+        self.path = os.path.join(rates_dir, NORMALIZED_SUBDIR)
+
+    def _solution_stamp(self) -> str:
+        with open(os.path.join(self.rates_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)['updated_at']
+
+    def _read_index(self) -> Dict:
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def cached(self) -> List[str]:
+        """Нормировки, актуальные для текущего решения."""
+        stamp = self._solution_stamp()
+        return [name for name, entry in self._read_index().items() if entry['solution_updated_at'] == stamp]
+
+    def get(self, names: Sequence[str]) -> Dict[str, AbsoluteRates]:
+        """
+        Нормированные курсы (memory-mapped). Недостающие нормировки считаются
+        одним проходом по решению и добавляются в кэш.
+        """
+        rates = load_absolute_rates(self.rates_dir)
+        for name in names:
+            basket_weights(name, rates.currencies)     # неизвестная нормировка - ValueError до записи файлов
+        cached = set(self.cached())
+        missing = [name for name in names if name not in cached]
+        if missing:
+            self._compute(rates, missing)
+        return {name: AbsoluteRates(rates.days, rates.currencies,
+                                    np.load(os.path.join(self.path, _cache_file(name)), mmap_mode='r'))
+                for name in names}
+
+    def _compute(self, rates: AbsoluteRates, names: List[str]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        # Расчет идет во временные файлы: читатель, отобразивший прежний
+        # кэш в память, не увидит его обрезанным или наполовину пересчитанным
+        tmp_paths = []
+        for name in names:
+            fd, tmp_path = tempfile.mkstemp(prefix=f'.{_cache_file(name)}.', suffix='.tmp', dir=self.path)
+            os.close(fd)
+            tmp_paths.append(tmp_path)
+        try:
+            outputs = [np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64,
+                                                 shape=rates.log_rates.shape) for tmp_path in tmp_paths]
+            normalize(rates.log_rates, rates.currencies, names, out=outputs)
+            for output in outputs:
+                output.flush()
+            del outputs
+            for name, tmp_path in zip(names, tmp_paths):
+                os.replace(tmp_path, os.path.join(self.path, _cache_file(name)))
+        finally:
+            for tmp_path in tmp_paths:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        stamp = self._solution_stamp()
+        index = {name: entry for name, entry in self._read_index().items()
+                 if entry['solution_updated_at'] == stamp}
+        for name in names:
+            weights = basket_weights(name, rates.currencies)
+            index[name] = {
+                'file': _cache_file(name),
+                'solution_updated_at': stamp,
+                'weights': {c: float(w) for c, w in zip(rates.currencies, weights) if w},
+                'computed_at': datetime.now().isoformat(),
+            }
+        atomic_write_json(os.path.join(self.path, INDEX_FILE), index)
+
+
+def normalized_rates(name: str, rates_dir: str = ABSOLUTE_DIR) -> AbsoluteRates:
+    """Абсолютные курсы в нормировке name (из кэша или с расчетом)."""
+    return NormalizationCache(rates_dir).get([name])[name]
+
+
+def main():
+    """Основная функция скрипта."""
+    print("⚖️  НОРМИРОВКИ АБСОЛЮТНЫХ КУРСОВ")
+    print("=" * 60)
+    if not os.path.exists(os.path.join(ABSOLUTE_DIR, 'meta.json')):
+        print("✗ Нет абсолютных курсов. Запустите analysis/absolute_rates.py")
+        return 1
+
+    cache = NormalizationCache()
+    started = datetime.now()
+    results = cache.get(DEFAULT_NORMALIZATIONS)
+    print(f"Нормировок: {len(results)}, время: {(datetime.now() - started).total_seconds():.2f} сек")
+
+    sample = results[GEOMETRIC]
+    last = len(sample.days) - 1
+    print(f"\nКурсы на {days_to_dates(sample.days[last])} (exp(x), первые 8 валют):")
+    header = f"{'валюта':8}" + ''.join(f"{name:>16}" for name in results)
+    print(header)
+    for c, code in enumerate(sample.currencies[:8]):
+        print(f"{code:8}" + ''.join(f"{np.exp(r.log_rates[last, c]):16.6g}" for r in results.values()))
+    print(f"\n✓ Кэш нормировок: {cache.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Вселенная валют и пар проекта AbsCur3: целочисленные идентификаторы.
+
+Все векторные расчеты (сверка источников, решатель абсолютных курсов)
+адресуют валюты и пары по индексам, а не по строкам: base_idx/quote_idx
+позволяют выбирать столбцы матриц курсов одной операцией fancy indexing.
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+class PairUniverse:
+    """Отображение валют и пар в непрерывные индексы 0..N-1."""
+
+    def __init__(self, symbols: Iterable[str], extra_currencies: Iterable[str] = ()):
+        self.symbols: List[str] = list(symbols)
+        bases = [symbol.split('/')[0] for symbol in self.symbols]
+        quotes = [symbol.split('/')[1] for symbol in self.symbols]
+
+        self.currencies: List[str] = sorted(set(bases) | set(quotes) | set(extra_currencies))
+        self.currency_index: Dict[str, int] = {c: i for i, c in enumerate(self.currencies)}
+        self.pair_index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+
+        self.base_idx = np.array([self.currency_index[c] for c in bases], dtype=np.int32)
+        self.quote_idx = np.array([self.currency_index[c] for c in quotes], dtype=np.int32)
+
+    @classmethod
+    def from_config(cls, extra_currencies: Iterable[str] = ()) -> 'PairUniverse':
+        """Вселенная из config/currencies.py (140 пар Twelve Data)."""
+        sys.path.insert(0, os.getcwd())
+        from config.currencies import ALL_SYMBOLS
+        return cls(ALL_SYMBOLS, extra_currencies)
+
+    @property
+    def n_currencies(self) -> int:
+        return len(self.currencies)
+
+    @property
+    def n_pairs(self) -> int:
+        return len(self.symbols)
+
+    def reciprocal_pairs(self) -> np.ndarray:
+        """
+        Пары-зеркала (USD/EUR и EUR/USD): массив (K, 2) индексов пар,
+        в каждой строке первой идет пара с меньшим индексом.
+        """
+        couples = []
+        for i, symbol in enumerate(self.symbols):
+            base, quote = symbol.split('/')
+            j = self.pair_index.get(f"{quote}/{base}")
+            if j is not None and i < j:
+                couples.append((i, j))
+        return np.array(couples, dtype=np.int32).reshape(-1, 2)
+
+    def currency_ids(self, codes: Iterable[str]) -> np.ndarray:
+        """Индексы валют; неизвестные коды -> -1."""
+        return np.array([self.currency_index.get(c, -1) for c in codes], dtype=np.int32)
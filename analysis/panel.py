@@ -0,0 +1,54 @@
+"""
+Панель курсов: матрица (даты x пары) одной колонки рядов из хранилища.
+Ряды раскладываются по общему календарю модулем analysis/alignment.py:
+точные совпадения дат (по умолчанию) или as-of join с ограничением
+устаревания; отсутствующие значения - NaN.
+"""
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from storage.pair_store import PairStore, DATE_COLUMN
+from analysis.alignment import EXACT, align_exact, align_many
+
+
+class Panel(NamedTuple):
+    days: np.ndarray      # int32 (T,), дни от 1970-01-01, по возрастанию
+    symbols: List[str]    # N пар в формате 'EUR/USD'
+    values: np.ndarray    # float64 (T, N)
+
+
+def place_on_calendar(calendar: np.ndarray, days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Раскладывает ряд по календарю: точные совпадения дат, остальное - NaN."""
+    return align_exact(calendar, days, values)
+
+
+def build_panel(store: PairStore, source: str,
+                symbols: Optional[List[str]] = None,
+                column: str = 'close',
+                days: Optional[np.ndarray] = None,
+                how: str = EXACT,
+                max_staleness: Optional[int] = None) -> Panel:
+    """
+    Собирает панель источника. По умолчанию календарь - объединение дат всех рядов.
+    how='asof' протягивает последнее значение вперед, но не дальше max_staleness дней.
+    Пары, которых нет в хранилище, дают столбец из NaN.
+    """
+    if symbols is None:
+        symbols = store.symbols(source)
+
+    series = {}
+    for symbol in symbols:
+        if store.has_series(source, symbol):
+            series[symbol] = store.read_series(source, symbol, [column])
+
+    if days is None:
+        all_days = [s[DATE_COLUMN] for s in series.values()]
+        days = np.unique(np.concatenate(all_days)) if all_days else np.empty(0, dtype=np.int32)
+    days = np.asarray(days, dtype=np.int32)
+
+    empty = (np.empty(0, dtype=np.int32), np.empty(0))
+    values, _ = align_many(days, [(series[s][DATE_COLUMN], series[s][column]) if s in series else empty
+                                  for s in symbols], how, max_staleness)
+    return Panel(days, list(symbols), values)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Шардированный режим решателя абсолютных курсов для многоядерных машин.
+
+Задачи по датам независимы, поэтому ось дат делится на шарды (кратные
+CHUNK_DAYS), а шарды решаются в пуле процессов:
+- наблюдения, отсортированные по дате, один раз сохраняются в .npy и
+  открываются воркерами через memory-mapping - массивы не сериализуются,
+  воркер получает только границы своего шарда;
+- результат - общий .npy (open_memmap), каждый воркер пишет в свои строки.
+Поддерживаются обычное и робастное (Хьюбер, IRLS) решения.
+Запускать ИЗ КОРНЯ ПРОЕКТА:
+  python analysis/parallel_solve.py --workers 8 [--robust]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, days_to_dates
+from analysis.absolute_rates import (ABSOLUTE_DIR, CHUNK_DAYS, DEFAULT_RIDGE, AbsoluteRates, Observations,
+                                     build_universe, collect_observations, publish_absolute_rates,
+                                     solve_day_block, solve_day_block_robust)
+from config.sources import ALL_SOURCES
+
+SHARDS_PER_WORKER = 4   # несколько шардов на процесс выравнивают нагрузку
+
+
+def share_observations(obs: Observations, directory: str) -> None:
+    """Сохраняет наблюдения (по возрастанию дат) колонками .npy для memory-mapping."""
+    os.makedirs(directory, exist_ok=True)
+    for name, field in zip(Observations._fields, obs.sorted_by_day()):
+        np.save(os.path.join(directory, f'{name}.npy'), field)
+
+
+def load_shared_observations(directory: str) -> Observations:
+    return Observations(*(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                          for name in Observations._fields))
+
+
+def solve_shard(task: Tuple[str, str, int, int, int, float, int, bool]) -> int:
+    """
+    Воркер: решает даты [start, end) блоками по chunk_days и пишет строки
+    результата в общий массив. Возвращает число решенных дат.
+    """
+    obs_dir, output_path, start, end, n_currencies, ridge, chunk_days, robust = task
+    obs = load_shared_observations(obs_dir)
+    result = np.load(output_path, mmap_mode='r+')
+    solve = solve_day_block_robust if robust else solve_day_block
+    bounds = np.searchsorted(obs.day_idx, np.arange(start, end + chunk_days, chunk_days))
+    for block, block_start in enumerate(range(start, end, chunk_days)):
+        size = min(chunk_days, end - block_start)
+        lo, hi = bounds[block], bounds[block + 1]
+        block_obs = Observations(*(np.asarray(field[lo:hi]) for field in obs))
+        result[block_start:block_start + size] = solve(block_obs, block_start, size, n_currencies, ridge)
+    result.flush()
+    return end - start
+
+
+def solve_sharded(obs: Observations, n_days: int, n_currencies: int, workers: Optional[int] = None,
+                  ridge: float = DEFAULT_RIDGE, chunk_days: int = CHUNK_DAYS,
+                  robust: bool = False, work_dir: Optional[str] = None) -> np.ndarray:
+    """
+    Решение всего календаря в пуле процессов. Возвращает (n_days, C);
+    при workers=1 шарды решаются в текущем процессе.
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_days = max(chunk_days, -(-n_days // (workers * SHARDS_PER_WORKER * chunk_days)) * chunk_days)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        obs_dir = os.path.join(tmp, 'observations')
+        output_path = os.path.join(tmp, 'log_rates.npy')
+        share_observations(obs, obs_dir)
+        result = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float64,
+                                           shape=(n_days, n_currencies))
+        result[:] = np.nan
+        result.flush()
+
+        tasks = [(obs_dir, output_path, start, min(start + shard_days, n_days),
+                  n_currencies, ridge, chunk_days, robust)
+                 for start in range(0, n_days, shard_days)]
+        if workers == 1:
+            for task in tasks:
+                solve_shard(task)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(solve_shard, tasks))
+        return np.array(result)
+
+
+def main():
+    """Полный пересчет абсолютных курсов в шардированном режиме."""
+    parser = argparse.ArgumentParser(description="Шардированный расчет абсолютных курсов")
+    parser.add_argument('--workers', type=int, help="Процессов в пуле (по умолчанию - число ядер)")
+    parser.add_argument('--robust', action='store_true', help="Робастное решение (веса Хьюбера)")
+    parser.add_argument('--chunk-days', type=int, default=CHUNK_DAYS)
+    args = parser.parse_args()
+
+    print("🚀 ШАРДИРОВАННЫЙ РАСЧЕТ АБСОЛЮТНЫХ КУРСОВ")
+    print("=" * 60)
+
+    store = PairStore()
+    sources = [s for s in ALL_SOURCES if store.symbols(s)]
+    if not sources:
+        print("✗ Хранилище пусто. Запустите scripts/initial_load/build_store.py")
+        return 1
+
+    universe = build_universe(store, sources)
+    days, obs = collect_observations(store, universe, sources)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Валют: {universe.n_currencies}, дат: {len(days)}, наблюдений: {len(obs.day_idx)}")
+    print(f"Процессов: {workers}, режим: {'робастный' if args.robust else 'МНК'}")
+
+    started = datetime.now()
+    log_rates = solve_sharded(obs, len(days), universe.n_currencies, workers,
+                              chunk_days=args.chunk_days, robust=args.robust)
+    print(f"Решение: {(datetime.now() - started).total_seconds():.2f} сек")
+
+    periods, derived_rows = publish_absolute_rates(AbsoluteRates(days, universe.currencies, log_rates))
+    print(f"Период: {days_to_dates(days[0])} - {days_to_dates(days[-1])}")
+    print(f"✓ Результат сохранен: {ABSOLUTE_DIR}")
+    print(f"✓ Агрегаты: {periods} периодов, доходности и волатильности: +{derived_rows} строк")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Пары-зеркала (USD/EUR и EUR/USD, AUD/NZD и NZD/AUD, ...): индекс, проверка и
+объединенный "лучший" ряд.
+
+Для каждой пары-зеркала произведение close должно быть равно 1. Индекс
+пар-зеркал строится один раз и сохраняется в data/store/reciprocal/index.json;
+проверка идет сразу по всем датам и всем парам. Объединенный ряд в
+канонической ориентации (базовая валюта раньше по алфавиту) на каждую дату
+берет сторону с меньшим числом флагов качества - аналитика читает один ряд
+(источник 'best' в хранилище) вместо сверки двух при каждом запросе.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/reciprocal.py
+"""
+
+import os
+import sys
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, STORE_DIR, DATE_COLUMN
+from storage.snapshots import atomic_write_json
+from analysis.pair_universe import PairUniverse
+from analysis.panel import build_panel
+from analysis.data_quality import (QUALITY_DIR, RECIPROCAL_TOLERANCE,
+                                   flags_panel, load_quality_layer, scan_source)
+
+INDEX_FILE = os.path.join(STORE_DIR, 'reciprocal', 'index.json')
+BEST_SOURCE = 'best'
+PRIMARY_SOURCE = 'twelve_data'
+
+# Количество установленных битов для каждого значения uint8
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class ReciprocalIndex:
+    """Пары-зеркала: индексы сторон в universe.symbols и словарь быстрого поиска."""
+
+    def __init__(self, canonical: List[str], mirror: List[str],
+                 canonical_idx: np.ndarray, mirror_idx: np.ndarray):
+        self.canonical = list(canonical)      # K символов в канонической ориентации ('AUD/NZD')
+        self.mirror = list(mirror)            # K зеркальных символов ('NZD/AUD')
+        self.canonical_idx = np.asarray(canonical_idx, dtype=np.int32)
+        self.mirror_idx = np.asarray(mirror_idx, dtype=np.int32)
+        self.by_symbol: Dict[str, Tuple[int, bool]] = {}
+        for k, (a, b) in enumerate(zip(self.canonical, self.mirror)):
+            self.by_symbol[a] = (k, True)
+            self.by_symbol[b] = (k, False)
+
+    def __len__(self) -> int:
+        return len(self.canonical)
+
+    def lookup(self, symbol: str) -> Optional[Tuple[int, bool]]:
+        """Символ -> (номер пары-зеркала, True если символ в канонической ориентации)."""
+        return self.by_symbol.get(symbol)
+
+
+def build_index(universe: PairUniverse) -> ReciprocalIndex:
+    """Индекс пар-зеркал вселенной; каноническая сторона - с меньшей базовой валютой."""
+    couples = universe.reciprocal_pairs()
+    symbols = np.array(universe.symbols)
+    swap = symbols[couples[:, 0]] > symbols[couples[:, 1]]
+    canonical_idx = np.where(swap, couples[:, 1], couples[:, 0])
+    mirror_idx = np.where(swap, couples[:, 0], couples[:, 1])
+    return ReciprocalIndex([universe.symbols[i] for i in canonical_idx],
+                           [universe.symbols[i] for i in mirror_idx],
+                           canonical_idx, mirror_idx)
+
+
+def save_index(index: ReciprocalIndex, path: str = INDEX_FILE) -> None:
+    atomic_write_json(path, {'canonical': index.canonical, 'mirror': index.mirror,
+                             'canonical_idx': index.canonical_idx.tolist(),
+                             'mirror_idx': index.mirror_idx.tolist()})
+
+
+def load_index(universe: PairUniverse, path: str = INDEX_FILE) -> ReciprocalIndex:
+    """
+    Загружает сохраненный индекс; если его нет, он не читается (файл,
+    записанный до атомарной записи) или вселенная изменилась - строит заново.
+    """
+    data = None
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError:
+            data = None
+    if isinstance(data, dict) and {'canonical', 'mirror', 'canonical_idx', 'mirror_idx'} <= set(data):
+        index = ReciprocalIndex(data['canonical'], data['mirror'],
+                                data['canonical_idx'], data['mirror_idx'])
+        if index.canonical_idx.size and index.canonical_idx.max() < universe.n_pairs \
+                and [universe.symbols[i] for i in index.canonical_idx] == index.canonical \
+                and [universe.symbols[i] for i in index.mirror_idx] == index.mirror:
+            return index
+    index = build_index(universe)
+    save_index(index, path)
+    return index
+
+
+def reciprocal_deviation(close: np.ndarray, index: ReciprocalIndex) -> np.ndarray:
+    """log(close_A/B * close_B/A) для всех дат и всех пар-зеркал (T x K); NaN, если нет стороны."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.log(close[:, index.canonical_idx] * close[:, index.mirror_idx])
+
+
+def best_series(close: np.ndarray, flags: np.ndarray,
+                index: ReciprocalIndex) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Объединенный ряд в канонической ориентации (T x K) и сторона-источник
+    (0 - каноническая пара, 1 - обращенное зеркало, -1 - нет данных).
+    Выбирается сторона с меньшим числом флагов; при равенстве - каноническая.
+    """
+    direct = close[:, index.canonical_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverted = 1.0 / close[:, index.mirror_idx]
+    direct_ok = np.isfinite(direct) & (direct > 0)
+    inverted_ok = np.isfinite(inverted) & (inverted > 0)
+
+    direct_score = np.where(direct_ok, POPCOUNT[flags[:, index.canonical_idx]], 255)
+    inverted_score = np.where(inverted_ok, POPCOUNT[flags[:, index.mirror_idx]], 255)
+    use_inverted = inverted_score < direct_score
+
+    merged = np.where(use_inverted, inverted, direct)
+    side = np.where(use_inverted, 1, 0).astype(np.int8)
+    missing = ~direct_ok & ~inverted_ok
+    merged[missing] = np.nan
+    side[missing] = -1
+    return merged, side
+
+
+def publish_best_series(store: PairStore, days: np.ndarray, merged: np.ndarray,
+                        side: np.ndarray, index: ReciprocalIndex) -> int:
+    """Сохраняет объединенные ряды как источник 'best'. Возвращает число рядов."""
+    for k, symbol in enumerate(index.canonical):
+        present = side[:, k] >= 0
+        store.write_series(BEST_SOURCE, symbol, {
+            DATE_COLUMN: days[present],
+            'close': merged[present, k],
+            'side': side[present, k].astype(np.float64),
+        })
+    return len(index.canonical)
+
+
+def consistency_report(deviation: np.ndarray, side: np.ndarray,
+                       index: ReciprocalIndex, tolerance: float = RECIPROCAL_TOLERANCE) -> pd.DataFrame:
+    """Сводка по парам-зеркалам: дни с обеими сторонами, расхождения, дни из зеркала."""
+    both = np.isfinite(deviation)
+    abs_dev = np.where(both, np.abs(deviation), np.nan)
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            'canonical': index.canonical,
+            'mirror': index.mirror,
+            'days_both_sides': both.sum(axis=0),
+            'days_inconsistent': (abs_dev > tolerance).sum(axis=0),
+            'max_abs_log_deviation': np.where(both, abs_dev, 0.0).max(axis=0, initial=0.0),
+            'days_from_mirror': (side == 1).sum(axis=0),
+        })
+
+
+def main():
+    """Основная функция скрипта."""
+    print("🔁 ПАРЫ-ЗЕРКАЛА: ПРОВЕРКА И ОБЪЕДИНЕННЫЕ РЯДЫ")
+    print("=" * 60)
+
+    store = PairStore()
+    if not store.symbols(PRIMARY_SOURCE):
+        print("✗ В хранилище нет данных. Запустите scripts/initial_load/build_store.py")
+        return 1
+
+    universe = PairUniverse.from_config()
+    index = load_index(universe)
+    panel = build_panel(store, PRIMARY_SOURCE, universe.symbols)
+
+    if os.path.exists(os.path.join(QUALITY_DIR, PRIMARY_SOURCE, 'flags.npy')):
+        layer = load_quality_layer(PRIMARY_SOURCE)
+    else:
+        layer = scan_source(store, PRIMARY_SOURCE, universe)
+    flags = flags_panel(layer, panel.days, panel.symbols)
+
+    deviation = reciprocal_deviation(panel.values, index)
+    merged, side = best_series(panel.values, flags, index)
+    published = publish_best_series(store, panel.days, merged, side, index)
+
+    report = consistency_report(deviation, side, index)
+    os.makedirs('data/analytics', exist_ok=True)
+    report.to_csv('data/analytics/reciprocal_consistency.csv', index=False, encoding='utf-8-sig')
+
+    print(f"Пар-зеркал: {len(index.canonical)}")
+    print(report.sort_values('days_inconsistent', ascending=False).head(10).to_string(index=False))
+    print(f"\n✓ Объединенных рядов сохранено: {published} (источник '{BEST_SOURCE}')")
+    print("✓ Отчет: data/analytics/reciprocal_consistency.csv")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Сверка источников: Twelve Data против фиксингов ECB и курсов Frankfurter.
+
+ECB и Frankfurter публикуют курсы к EUR (1 EUR = r_X единиц X), поэтому для
+любой пары BASE/QUOTE из Twelve Data подразумеваемый курс равен r_QUOTE / r_BASE.
+Он считается для всей истории и всех пар одной операцией над матрицами
+(даты x валюты -> даты x пары); расхождения больше порога попадают в таблицу.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/reconciliation.py
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, days_to_dates
+from analysis.pair_universe import PairUniverse
+from analysis.panel import Panel, build_panel
+
+PRIMARY_SOURCE = 'twelve_data'
+EUR_SOURCES = ['ecb', 'frankfurter']
+EUR = 'EUR'
+# Порог расхождения по модулю логарифма отношения (~2%): фиксинг ECB
+# снимается в 14:15 CET, close Twelve Data - в конце дня
+DEFAULT_THRESHOLD = 0.02
+
+DISCREPANCIES_FILE = 'data/analytics/reconciliation_discrepancies.csv'
+SUMMARY_FILE = 'data/analytics/reconciliation_summary.csv'
+
+
+def eur_rate_matrix(store: PairStore, source: str, universe: PairUniverse,
+                    days: np.ndarray) -> np.ndarray:
+    """
+    Матрица курсов EUR -> валюта (даты x валюты вселенной) по календарю days.
+    Столбец EUR равен 1, валюты без данных источника - NaN.
+    """
+    symbols = [f"{EUR}/{c}" for c in universe.currencies if c != EUR]
+    panel = build_panel(store, source, symbols, days=days)
+
+    rates = np.full((len(days), universe.n_currencies), np.nan)
+    target = universe.currency_ids(s.split('/')[1] for s in symbols)
+    rates[:, target] = panel.values
+    if EUR in universe.currency_index:
+        rates[:, universe.currency_index[EUR]] = 1.0
+    return rates
+
+
+def implied_cross_rates(eur_rates: np.ndarray, universe: PairUniverse) -> np.ndarray:
+    """Подразумеваемые курсы всех пар вселенной: r_QUOTE / r_BASE (даты x пары)."""
+    return eur_rates[:, universe.quote_idx] / eur_rates[:, universe.base_idx]
+
+
+def reconcile(store: PairStore, universe: PairUniverse,
+              sources: List[str] = EUR_SOURCES,
+              threshold: float = DEFAULT_THRESHOLD,
+              primary: Optional[Panel] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Сравнивает основной источник с EUR-источниками за всю историю.
+    Возвращает (таблица расхождений, сводка по парам и источникам).
+    """
+    if primary is None:
+        primary = build_panel(store, PRIMARY_SOURCE, universe.symbols)
+
+    discrepancy_parts = []
+    summary_parts = []
+    for source in sources:
+        if not store.symbols(source):
+            continue
+        implied = implied_cross_rates(eur_rate_matrix(store, source, universe, primary.days), universe)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.log(primary.values / implied)
+        compared = np.isfinite(deviation)
+        flagged = compared & (np.abs(deviation) > threshold)
+
+        rows, cols = np.nonzero(flagged)
+        discrepancy_parts.append(pd.DataFrame({
+            'date': days_to_dates(primary.days[rows]),
+            'symbol': np.asarray(primary.symbols)[cols],
+            'source': source,
+            'primary_close': primary.values[rows, cols],
+            'implied_close': implied[rows, cols],
+            'log_deviation': deviation[rows, cols],
+        }))
+
+        abs_dev = np.where(compared, np.abs(deviation), np.nan)
+        n_compared = compared.sum(axis=0)
+        has_data = n_compared > 0
+        summary_parts.append(pd.DataFrame({
+            'symbol': np.asarray(primary.symbols)[has_data],
+            'source': source,
+            'days_compared': n_compared[has_data],
+            'days_flagged': flagged.sum(axis=0)[has_data],
+            'median_abs_deviation': np.nanmedian(abs_dev[:, has_data], axis=0),
+            'max_abs_deviation': np.nanmax(abs_dev[:, has_data], axis=0),
+        }))
+
+    discrepancies = pd.concat(discrepancy_parts, ignore_index=True) if discrepancy_parts else pd.DataFrame()
+    summary = pd.concat(summary_parts, ignore_index=True) if summary_parts else pd.DataFrame()
+    if not discrepancies.empty:
+        discrepancies = discrepancies.sort_values(['symbol', 'date', 'source']).reset_index(drop=True)
+    return discrepancies, summary
+
+
+def main():
+    """Основная функция скрипта."""
+    print("🔎 СВЕРКА ИСТОЧНИКОВ: Twelve Data / ECB / Frankfurter")
+    print("=" * 60)
+
+    store = PairStore()
+    universe = PairUniverse.from_config()
+    available = [s for s in EUR_SOURCES if store.symbols(s)]
+    if not store.symbols(PRIMARY_SOURCE) or not available:
+        print("✗ В хранилище нет данных для сверки.")
+        print("  Запустите scripts/initial_load/build_store.py")
+        return 1
+
+    discrepancies, summary = reconcile(store, universe, available)
+
+    os.makedirs('data/analytics', exist_ok=True)
+    discrepancies.to_csv(DISCREPANCIES_FILE, index=False, encoding='utf-8-sig')
+    summary.to_csv(SUMMARY_FILE, index=False, encoding='utf-8-sig')
+
+    print(f"Источники сверки: {', '.join(available)}")
+    print(f"Пар сопоставлено: {summary['symbol'].nunique() if not summary.empty else 0}")
+    print(f"Расхождений > {DEFAULT_THRESHOLD:.0%}: {len(discrepancies)}")
+    if not summary.empty:
+        worst = summary.sort_values('days_flagged', ascending=False).head(10)
+        print("\nПАРЫ С НАИБОЛЬШИМ ЧИСЛОМ РАСХОЖДЕНИЙ:")
+        print(worst.to_string(index=False))
+    print(f"\n✓ Таблица расхождений: {DISCREPANCIES_FILE}")
+    print(f"✓ Сводка: {SUMMARY_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
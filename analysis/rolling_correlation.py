@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Скользящие корреляции доходностей абсолютных курсов (C x C на каждую дату).
+
+Для окна из W доходностей на каждую дату нужны попарные суммы по строкам,
+где обе валюты наблюдались (pairwise complete, как в pandas):
+    N = M'M,  A = X'M,  Q = (X^2)'M,  P = X'X,
+где X - доходности с нулями вместо NaN, M - маска наблюдений. Суммы окна -
+разность кумулятивных сумм внешних произведений строк, поэтому переход от
+окна к окну стоит O(C^2) без пересчета всего окна. Блок дат [start, end)
+зависит только от строк [start - W, end), поэтому блоки независимы:
+они считаются в пуле процессов и пишутся прямо в общий тензор .npy
+(open_memmap), а абсолютные курсы читаются воркерами через memory-mapping.
+Запускать ИЗ КОРНЯ ПРОЕКТА: python analysis/rolling_correlation.py --window 63
+"""
+
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from analysis.absolute_rates import ABSOLUTE_DIR, load_absolute_rates
+
+OUTPUT_DIR = os.path.join('data', 'analytics', 'rolling_correlation')
+DEFAULT_WINDOW = 63        # ~3 месяца торговых дней
+BLOCK_DAYS = 128         # блок ~ (128 + W) x C x C помещается в кэш лучше больших
+OUTPUT_DTYPE = np.float32
+
+
+def log_returns(log_rates: np.ndarray) -> np.ndarray:
+    """Доходности по соседним датам календаря; первая строка и пропуски - NaN."""
+    returns = np.full(log_rates.shape, np.nan)
+    returns[1:] = np.diff(np.asarray(log_rates, dtype=np.float64), axis=0)
+    return returns
+
+
+def window_sums(returns: np.ndarray, window: int) -> Tuple[np.ndarray, ...]:
+    """
+    Суммы N, A, Q, P (каждая L x C x C) для окон, заканчивающихся на строках
+    returns[window - 1:]: окно строки t - строки t - window + 1 .. t.
+    """
+    mask = np.isfinite(returns)
+    x = np.where(mask, returns, 0.0)
+    m = mask.astype(np.float64)
+
+    def rolling(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        cumulative = np.zeros((len(left) + 1, left.shape[1], right.shape[1]))
+        np.cumsum(np.einsum('ti,tj->tij', left, right), axis=0, out=cumulative[1:])
+        return cumulative[window:] - cumulative[:-window]
+
+    return rolling(m, m), rolling(x, m), rolling(x * x, m), rolling(x, x)
+
+
+def correlation_block(returns: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """Корреляции (L x C x C) для окон блока; меньше min_periods общих наблюдений - NaN."""
+    n, a, q, p = window_sums(returns, window)
+    at = np.swapaxes(a, 1, 2)
+    qt = np.swapaxes(q, 1, 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        numerator = n * p - a * at
+        variance_i = n * q - a * a
+        variance_j = n * qt - at * at
+        corr = numerator / np.sqrt(variance_i * variance_j)
+    corr[(n < min_periods) | (variance_i <= 0) | (variance_j <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def returns_rows(log_rates: np.ndarray, lo: int, end: int) -> np.ndarray:
+    """
+    Доходности строк [lo, end) календаря; для lo < 0 в начале добавляются
+    строки NaN. Читается только срез log_rates[lo - 1:end].
+    """
+    first = max(lo - 1, 0)
+    returns = log_returns(log_rates[first:end])
+    if lo >= 1:
+        returns = returns[1:]
+    if lo < 0:
+        returns = np.vstack([np.full((-lo, log_rates.shape[1]), np.nan), returns])
+    return returns
+
+
+def compute_block(args: Tuple[str, str, int, int, int, int]) -> int:
+    """
+    Воркер: читает абсолютные курсы (memory-mapped), считает корреляции
+    для дат [start, end) и пишет их в общий тензор. Возвращает число дат.
+    """
+    rates_dir, output_path, start, end, window, min_periods = args
+    log_rates = load_absolute_rates(rates_dir).log_rates
+    returns = returns_rows(log_rates, start - window + 1, end)
+    corr = correlation_block(returns, window, min_periods)
+    tensor = np.load(output_path, mmap_mode='r+')
+    tensor[start:end] = corr.astype(tensor.dtype)
+    tensor.flush()
+    return end - start
+
+
+def rolling_correlations(rates_dir: str = ABSOLUTE_DIR, output_dir: str = OUTPUT_DIR,
+                         window: int = DEFAULT_WINDOW, min_periods: Optional[int] = None,
+                         block_days: int = BLOCK_DAYS, workers: Optional[int] = None) -> str:
+    """
+    Считает тензор корреляций (T x C x C) по всей истории абсолютных курсов.
+    Блоки дат распределяются по пулу процессов (workers=1 - без пула).
+    Возвращает путь к тензору.
+    """
+    rates = load_absolute_rates(rates_dir)
+    n_days, n_currencies = rates.log_rates.shape
+    min_periods = window if min_periods is None else min_periods
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f'corr_w{window}.npy')
+    tensor = np.lib.format.open_memmap(output_path, mode='w+', dtype=OUTPUT_DTYPE,
+                                       shape=(n_days, n_currencies, n_currencies))
+    del tensor
+    np.save(os.path.join(output_dir, 'datetime.npy'), np.asarray(rates.days))
+    with open(os.path.join(output_dir, f'corr_w{window}.json'), 'w', encoding='utf-8') as f:
+        json.dump({'currencies': rates.currencies, 'window': window, 'min_periods': min_periods,
+                   'rows': int(n_days), 'updated_at': datetime.now().isoformat()},
+                  f, indent=2, ensure_ascii=False)
+
+    tasks = [(rates_dir, output_path, start, min(start + block_days, n_days), window, min_periods)
+             for start in range(0, n_days, block_days)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for task in tasks:
+            compute_block(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(compute_block, tasks))
+    return output_path
+
+
+def load_correlations(window: int = DEFAULT_WINDOW, output_dir: str = OUTPUT_DIR
+                      ) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """(даты, валюты, тензор корреляций) - тензор memory-mapped."""
+    with open(os.path.join(output_dir, f'corr_w{window}.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return (np.load(os.path.join(output_dir, 'datetime.npy'), mmap_mode='r'),
+            meta['currencies'],
+            np.load(os.path.join(output_dir, f'corr_w{window}.npy'), mmap_mode='r'))
+
+
+def main():
+    """Основная функция скрипта."""
+    parser = argparse.ArgumentParser(description="Скользящие корреляции абсолютных курсов")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW)
+    parser.add_argument('--min-periods', type=int)
+    parser.add_argument('--workers', type=int, help="Процессов в пуле (по умолчанию - число ядер)")
+    parser.add_argument('--block-days', type=int, default=BLOCK_DAYS)
+    args = parser.parse_args()
+
+    print("📈 СКОЛЬЗЯЩИЕ КОРРЕЛЯЦИИ АБСОЛЮТНЫХ КУРСОВ")
+    print("=" * 60)
+    if not os.path.exists(os.path.join(ABSOLUTE_DIR, 'meta.json')):
+        print("✗ Нет абсолютных курсов. Запустите analysis/absolute_rates.py")
+        return 1
+
+    started = datetime.now()
+    path = rolling_correlations(window=args.window, min_periods=args.min_periods,
+                                block_days=args.block_days, workers=args.workers)
+    days, currencies, tensor = load_correlations(args.window)
+    print(f"Окно: {args.window}, дат: {len(days)}, валют: {len(currencies)}")
+    print(f"Время: {(datetime.now() - started).total_seconds():.1f} сек")
+    print(f"✓ Тензор: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Воспроизводимые бенчмарки AbsCur3 (без сети).
+
+Реальные данные: 140 CSV из data/raw/twelve_data/pairs, из которых во
+временном каталоге собирается бинарное хранилище. Синтетика (фиксированный
+seed): 1000 пар на случайных блужданиях абсолютных курсов и тиковый ряд.
+Случаи:
+  csv_load / binary_load    - загрузка 140 пар из CSV и из хранилища;
+  compressed_load           - то же из сжатого хранилища (.zd, storage/codec.py);
+  panel_build / alignment   - панель (даты x пары) и as-of выравнивание;
+  absolute_solve            - решение абсолютных курсов;
+  cross_lookup              - 1 млн запросов кросс-курса (дата, база, котировка);
+  graph_metrics             - центральности графа пар (как graph_analysis.py);
+  synthetic_*               - те же операции на синтетике.
+Результаты - JSON в benchmarks/results/ (коммит, версии, min/median по повторам);
+--compare показывает отношение к предыдущему прогону.
+Запуск из корня проекта:
+  python benchmarks/run_benchmarks.py [--quick] [--only csv_load,panel_build] [--compare FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, DATE_COLUMN
+from sources import twelve_data
+from analysis.pair_universe import PairUniverse
+from analysis.alignment import ASOF, align_asof, align_many, master_calendar
+from analysis.absolute_rates import (build_universe, collect_observations, panel_observations,
+                                     solve_absolute_rates)
+from analysis.panel import Panel, build_panel
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+SEED = 20240101
+
+SYNTHETIC_PAIRS = 1000
+SYNTHETIC_CURRENCIES = 150
+SYNTHETIC_DAYS = 5000
+TICKS = 5_000_000              # ~3 месяца тиков одной пары
+CROSS_LOOKUPS = 1_000_000
+
+
+class Case:
+    """Один бенчмарк: подготовка (не замеряется) и замеряемая функция."""
+
+    def __init__(self, name: str, run: Callable[[], object], params: Optional[Dict] = None):
+        self.name = name
+        self.run = run
+        self.params = params or {}
+
+
+def measure(case: Case, repeat: int) -> Dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - started)
+    return {
+        'min_sec': round(min(timings), 6),
+        'median_sec': round(float(np.median(timings)), 6),
+        'repeat': repeat,
+        'params': case.params,
+    }
+
+
+# --- Реальные данные ---
+
+def real_cases(work_dir: str, pairs_dir: str) -> List[Case]:
+    store = PairStore(os.path.join(work_dir, 'store'))
+    twelve_data.import_pairs_csv(store, pairs_dir)
+    universe = PairUniverse.from_config()
+    symbols = [s for s in universe.symbols if store.has_series(twelve_data.SOURCE_NAME, s)]
+    csv_files = [os.path.join(pairs_dir, f) for f in sorted(os.listdir(pairs_dir)) if f.endswith('.csv')]
+
+    def csv_load():
+        return [twelve_data.load_pair_csv(path) for path in csv_files]
+
+    def binary_load():
+        return [store.read_series(twelve_data.SOURCE_NAME, s, mmap=False) for s in symbols]
+
+    compressed = PairStore(os.path.join(work_dir, 'store_zd'), compressed=True)
+    twelve_data.import_pairs_csv(compressed, pairs_dir)
+
+    def compressed_load():
+        return [compressed.read_series(twelve_data.SOURCE_NAME, s) for s in symbols]
+
+    panel = build_panel(store, twelve_data.SOURCE_NAME, symbols)
+    series = [(d[DATE_COLUMN], d['close']) for d in binary_load()]
+    calendar = master_calendar([days for days, _ in series])
+
+    solve_universe = build_universe(store, [twelve_data.SOURCE_NAME])
+    days, obs = collect_observations(store, solve_universe, [twelve_data.SOURCE_NAME], quality_dir=None)
+    log_rates = solve_absolute_rates(obs, len(days), solve_universe.n_currencies)
+
+    return [
+        Case('csv_load', csv_load, {'files': len(csv_files)}),
+        Case('binary_load', binary_load, {'series': len(symbols), 'bytes': directory_size(store.root)}),
+        Case('compressed_load', compressed_load,
+             {'series': len(symbols), 'bytes': directory_size(compressed.root)}),
+        Case('panel_build', lambda: build_panel(store, twelve_data.SOURCE_NAME, symbols),
+             {'shape': list(panel.values.shape)}),
+        Case('alignment_asof', lambda: align_many(calendar, series, ASOF, 5),
+             {'calendar': len(calendar), 'series': len(series)}),
+        Case('absolute_solve', lambda: solve_absolute_rates(obs, len(days), solve_universe.n_currencies),
+             {'days': len(days), 'currencies': solve_universe.n_currencies, 'observations': len(obs.day_idx)}),
+        cross_lookup_case('cross_lookup', log_rates),
+        graph_case('graph_metrics', symbols),
+    ]
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def cross_lookup_case(name: str, log_rates: np.ndarray) -> Case:
+    """Кросс-курсы exp(x[t, b] - x[t, q]) для случайных запросов (дата, база, котировка)."""
+    rng = np.random.default_rng(SEED)
+    n_days, n_currencies = log_rates.shape
+    t = rng.integers(0, n_days, CROSS_LOOKUPS)
+    b = rng.integers(0, n_currencies, CROSS_LOOKUPS)
+    q = rng.integers(0, n_currencies, CROSS_LOOKUPS)
+    return Case(name, lambda: np.exp(log_rates[t, b] - log_rates[t, q]), {'lookups': CROSS_LOOKUPS})
+
+
+def graph_case(name: str, symbols: List[str]) -> Case:
+    """Центральности графа пар - те же метрики, что в analysis/graph_analysis.py."""
+    import networkx as nx
+
+    def metrics():
+        graph = nx.Graph()
+        graph.add_edges_from(tuple(s.split('/')) for s in symbols)
+        return (nx.degree_centrality(graph), nx.betweenness_centrality(graph),
+                nx.closeness_centrality(graph))
+
+    return Case(name, metrics, {'edges': len(symbols)})
+
+
+# --- Синтетика ---
+
+def synthetic_panel(n_pairs: int, n_currencies: int, n_days: int):
+    """Панель n_pairs пар из случайных блужданий абсолютных курсов, ~5% пропусков."""
+    rng = np.random.default_rng(SEED)
+    log_rates = np.cumsum(rng.normal(0, 0.005, (n_days, n_currencies)), axis=0)
+    codes = [f"C{i:03d}" for i in range(n_currencies)]
+    couples = set()
+    while len(couples) < n_pairs:
+        b, q = rng.integers(0, n_currencies, 2)
+        if b != q:
+            couples.add((int(b), int(q)))
+    couples = sorted(couples)
+    base = np.array([b for b, _ in couples])
+    quote = np.array([q for _, q in couples])
+    values = np.exp(log_rates[:, base] - log_rates[:, quote])
+    values[rng.random(values.shape) < 0.05] = np.nan
+    symbols = [f"{codes[b]}/{codes[q]}" for b, q in couples]
+    days = np.arange(n_days, dtype=np.int32)
+    return Panel(days, symbols, values), PairUniverse(symbols)
+
+
+def synthetic_cases(quick: bool) -> List[Case]:
+    n_days = SYNTHETIC_DAYS // 5 if quick else SYNTHETIC_DAYS
+    panel, universe = synthetic_panel(SYNTHETIC_PAIRS, SYNTHETIC_CURRENCIES, n_days)
+    obs = panel_observations(panel, universe, 'synthetic', lambda source, symbol: 1.0)
+    log_rates = solve_absolute_rates(obs, len(panel.days), universe.n_currencies)
+    series = [(panel.days[np.isfinite(panel.values[:, j])], panel.values[np.isfinite(panel.values[:, j]), j])
+              for j in range(len(panel.symbols))]
+
+    n_ticks = TICKS // 10 if quick else TICKS
+    rng = np.random.default_rng(SEED)
+    # Тики: секунды с неравными интервалами; сетка - минуты (as-of последней цены)
+    tick_times = np.cumsum(rng.exponential(1.5, n_ticks)).astype(np.int64)
+    tick_prices = np.exp(np.cumsum(rng.normal(0, 1e-5, n_ticks)))
+    minute_grid = np.arange(0, tick_times[-1], 60, dtype=np.int64)
+
+    params = {'pairs': SYNTHETIC_PAIRS, 'currencies': SYNTHETIC_CURRENCIES, 'days': n_days}
+    return [
+        Case('synthetic_panel_observations',
+             lambda: panel_observations(panel, universe, 'synthetic', lambda source, symbol: 1.0), params),
+        Case('synthetic_alignment_asof', lambda: align_many(panel.days, series, ASOF, 5), params),
+        Case('synthetic_absolute_solve',
+             lambda: solve_absolute_rates(obs, len(panel.days), universe.n_currencies),
+             {**params, 'observations': len(obs.day_idx)}),
+        cross_lookup_case('synthetic_cross_lookup', log_rates),
+        graph_case('synthetic_graph_metrics', panel.symbols),
+        Case('tick_asof_minutes', lambda: align_asof(minute_grid, tick_times, tick_prices, 300),
+             {'ticks': n_ticks, 'minutes': len(minute_grid)}),
+    ]
+
+
+# --- Запуск ---
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, previous_path: str) -> None:
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nСравнение с {previous_path} (коммит {previous.get('commit')}):")
+    for name, result in results['results'].items():
+        old = previous['results'].get(name)
+        if old:
+            ratio = result['min_sec'] / old['min_sec'] if old['min_sec'] else float('inf')
+            mark = '⚠️ ' if ratio > 1.2 else '  '
+            print(f"{mark}{name:32} {old['min_sec']:10.4f} -> {result['min_sec']:10.4f} сек  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки AbsCur3")
+    parser.add_argument('--quick', action='store_true', help="Меньше повторов и масштаб синтетики")
+    parser.add_argument('--repeat', type=int, help="Повторов на случай (по умолчанию 5, --quick: 2)")
+    parser.add_argument('--only', help="Список случаев через запятую")
+    parser.add_argument('--pairs-dir', default=twelve_data.PAIRS_DIR)
+    parser.add_argument('--compare', help="JSON предыдущего прогона")
+    parser.add_argument('--output', help="Файл результата (по умолчанию benchmarks/results/...)")
+    args = parser.parse_args()
+
+    repeat = args.repeat or (2 if args.quick else 5)
+    only = set(args.only.split(',')) if args.only else None
+
+    print("⏱️  БЕНЧМАРКИ ABSCUR3")
+    print("=" * 60)
+    work_dir = tempfile.mkdtemp(prefix='abscur3_bench_')
+    try:
+        cases = real_cases(work_dir, args.pairs_dir) + synthetic_cases(args.quick)
+        results = {}
+        for case in cases:
+            if only and case.name not in only:
+                continue
+            results[case.name] = measure(case, repeat)
+            print(f"  {case.name:32} min {results[case.name]['min_sec']:10.4f} сек   "
+                  f"median {results[case.name]['median_sec']:10.4f} сек")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'quick': args.quick,
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Результаты: {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+Корзины для нормировки абсолютных курсов (analysis/numeraire.py).
+
+Решатель определяет лог-курсы с точностью до общего сдвига на дату;
+нормировка выбирает этот сдвиг так, чтобы взвешенная сумма лог-курсов
+корзины была равна нулю. Веса не обязаны давать в сумме 1: они
+нормируются по валютам, у которых есть курс на дату.
+"""
+
+# Номинальный ВВП 2023 года, трлн USD (IMF WEO, округлено).
+# EUR - суммарно по еврозоне.
+GDP_WEIGHTS = {
+    'USD': 27.36, 'CNY': 17.79, 'EUR': 15.52, 'JPY': 4.21, 'INR': 3.57,
+    'GBP': 3.34, 'BRL': 2.17, 'CAD': 2.14, 'RUB': 2.02, 'AUD': 1.72,
+    'IDR': 1.37, 'TRY': 1.11, 'CHF': 0.88, 'PLN': 0.81, 'ILS': 0.51,
+    'SGD': 0.50, 'THB': 0.51, 'PHP': 0.44, 'MYR': 0.40, 'VND': 0.43,
+    'COP': 0.36, 'CZK': 0.33, 'PEN': 0.27, 'KZT': 0.26, 'NZD': 0.25,
+    'IQD': 0.25, 'HUF': 0.21, 'UAH': 0.18, 'KWD': 0.16, 'BGN': 0.10,
+}
+
+# Доли валют в корзине SDR (МВФ, пересмотр 2022 года)
+SDR_WEIGHTS = {
+    'USD': 0.4338, 'EUR': 0.2931, 'CNY': 0.1228, 'JPY': 0.0759, 'GBP': 0.0744,
+}
+
+# Именованные корзины; 'geometric' (все валюты поровну) и 'numeraire:<КОД>'
+# строятся автоматически.
+BASKETS = {
+    'gdp': GDP_WEIGHTS,
+    'sdr': SDR_WEIGHTS,
+}
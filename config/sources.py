@@ -0,0 +1,30 @@
+"""
+Конфигурация источников курсов для проекта AbsCur3.
+Веса используются решателем абсолютных курсов (analysis/absolute_rates.py):
+каждое наблюдение пары входит в систему наименьших квадратов с весом
+SOURCE_WEIGHTS[источник] * PAIR_WEIGHTS.get((источник, пара), 1.0).
+"""
+
+# Все источники, которые решатель умеет читать из data/store
+ALL_SOURCES = ['twelve_data', 'ecb', 'frankfurter', 'exchangerate_api']
+
+# Базовый вес наблюдения источника
+SOURCE_WEIGHTS = {
+    'twelve_data': 1.0,   # рыночные close, основной источник
+    'ecb': 2.0,           # официальный фиксинг, высокая надежность
+    'frankfurter': 1.0,   # повторяет ECB, поэтому вес ниже
+    'exchangerate_api': 0.5,  # один агрегированный снимок в день
+}
+
+# Поправочные множители для отдельных пар: (источник, пара) -> множитель.
+# 0.0 полностью исключает пару источника из решения.
+PAIR_WEIGHTS = {
+    ('twelve_data', 'IRR/USD'): 0.1,   # официальный курс сильно расходится с рынком
+    ('twelve_data', 'SYP/USD'): 0.1,
+    ('twelve_data', 'USD/VES'): 0.1,
+}
+
+
+def observation_weight(source, symbol):
+    """Итоговый вес наблюдения пары symbol из источника source."""
+    return SOURCE_WEIGHTS.get(source, 1.0) * PAIR_WEIGHTS.get((source, symbol), 1.0)
@@ -0,0 +1,76 @@
+"""
+Ежедневное обновление дополнительных источников (ECB, Frankfurter,
+ExchangeRate-API) в хранилище.
+Использует условные запросы и кэш data/cache/http: если источник не изменился,
+данные не скачиваются и не разбираются повторно; записи кэша, не
+обновлявшиеся дольше CACHE_MAX_AGE_DAYS, удаляются. ExchangeRate-API - один
+снимок от USD в день (нужен EXCHANGERATE_API_KEY в .env). Агрегаты
+(неделя/месяц/год), доходности и волатильности обновленных рядов
+пересчитываются инкрементально.
+Запуск из корня проекта: python scripts/daily_update/refresh_sources.py
+"""
+
+import os
+import sys
+import logging
+from dotenv import load_dotenv
+
+# Корень проекта (текущая директория) в sys.path для импорта storage/sources
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore
+from storage.aggregates import update_source_aggregates
+from storage.derived import update_source_derived
+from sources.http_cache import ConditionalFetcher
+from sources import ecb, frankfurter, exchangerate_api
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    store = PairStore()
+    fetcher = ConditionalFetcher()
+    logger.info(f"Хранилище: {store.root}, кэш HTTP: {fetcher.cache_dir}")
+
+    updaters = [
+        ('ECB', ecb.SOURCE_NAME, ecb.update_ecb),
+        ('Frankfurter', frankfurter.SOURCE_NAME, frankfurter.update_frankfurter),
+    ]
+    api_key = os.getenv('EXCHANGERATE_API_KEY')
+    if api_key:
+        session = exchangerate_api.make_session()
+        updaters.append(('ExchangeRate-API', exchangerate_api.SOURCE_NAME, lambda store, _fetcher: exchangerate_api.update_exchangerate_api(
+            store, session, api_key)))
+    else:
+        logger.info("EXCHANGERATE_API_KEY не задан, ExchangeRate-API пропущен")
+    failed = []
+    for name, source, update in updaters:
+        try:
+            added = update(store, fetcher)
+            logger.info(f"{name}: +{sum(added.values())} строк")
+            changed = [symbol for symbol, rows in added.items() if rows]
+            if changed:
+                periods = update_source_aggregates(store, source, changed)
+                logger.info(f"{name}: агрегаты обновлены, {periods} периодов")
+                rows = update_source_derived(store, source, changed)
+                logger.info(f"{name}: доходности и волатильности, +{rows} строк")
+        except Exception as e:
+            logger.error(f"{name}: ошибка обновления: {e}")
+            failed.append(name)
+
+    fetcher.prune()
+
+    if failed:
+        logger.error(f"Не обновлены источники: {failed}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
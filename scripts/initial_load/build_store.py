@@ -0,0 +1,70 @@
+"""
+Наполнение колоночного хранилища data/store.
+  - Twelve Data: перенос CSV из data/raw/twelve_data/pairs;
+  - ECB: потоковый разбор eurofxref-hist.xml (URL или локальный файл);
+  - недельные/месячные/годовые агрегаты загруженных рядов (storage/aggregates.py);
+  - лог-доходности и волатильности загруженных рядов (storage/derived.py).
+Запуск из корня проекта:
+  python scripts/initial_load/build_store.py                 # оба источника
+  python scripts/initial_load/build_store.py --ecb-file hist.xml
+  python scripts/initial_load/build_store.py --skip-ecb
+  python scripts/initial_load/build_store.py --compressed    # колонки в формате .zd
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Корень проекта (текущая директория) в sys.path для импорта storage/sources
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, STORE_DIR
+from storage.aggregates import update_source_aggregates
+from storage.derived import update_source_derived
+from sources import twelve_data, ecb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Наполнение колоночного хранилища AbsCur3")
+    parser.add_argument('--store', default=STORE_DIR, help="Каталог хранилища")
+    parser.add_argument('--ecb-file', help="Локальный eurofxref-hist.xml вместо загрузки")
+    parser.add_argument('--skip-twelve-data', action='store_true')
+    parser.add_argument('--skip-ecb', action='store_true')
+    parser.add_argument('--compressed', action='store_true',
+                        help="Сжатые колонки (storage/codec.py) вместо .npy")
+    args = parser.parse_args()
+
+    store = PairStore(args.store, compressed=args.compressed)
+    aggregates_root = os.path.join(args.store, 'aggregates')
+    derived_root = os.path.join(args.store, 'derived')
+    print(f"📁 Хранилище: {store.root}")
+
+    if not args.skip_twelve_data:
+        started = time.perf_counter()
+        imported = twelve_data.import_pairs_csv(store)
+        print(f"✅ Twelve Data: {len(imported)} пар, {sum(imported.values())} строк "
+              f"за {time.perf_counter() - started:.1f} сек")
+        periods = update_source_aggregates(store, twelve_data.SOURCE_NAME, list(imported), root=aggregates_root)
+        print(f"✅ Агрегаты Twelve Data: {periods} периодов")
+        rows = update_source_derived(store, twelve_data.SOURCE_NAME, list(imported), root=derived_root)
+        print(f"✅ Доходности и волатильности Twelve Data: {rows} строк")
+
+    if not args.skip_ecb:
+        started = time.perf_counter()
+        if args.ecb_file:
+            stream = args.ecb_file
+        else:
+            print(f"⏬ Потоковая загрузка: {ecb.ECB_HISTORICAL_XML_URL}")
+            stream = ecb.open_ecb_stream()
+        ingested = ecb.ingest_ecb_history(store, stream)
+        print(f"✅ ECB: {len(ingested)} пар, {sum(ingested.values())} строк "
+              f"за {time.perf_counter() - started:.1f} сек")
+        periods = update_source_aggregates(store, ecb.SOURCE_NAME, list(ingested), root=aggregates_root)
+        print(f"✅ Агрегаты ECB: {periods} периодов")
+        rows = update_source_derived(store, ecb.SOURCE_NAME, list(ingested), root=derived_root)
+        print(f"✅ Доходности и волатильности ECB: {rows} строк")
+
+
+if __name__ == '__main__':
+    main()
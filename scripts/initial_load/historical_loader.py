@@ -2,20 +2,31 @@ import requests
 import time
 import json
 import os
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import csv
+import argparse
 import logging
+import numpy as np
 
 
 # --- Конфигурация ---
 load_dotenv()  # Загружает переменные из .env
 API_KEY = os.getenv('TWELVE_DATA_API_KEY')
 BASE_URL = 'https://api.twelvedata.com'
-INTERVAL = '1day'  # Дневные данные
+INTERVAL = '1day'  # Дневные данные; внутридневные задаются --interval
 
 # Предполагаем, что скрипт запускается из корня проекта
 PROJECT_ROOT = os.getcwd()
+sys.path.insert(0, PROJECT_ROOT)
+
+from storage.pair_store import PairStore, DATE_COLUMN, PRICE_COLUMNS, days_to_dates, merge_sorted, sort_unique
+from storage.aggregates import update_source_aggregates
+from storage.derived import update_source_derived
+from storage.snapshots import SnapshotWriter
+from storage.intraday_store import IntradayStore, INTERVAL_SECONDS, TIME_COLUMN
+from sources import twelve_data
 
 # Лимиты сервиса (Basic Plan)
 REQUESTS_PER_MINUTE_LIMIT = 8
@@ -28,6 +39,7 @@ DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'twelve_data', 'pairs')
 METADATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'twelve_data', 'metadata')
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(METADATA_DIR, exist_ok=True)
+snapshots = SnapshotWriter(DATA_DIR)
 EARLIEST_DATES_FILE = os.path.join(METADATA_DIR, 'earliest_dates.json')
 
 # Путь для логов
@@ -78,10 +90,11 @@ def load_currency_config():
         return []
 
 # --- Утилиты для работы с API ---
-def make_request(endpoint, params, request_type='history'):
+def make_request(endpoint, params, request_type='history', response_format='json'):
     """
     Универсальная функция для выполнения запроса с контролем лимитов.
-    Возвращает JSON-ответ или None в случае ошибки.
+    Возвращает JSON-ответ (response_format='json') или тело ответа в байтах
+    (response_format='csv'); None в случае ошибки.
     """
     url = f'{BASE_URL}{endpoint}'
     all_params = {'apikey': API_KEY, **params}
@@ -103,9 +116,22 @@ def make_request(endpoint, params, request_type='history'):
                 logger.error(f"Ошибка HTTP {response.status_code} для {params.get('symbol', '')}: {response.text}")
                 return None
 
-            data = response.json()
-            if data.get('status') == 'error':
-                logger.error(f"Ошибка API для {params.get('symbol', '')}: {data.get('message')}")
+            # Ошибки API приходят в JSON даже при format=CSV
+            if response_format == 'csv' and not response.content.lstrip().startswith(b'{'):
+                return response.content
+
+            try:
+                data = response.json()
+            except ValueError:
+                logger.error(f"Некорректный JSON-ответ для {params.get('symbol', '')}: {response.text[:200]}")
+                return None
+            if not isinstance(data, dict) or data.get('status') == 'error':
+                message = data.get('message') if isinstance(data, dict) else data
+                logger.error(f"Ошибка API для {params.get('symbol', '')}: {message}")
+                return None
+            if response_format == 'csv':
+                # Вместо CSV пришел JSON без статуса ошибки - разбирать нечего
+                logger.error(f"Ожидался CSV, получен JSON для {params.get('symbol', '')}: {response.text[:200]}")
                 return None
 
             return data
@@ -120,13 +146,14 @@ def get_earliest_timestamp(symbol):
     Определяет самую раннюю доступную дату для пары.
     Использует эндпоинт /earliest_timestamp [citation:3].
     """
-    # Сначала проверяем кэш
+    # Сначала проверяем кэш (для внутридневных интервалов ключ включает интервал)
+    cache_key = symbol if INTERVAL == '1day' else f'{symbol}@{INTERVAL}'
     if os.path.exists(EARLIEST_DATES_FILE):
         with open(EARLIEST_DATES_FILE, 'r') as f:
             cache = json.load(f)
-            if symbol in cache:
-                logger.info(f"Ранняя дата для {symbol} найдена в кэше: {cache[symbol]}")
-                return cache[symbol]
+            if cache_key in cache:
+                logger.info(f"Ранняя дата для {cache_key} найдена в кэше: {cache[cache_key]}")
+                return cache[cache_key]
 
     logger.info(f"Запрос самой ранней даты для {symbol}...")
     params = {'symbol': symbol, 'interval': INTERVAL}
@@ -139,7 +166,7 @@ def get_earliest_timestamp(symbol):
         if os.path.exists(EARLIEST_DATES_FILE):
             with open(EARLIEST_DATES_FILE, 'r') as f:
                 cache = json.load(f)
-        cache[symbol] = earliest_date
+        cache[cache_key] = earliest_date
         with open(EARLIEST_DATES_FILE, 'w') as f:
             json.dump(cache, f, indent=2)
         logger.info(f"Самая ранняя дата для {symbol}: {earliest_date}")
@@ -151,7 +178,10 @@ def get_earliest_timestamp(symbol):
 def fetch_historical_chunk(symbol, start_date, end_date):
     """
     Загружает исторические данные за указанный период.
-    Параметры start_date и end_date должны быть строкой в формате 'YYYY-MM-DD'.
+    Параметры start_date и end_date должны быть строкой в формате 'YYYY-MM-DD'
+    (для внутридневных интервалов - 'YYYY-MM-DD HH:MM:SS').
+    Ответ запрашивается в CSV и разбирается сразу в колонки numpy
+    (datetime - int32 дни, open/high/low/close - float64); None при ошибке.
     """
     logger.debug(f"Загрузка {symbol} с {start_date} по {end_date}")
     params = {
@@ -159,9 +189,21 @@ def fetch_historical_chunk(symbol, start_date, end_date):
         'interval': INTERVAL,
         'start_date': start_date,
         'end_date': end_date,
-        'order': 'asc'  # От старых к новым
+        'order': 'asc',  # От старых к новым
+        'format': 'CSV',
+        'delimiter': twelve_data.CSV_DELIMITER,
     }
-    return make_request('/time_series', params)
+    intraday = INTERVAL in INTERVAL_SECONDS
+    if intraday:
+        params['timezone'] = 'UTC'
+    content = make_request('/time_series', params, response_format='csv')
+    if content is None:
+        return None
+    try:
+        return twelve_data.parse_time_series_csv(content, intraday=intraday)
+    except (ValueError, KeyError) as e:
+        logger.error(f"Некорректный CSV-ответ для {symbol}: {e}")
+        return None
 
 # --- Основная логика загрузки ---
 class RateLimiter:
@@ -186,40 +228,36 @@ class RateLimiter:
 
         self.request_timestamps.append(now)
 
-def save_to_csv(symbol, data_points):
-    """Сохраняет загруженные данные в CSV файл, сортируя по дате и удаляя дубликаты."""
-    if not data_points:
+def format_price(value):
+    """float -> строка CSV (кратчайшее точное представление); NaN -> ''."""
+    return '' if value != value else repr(float(value))
+
+def init_snapshots():
+    """Первый снимок каталога пар, если CSV появились до введения снимков."""
+    if snapshots.current_version() is None and os.path.isdir(DATA_DIR):
+        names = sorted(name for name in os.listdir(DATA_DIR) if name.endswith('.csv'))
+        if names:
+            version = snapshots.adopt(names)
+            logger.info(f"Создан снимок {version} каталога пар из {len(names)} существующих файлов")
+
+def save_to_csv(symbol, columns):
+    """
+    Сохраняет загруженные данные (колонки numpy от fetch_historical_chunk) в CSV файл.
+    Существующий файл и новые данные сливаются как отсортированные массивы дат
+    (новые значения перезаписывают старые при совпадении дат).
+    """
+    if not len(columns[DATE_COLUMN]):
         logger.warning(f"Нет данных для сохранения {symbol}")
         return 0
     
     filename = os.path.join(DATA_DIR, f'{symbol.replace("/", "")}.csv')
     
-    # 1. Создаём словарь из новых данных
-    new_data_dict = {}
-    for point in data_points:
-        date = point['datetime']
-        # Проверяем корректность формата даты
-        try:
-            datetime.strptime(date, '%Y-%m-%d')
-            new_data_dict[date] = {
-                'datetime': date,
-                'open': point.get('open', ''),
-                'high': point.get('high', ''),
-                'low': point.get('low', ''),
-                'close': point.get('close', '')
-            }
-        except ValueError:
-            logger.warning(f"Пропускаю некорректную дату '{date}' для {symbol}")
-    
-    # 2. Загружаем существующие данные (если файл есть)
-    existing_data_dict = {}
+    # 1. Загружаем существующие данные (если файл есть)
+    existing = twelve_data.empty_columns()
     if os.path.exists(filename):
         try:
-            with open(filename, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    existing_data_dict[row['datetime']] = row
-            logger.info(f"Загружено {len(existing_data_dict)} существующих записей для {symbol}")
+            existing = twelve_data.load_pair_csv(filename)
+            logger.info(f"Загружено {len(existing[DATE_COLUMN])} существующих записей для {symbol}")
         except Exception as e:
             logger.error(f"Ошибка чтения файла {filename}: {e}")
             # Создаём backup повреждённого файла
@@ -227,35 +265,70 @@ def save_to_csv(symbol, data_points):
             os.rename(filename, backup_name)
             logger.info(f"Создан backup повреждённого файла: {backup_name}")
     
-    # 3. Объединяем данные (новые перезаписывают старые при конфликте)
-    merged_data = {**existing_data_dict, **new_data_dict}
-    
-    # 4. Сортируем по дате (от старых к новым)
-    sorted_dates = sorted(merged_data.keys())
-    sorted_rows = [merged_data[date] for date in sorted_dates]
+    # 2. Слияние отсортированных рядов за O(n + m)
+    merged, revisions = merge_sorted(existing, sort_unique(columns), PRICE_COLUMNS)
     
-    # 5. Сохраняем отсортированные данные
+    # 3. Сохраняем данные (от старых к новым): новое поколение файла и атомарная
+    # замена текущего - читатели не видят наполовину записанный CSV
+    def write_rows(f):
+        writer = csv.writer(f)
+        writer.writerow([DATE_COLUMN] + PRICE_COLUMNS)
+        writer.writerows(zip(days_to_dates(merged[DATE_COLUMN]).astype(str),
+                             *([format_price(v) for v in merged[c]] for c in PRICE_COLUMNS)))
+
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['datetime', 'open', 'high', 'low', 'close']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(sorted_rows)
+        snapshots.put(os.path.basename(filename), write_rows, newline='', encoding='utf-8')
         
-        added_count = len(new_data_dict)
-        updated_count = len([d for d in new_data_dict.keys() if d in existing_data_dict])
-        total_count = len(sorted_rows)
+        total_count = len(merged[DATE_COLUMN])
+        new_count = total_count - len(existing[DATE_COLUMN])
+        revised_count = len(np.unique(revisions['day']))
         
         logger.info(f"Сохранено {total_count} записей для {symbol}: "
-                   f"добавлено {added_count - updated_count} новых, "
-                   f"обновлено {updated_count} существующих")
+                   f"добавлено {new_count} новых, "
+                   f"пересмотрено провайдером {revised_count} существующих")
         
-        return added_count
+        return len(columns[DATE_COLUMN])
         
     except Exception as e:
         logger.error(f"Ошибка записи файла {filename}: {e}")
         return 0
 
+def sync_pair_store(symbol, fetched=None, fetched_at=None):
+    """
+    Дописывает в колоночное хранилище строки CSV пары, которых там еще нет,
+    и инкрементально обновляет производные данные (доходности, волатильности)
+    и агрегаты (неделя/месяц/год).
+    fetched - только что загруженные колонки: их строки с уже сохраненными
+    датами сливаются с хранилищем, пересмотренные значения попадают в журнал
+    ревизий ряда (revisions.bin) с временем загрузки fetched_at.
+    """
+    filename = os.path.join(DATA_DIR, f'{symbol.replace("/", "")}.csv')
+    if not os.path.exists(filename):
+        return 0
+    store = PairStore()
+    columns = twelve_data.load_pair_csv(filename)
+    last_day = store.last_day(twelve_data.SOURCE_NAME, symbol)
+    merged = False
+    if last_day is not None:
+        if fetched is not None:
+            stored = fetched[DATE_COLUMN] <= last_day
+            if stored.any():
+                store.merge_series(twelve_data.SOURCE_NAME, symbol,
+                                   {name: values[stored] for name, values in fetched.items()}, fetched_at)
+                merged = True
+        fresh = columns[DATE_COLUMN] > last_day
+        columns = {name: values[fresh] for name, values in columns.items()}
+    added = int(len(columns[DATE_COLUMN]))
+    if added:
+        store.append_series(twelve_data.SOURCE_NAME, symbol, columns, fetched_at)
+    if added or merged:
+        # Ревизии и вставки в середину ряда находятся по журналам ряда:
+        # производные и агрегаты пересчитываются с первого измененного дня
+        update_source_derived(store, twelve_data.SOURCE_NAME, [symbol])
+        update_source_aggregates(store, twelve_data.SOURCE_NAME, [symbol])
+    logger.info(f"Хранилище {symbol}: добавлено {added} строк")
+    return added
+
 def load_pair_history(symbol, rate_limiter):
     """
     Основная функция загрузки истории для одной валютной пары.
@@ -273,7 +346,8 @@ def load_pair_history(symbol, rate_limiter):
     chunks_needed = (total_days // MAX_POINTS_PER_REQUEST) + 1
     logger.info(f"Для {symbol} потребуется {chunks_needed} чанков ({total_days} дней)")
 
-    all_data_points = []
+    chunks = []
+    fetched_at = datetime.now()
     # 3. Загружаем данные по чанкам
     for chunk in range(chunks_needed):
         chunk_start = start_date + timedelta(days=chunk * MAX_POINTS_PER_REQUEST)
@@ -286,12 +360,9 @@ def load_pair_history(symbol, rate_limiter):
             chunk_end.strftime('%Y-%m-%d')
         )
 
-        if data and 'values' in data:
-            values = data['values']
-            # API возвращает данные в порядке от новых к старым, развернем
-            values.reverse()
-            all_data_points.extend(values)
-            logger.info(f"Чанк {chunk+1}/{chunks_needed} для {symbol} загружен: {len(values)} записей")
+        if data is not None:
+            chunks.append(data)
+            logger.info(f"Чанк {chunk+1}/{chunks_needed} для {symbol} загружен: {len(data[DATE_COLUMN])} записей")
         else:
             logger.warning(f"Не удалось загрузить чанк {chunk+1} для {symbol}")
 
@@ -300,19 +371,75 @@ def load_pair_history(symbol, rate_limiter):
             time.sleep(0.5)
 
     # 4. Сохраняем все данные в CSV (с сортировкой и удалением дубликатов)
-    if all_data_points:
-        saved_count = save_to_csv(symbol, all_data_points)
+    columns = twelve_data.concat_columns(chunks)
+    if len(columns[DATE_COLUMN]):
+        saved_count = save_to_csv(symbol, columns)
+        # Новый согласованный снимок каталога пар для читателей
+        snapshots.publish()
+        sync_pair_store(symbol, columns, fetched_at)
         # Уточненное сообщение - save_to_csv теперь возвращает количество добавленных/обновленных записей
-        logger.info(f"Завершено для {symbol}. Всего обработано {len(all_data_points)} загруженных записей.")
+        logger.info(f"Завершено для {symbol}. Всего обработано {len(columns[DATE_COLUMN])} загруженных записей.")
         return True
     else:
         logger.error(f"Не удалось загрузить данные для {symbol}.")
         return False
 
+def load_pair_intraday(symbol, rate_limiter, store=None, since=None):
+    """
+    Загрузка внутридневной истории пары (интервал INTERVAL) в помесячное
+    хранилище. Каждый чанк сразу дописывается в свои партиции, поэтому
+    прерванная загрузка продолжается с последнего сохраненного бара.
+    Неудача - если какой-то чанк не загрузился и не добавлено ни одного бара.
+    """
+    logger.info(f"--- Начинаю загрузку {INTERVAL} для {symbol} ---")
+    store = store or IntradayStore()
+    step = timedelta(seconds=INTERVAL_SECONDS[INTERVAL])
+
+    last = store.last_timestamp(INTERVAL, twelve_data.SOURCE_NAME, symbol)
+    if last is not None:
+        start = datetime(1970, 1, 1) + timedelta(seconds=last) + step
+    else:
+        rate_limiter.wait_if_needed()
+        start = datetime.strptime(since or get_earliest_timestamp(symbol), '%Y-%m-%d')
+    end = datetime.now(timezone.utc).replace(tzinfo=None)
+    if start > end:
+        logger.info(f"Бары {INTERVAL} для {symbol} актуальны")
+        return True
+    span = step * MAX_POINTS_PER_REQUEST
+    chunks_needed = int((end - start) / span) + 1
+    logger.info(f"Для {symbol} потребуется {chunks_needed} чанков с {start:%Y-%m-%d %H:%M}")
+
+    added = 0
+    failed = 0
+    for chunk in range(chunks_needed):
+        chunk_start = start + chunk * span
+        chunk_end = min(chunk_start + span - step, end)
+        rate_limiter.wait_if_needed()
+        data = fetch_historical_chunk(symbol, chunk_start.strftime('%Y-%m-%d %H:%M:%S'),
+                                      chunk_end.strftime('%Y-%m-%d %H:%M:%S'))
+        if data is None:
+            logger.warning(f"Не удалось загрузить чанк {chunk+1} для {symbol}")
+            failed += 1
+            continue
+        added += store.write_bars(INTERVAL, twelve_data.SOURCE_NAME, symbol, data)
+        logger.info(f"Чанк {chunk+1}/{chunks_needed} для {symbol} загружен: {len(data[TIME_COLUMN])} записей")
+
+    logger.info(f"Завершено для {symbol}: добавлено {added} баров {INTERVAL}, "
+                f"не загружено чанков: {failed}")
+    return not failed or added > 0
+
 def main():
     """
     Главная функция, которая загружает историю для всех пар.
     """
+    global INTERVAL
+    parser = argparse.ArgumentParser(description="Первоначальная загрузка истории Twelve Data")
+    parser.add_argument('--interval', default=INTERVAL, choices=['1day'] + list(INTERVAL_SECONDS),
+                        help="Интервал баров (по умолчанию 1day - CSV пар и дневное хранилище)")
+    parser.add_argument('--since', help="Начало внутридневной истории YYYY-MM-DD (по умолчанию - самая ранняя)")
+    args = parser.parse_args()
+    INTERVAL = args.interval
+
     # Загружаем список пар из конфигурационного файла
     currency_pairs = load_currency_config()
     
@@ -326,13 +453,18 @@ def main():
     logger.info(f"Логи будут сохранены в: {LOG_FILE}")
     logger.info(f"Каталог данных: {DATA_DIR}")
 
+    if INTERVAL == '1day':
+        init_snapshots()
     rate_limiter = RateLimiter(SAFE_REQUESTS_PER_MINUTE)
     successful_pairs = []
     failed_pairs = []
 
     for idx, pair in enumerate(currency_pairs, 1):
         logger.info(f"Обработка пары {idx}/{len(currency_pairs)}: {pair}")
-        success = load_pair_history(pair, rate_limiter)
+        if INTERVAL in INTERVAL_SECONDS:
+            success = load_pair_intraday(pair, rate_limiter, since=args.since)
+        else:
+            success = load_pair_history(pair, rate_limiter)
         if success:
             successful_pairs.append(pair)
         else:
@@ -351,6 +483,9 @@ def main():
         logger.info(f"Список пар с ошибками: {failed_pairs}")
     logger.info(f"Итоговый лог: {LOG_FILE}")
     logger.info(f"Данные сохранены в: {DATA_DIR}")
+    if INTERVAL == '1day':
+        removed = snapshots.prune()
+        logger.info(f"Снимок каталога пар: версия {snapshots.current_version()}, удалено старых поколений: {removed}")
     
     # Создаем сводный отчет
     create_summary_report(successful_pairs, failed_pairs)
@@ -1,7 +1,9 @@
 """
 СКРИПТ 1: Сбор матрицы валютных курсов с ExchangeRate-API.
 Собирает данные для последующего анализа связей между валютами.
-Внимание: для экономии лимита тестирует подмножество валют (по умолчанию 50).
+По умолчанию работает в режиме снимка: один запрос /latest/USD, вся матрица
+выводится локально (см. sources/exchangerate_api.py). Старый режим с запросом
+по каждой базовой валюте оставлен для сверки (USE_SNAPSHOT_MODE = False).
 """
 import os
 import sys
@@ -14,6 +16,10 @@ import requests
 
 # --- НАСТРОЙКА ---
 current_dir = Path.cwd()
+sys.path.insert(0, str(current_dir))
+
+from storage.pair_store import PairStore
+from sources import exchangerate_api
 env_path = current_dir / '.env'
 if env_path.exists():
     load_dotenv(dotenv_path=env_path)
@@ -39,7 +45,8 @@ TEST_CURRENCIES = [
     'UAH', 'KWD', 'QAR', 'RON', 'HUF', 'ISK', 'HRK', 'BGN', 'NOK', 'DKK'
 ]
 # ВНИМАНИЕ: 50 валют * 50 запросов = 2500 запросов! Это превышает МЕСЯЧНЫЙ лимит.
-# Поэтому скрипт по умолчанию использует РЕЖИМ ОБРАЗЦА (см. строку ~65).
+# Поэтому скрипт по умолчанию использует РЕЖИМ СНИМКА (1 запрос на всю матрицу),
+# а поштучный режим - только как РЕЖИМ ОБРАЗЦА (см. collect_data).
 
 # --- ФУНКЦИИ ---
 def get_latest_rates(base_currency: str) -> Dict[str, float]:
@@ -106,7 +113,40 @@ def collect_data(currencies_to_test: List[str], sample_mode: bool = True, sample
     print(f"   Успешных баз (вернули курсы): {sum(1 for d in collected_data.values() if d['targets_count'] > 0)}")
     return collected_data
 
-def save_collected_data(data: Dict, sample_mode: bool):
+def collect_snapshot(currencies_to_test: List[str], numeraire: str = exchangerate_api.NUMERAIRE) -> Dict:
+    """
+    Сбор матрицы одним запросом: курсы от нумерера, кросс-курсы считаются локально.
+    Результат в том же формате, что и collect_data, и дополнительно пишется в хранилище.
+    """
+    print("="*70)
+    print(f"СБОР МАТРИЦЫ ПО СНИМКУ ОТ {numeraire} (1 запрос вместо {len(currencies_to_test)})")
+    print("="*70)
+
+    session = exchangerate_api.make_session()
+    day, rates = exchangerate_api.fetch_snapshot(session, API_KEY, numeraire)
+    stored = exchangerate_api.store_snapshot(PairStore(), day, rates, numeraire)
+
+    bases = list(dict.fromkeys(c for c in currencies_to_test if c in rates))
+    codes, matrix = exchangerate_api.cross_matrix(rates)
+    positions = {code: i for i, code in enumerate(codes)}
+
+    collected_data = {}
+    for base in bases:
+        row = matrix[positions[base]]
+        collected_data[base] = {
+            "rates": {code: float(row[j]) for j, code in enumerate(codes)},
+            "targets_count": len(codes)
+        }
+    for base in currencies_to_test:
+        if base not in rates:
+            collected_data[base] = {"rates": {}, "targets_count": 0, "error": "not_in_snapshot"}
+
+    print(f"\n✅ Снимок получен: {len(rates)} валют, матрица {len(codes)}x{len(codes)}.")
+    print(f"   Сделано запросов: 1")
+    print(f"   В хранилище сохранено пар: {stored}")
+    return collected_data
+
+def save_collected_data(data: Dict, sample_mode: bool, requests_made: int = None):
     """Сохраняет собранные данные в JSON файл с мета-информацией."""
     output_dir = current_dir / 'data' / 'research_results' / 'exchangerate_api'
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -119,7 +159,8 @@ def save_collected_data(data: Dict, sample_mode: bool):
             "plan": "Free",
             "sample_mode": sample_mode,
             "currencies_tested": list(data.keys()),
-            "total_requests_simulated": len(data)  # По одному запросу на валюту
+            # По одному запросу на валюту (в режиме снимка - один запрос)
+            "total_requests_simulated": len(data) if requests_made is None else requests_made
         },
         "matrix_data": data
     }
@@ -134,9 +175,17 @@ def save_collected_data(data: Dict, sample_mode: bool):
 # --- ЗАПУСК ---
 if __name__ == '__main__':
     # НАСТРОЙТЕ ЭТИ ПАРАМЕТРЫ ПЕРЕД ЗАПУСКОМ:
+    USE_SNAPSHOT_MODE = True    # Один запрос на всю матрицу (рекомендуется)
     USE_SAMPLE_MODE = True      # Поставьте False для сбора по всем TEST_CURRENCIES (осторожно!)
     SAMPLE_SIZE = 15            # Сколько валют проверить в режиме образца
 
+    if USE_SNAPSHOT_MODE:
+        print("Старт сбора матрицы курсов по снимку...")
+        collected_matrix = collect_snapshot(TEST_CURRENCIES)
+        saved_file = save_collected_data(collected_matrix, sample_mode=False, requests_made=1)
+        print(f"\nГотово. Файл для анализа: {saved_file.name}")
+        sys.exit(0)
+
     if not USE_SAMPLE_MODE:
         confirm = input(f"⚠️  Вы запускаете ПОЛНЫЙ режим для {len(TEST_CURRENCIES)} валют.\n   Это сделает ~{len(TEST_CURRENCIES)} запросов к API. Продолжить? (y/n): ")
         if confirm.lower() != 'y':
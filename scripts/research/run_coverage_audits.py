@@ -0,0 +1,146 @@
+"""
+Параллельный аудит покрытия валют всеми провайдерами одной командой.
+Объединяет проверки test_ecb_coverage.py, frankfurter/test_coverage.py,
+exchangerate_api/test_coverage.py и twelve_data/quick_test.py: провайдеры
+опрашиваются одновременно через sources/probe_runner.py, с лимитами каждого
+провайдера вместо фиксированных пауз.
+Запуск из корня проекта: python scripts/research/run_coverage_audits.py
+"""
+
+import os
+import sys
+import json
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+# Корень проекта (текущая директория) в sys.path
+sys.path.insert(0, os.getcwd())
+
+from scripts.research.currencies import CURRENCIES, PAIRS
+from sources.probe_runner import ProbeRunner, run_concurrently
+
+load_dotenv()
+
+RESULTS_DIR = Path("data/research_results")
+
+ECB_DAILY_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
+ECB_HIST_90D_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist-90d.xml"
+ECB_CUBE_TAG = '{http://www.ecb.int/vocabulary/2002-08-01/eurofxref}Cube'
+FRANKFURTER_BASE_URL = "https://api.frankfurter.app"
+FRANKFURTER_TEST_DATE = "2024-01-02"
+FRANKFURTER_BATCH_SIZE = 5
+EXCHANGERATE_API_BASE_URL = "https://v6.exchangerate-api.com/v6"
+TWELVE_DATA_URL = "https://api.twelvedata.com/time_series"
+
+
+def coverage_summary(available: List[str], tested: List[str]) -> Dict:
+    return {
+        "available": sorted(available),
+        "unavailable": sorted(c for c in tested if c not in available),
+        "total": len(tested),
+        "coverage": round(len(available) / len(tested) * 100, 1) if tested else 0.0,
+    }
+
+
+def ecb_currencies(runner: ProbeRunner, url: str) -> set:
+    response = runner.get(url)
+    root = ET.fromstring(response.content)
+    return {cube.get('currency') for cube in root.iter(ECB_CUBE_TAG) if cube.get('currency')}
+
+
+def audit_ecb() -> Dict:
+    """ECB: два документа на весь список валют (вместо двух запросов на валюту)."""
+    runner = ProbeRunner('ecb')
+    daily, hist_90d = runner.map(lambda url: ecb_currencies(runner, url), [ECB_DAILY_URL, ECB_HIST_90D_URL])
+    tested = [c for c in CURRENCIES if c != 'EUR']
+    available = [c for c in tested if c in daily or c in hist_90d]
+    return {**coverage_summary(available, tested), "stats": runner.stats}
+
+
+def audit_frankfurter() -> Dict:
+    """Frankfurter: батчи по 5 валют, батчи идут параллельно."""
+    runner = ProbeRunner('frankfurter')
+    tested = [c for c in CURRENCIES if c != 'EUR']
+    batches = [tested[i:i + FRANKFURTER_BATCH_SIZE] for i in range(0, len(tested), FRANKFURTER_BATCH_SIZE)]
+
+    def probe(batch: List[str]) -> List[str]:
+        response = runner.get(f"{FRANKFURTER_BASE_URL}/{FRANKFURTER_TEST_DATE}",
+                              {'from': 'EUR', 'to': ','.join(batch)})
+        if response.status_code != 200:
+            return []
+        rates = response.json().get('rates', {})
+        return [c for c in batch if c in rates]
+
+    available = [c for found in runner.map(probe, batches) for c in found]
+    return {**coverage_summary(available, tested), "stats": runner.stats}
+
+
+def audit_exchangerate_api() -> Dict:
+    """ExchangeRate-API: один запрос /latest/USD покрывает все валюты."""
+    api_key = os.getenv('EXCHANGERATE_API_KEY')
+    if not api_key:
+        return {"skipped": "EXCHANGERATE_API_KEY не задан"}
+    runner = ProbeRunner('exchangerate_api')
+    data = runner.get(f"{EXCHANGERATE_API_BASE_URL}/{api_key}/latest/USD").json()
+    if data.get('result') != 'success':
+        return {"error": data.get('error-type', 'unknown error')}
+    rates = data.get('conversion_rates', {})
+    available = [c for c in CURRENCIES if c in rates]
+    return {**coverage_summary(available, CURRENCIES), "stats": runner.stats}
+
+
+def audit_twelve_data(pairs: List[str]) -> Dict:
+    """Twelve Data: по запросу на пару, в пределах лимита 8 запр/мин."""
+    api_key = os.getenv('TWELVE_DATA_API_KEY')
+    if not api_key:
+        return {"skipped": "TWELVE_DATA_API_KEY не задан"}
+    runner = ProbeRunner('twelve_data')
+
+    def probe(pair: str) -> bool:
+        response = runner.get(TWELVE_DATA_URL, {
+            'symbol': f"{pair[:3]}/{pair[3:]}", 'interval': '1day',
+            'outputsize': 5, 'apikey': api_key,
+        })
+        return response.status_code == 200 and response.json().get('status') == 'ok'
+
+    flags = runner.map(probe, pairs)
+    available = [pair for pair, ok in zip(pairs, flags) if ok]
+    return {**coverage_summary(available, pairs), "stats": runner.stats}
+
+
+def main():
+    print("=" * 60)
+    print("🔍 ПАРАЛЛЕЛЬНЫЙ АУДИТ ПОКРЫТИЯ ПРОВАЙДЕРОВ")
+    print("=" * 60)
+
+    # Тот же набор пар, что и в twelve_data/quick_test.py
+    twelve_data_pairs = PAIRS[:8] + [p for p in ['USDRUB', 'USDAED', 'USDKWD', 'USDKZT', 'USDUAH']
+                                     if p not in PAIRS[:8]]
+    results = run_concurrently({
+        'ecb': audit_ecb,
+        'frankfurter': audit_frankfurter,
+        'exchangerate_api': audit_exchangerate_api,
+        'twelve_data': lambda: audit_twelve_data(twelve_data_pairs),
+    })
+
+    for provider, result in results.items():
+        if 'coverage' in result:
+            print(f"✅ {provider}: {result['coverage']}% ({len(result['available'])}/{result['total']}), "
+                  f"{result['elapsed_sec']} сек, запросов: {result['stats']['requests']}")
+        else:
+            print(f"⚠️  {provider}: {result.get('skipped') or result.get('error')}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    report_file = RESULTS_DIR / f"coverage_audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({"test_date": datetime.now().isoformat(), "providers": results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Отчет сохранен: {report_file}")
+
+
+if __name__ == '__main__':
+    main()
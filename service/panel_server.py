@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Демон общей панели: выровненная панель источника и производные массивы
+в разделяемой памяти (multiprocessing.shared_memory) для процессов анализа
+на одной машине.
+
+Демон один раз собирает массивы поколения и копирует их в один сегмент
+разделяемой памяти (массивы выровнены по ALIGNMENT байт):
+  days                      - int32 (T,) календарь панели;
+  close                     - float64 (T, N) закрытия пар;
+  log_return, ewma_vol, rolling_vol
+                            - float64 (T, N) производный слой (storage/derived.py);
+  absolute_days, absolute_log_rates
+                            - решение analysis/absolute_rates.py, если оно есть.
+Описание поколения (имя сегмента, смещения, dtype и формы массивов, пары,
+валюты) публикуется атомарно в реестре data/store/shared_panel/registry.json.
+Клиент (PanelClient) читает реестр и отображает сегмент по имени - массивы
+numpy смотрят прямо в разделяемую память, без копий и без чтения файлов.
+
+После каждого прогона загрузчика демон собирает новое поколение в новом
+сегменте и переключает реестр; клиент переходит на него при следующем
+PanelClient.latest(). Массивы поколения живут, пока поколение отображено:
+клиент, работающий с ними дольше одного вызова latest(), берет аренду
+(with client.lease() as generation: ... или acquire()/release()) - старое
+поколение закрывается только без аренд. Прогон считается завершенным, когда отметка
+изменений хранилища (meta.json рядов источника, производного слоя и
+решения) не меняется settle секунд. Предыдущие KEEP_GENERATIONS поколений
+остаются доступными, чтобы клиент, прочитавший реестр перед
+переключением, успел их отобразить; отображенный сегмент остается
+валидным у клиента и после удаления имени демоном.
+Запускать ИЗ КОРНЯ ПРОЕКТА:
+  python service/panel_server.py [--source twelve_data] [--poll-seconds 10] [--settle-seconds 30]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, STORE_DIR, META_FILE, days_to_dates
+from storage.derived import DERIVED_COLUMNS, derived_store
+from storage.snapshots import atomic_write_json
+from analysis.absolute_rates import ABSOLUTE_DIR, AbsoluteRates, load_absolute_rates
+from analysis.panel import Panel, build_panel
+
+SHARED_PANEL_DIR = os.path.join(STORE_DIR, 'shared_panel')
+REGISTRY_PATH = os.path.join(SHARED_PANEL_DIR, 'registry.json')
+DEFAULT_SOURCE = 'twelve_data'
+SEGMENT_PREFIX = 'fxpanel'
+ALIGNMENT = 64
+KEEP_GENERATIONS = 2
+POLL_SECONDS = 10
+SETTLE_SECONDS = 30
+
+# Поколения, брошенные вызывающим без release(): отображение держится до
+# конца процесса, иначе массивы арендатора смотрели бы в закрытую память
+_orphans: List['SharedGeneration'] = []
+# Сегменты, созданные этим процессом (их учетом в resource_tracker владеет демон)
+_created: set = set()
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """
+    Отображает существующий сегмент. Сегмент принадлежит демону: клиент
+    не должен удалять его при выходе, поэтому он снимается с учета
+    resource_tracker (в Python < 3.13 нет параметра track).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        if segment.name not in _created:
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _layout(arrays: Dict[str, np.ndarray]) -> Tuple[Dict[str, Dict], int]:
+    """Смещения массивов в сегменте (кратные ALIGNMENT) и общий размер."""
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        layout[name] = {'offset': offset, 'dtype': values.dtype.str, 'shape': list(values.shape)}
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    return layout, max(offset, 1)
+
+
+def _views(buffer, layout: Dict[str, Dict], writeable: bool = False) -> Dict[str, np.ndarray]:
+    views = {}
+    for name, spec in layout.items():
+        view = np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=buffer, offset=spec['offset'])
+        view.flags.writeable = writeable
+        views[name] = view
+    return views
+
+
+def read_registry(path: str = REGISTRY_PATH) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SharedGeneration:
+    """
+    Одно поколение панели, отображенное из разделяемой памяти (только чтение).
+    Массивы numpy не удерживают отображение, поэтому пользователь поколения
+    берет аренду: acquire()/release() или with generation: ... - пока есть
+    аренды, close() отказывается закрывать сегмент.
+    """
+
+    def __init__(self, entry: Dict):
+        self.generation: int = entry['generation']
+        self.source: str = entry['source']
+        self.symbols: List[str] = entry['symbols']
+        self.currencies: List[str] = entry['currencies']
+        self.created_at: Optional[str] = entry.get('created_at')
+        self._segment = _attach_segment(entry['segment'])
+        self.arrays = _views(self._segment.buf, entry['arrays'])
+        self.leases = 0
+
+    def acquire(self) -> 'SharedGeneration':
+        if not self.arrays:
+            raise ValueError(f"Поколение {self.generation} уже закрыто")
+        self.leases += 1
+        return self
+
+    def release(self) -> None:
+        if self.leases <= 0:
+            raise ValueError(f"У поколения {self.generation} нет аренд")
+        self.leases -= 1
+
+    def __enter__(self) -> 'SharedGeneration':
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def panel(self, column: str = 'close') -> Panel:
+        """Панель столбца column (close или производная колонка) на календаре поколения."""
+        if column not in self.arrays or column == 'days':
+            raise KeyError(f"Колонки {column} нет в поколении {self.generation}")
+        return Panel(self.arrays['days'], self.symbols, self.arrays[column])
+
+    def absolute(self) -> Optional[AbsoluteRates]:
+        if 'absolute_log_rates' not in self.arrays:
+            return None
+        return AbsoluteRates(self.arrays['absolute_days'], self.currencies, self.arrays['absolute_log_rates'])
+
+    def in_use(self) -> bool:
+        """Есть ли невозвращенные аренды поколения."""
+        return self.leases > 0
+
+    def close(self) -> None:
+        """
+        Отключается от сегмента. numpy не удерживает буфер отображения,
+        поэтому закрыть его при арендах нельзя - BufferError.
+        """
+        if self.in_use():
+            raise BufferError(f"Поколение {self.generation} арендовано ({self.leases})")
+        self.arrays = {}
+        self._segment.close()
+
+    def __del__(self):
+        # Без этого сборщик закрыл бы сегмент (SharedMemory.__del__) под арендованными массивами
+        if self.arrays and self.in_use():
+            _orphans.append(self)
+
+
+class PanelClient:
+    """
+    Клиент демона: latest() возвращает последнее опубликованное поколение,
+    переключаясь на новое, когда реестр обновлен. Старые поколения
+    закрываются, как только у них не остается аренд; без аренды массивы
+    поколения можно использовать только до следующего вызова latest().
+    """
+
+    def __init__(self, registry_path: str = REGISTRY_PATH):
+        self.registry_path = registry_path
+        self.current: Optional[SharedGeneration] = None
+        self._registry_mtime: Optional[int] = None
+        self._retired: List[SharedGeneration] = []
+
+    def latest(self) -> SharedGeneration:
+        mtime = os.stat(self.registry_path).st_mtime_ns if os.path.exists(self.registry_path) else None
+        if self.current is None or mtime != self._registry_mtime:
+            entry = read_registry(self.registry_path)
+            if entry is None:
+                raise FileNotFoundError(f"Демон панели не запущен: нет {self.registry_path}")
+            if self.current is None or entry['generation'] != self.current.generation:
+                try:
+                    generation = SharedGeneration(entry)
+                except FileNotFoundError:
+                    # Поколение удалено между чтением реестра и отображением - реестр уже новый
+                    generation = SharedGeneration(read_registry(self.registry_path))
+                if self.current is not None:
+                    self._retired.append(self.current)
+                self.current = generation
+            self._registry_mtime = mtime
+        self._release_retired()
+        return self.current
+
+    @contextmanager
+    def lease(self) -> Iterator[SharedGeneration]:
+        """Последнее поколение с арендой на время блока with."""
+        with self.latest() as generation:
+            yield generation
+
+    def _release_retired(self) -> None:
+        alive = []
+        for generation in self._retired:
+            if generation.in_use():
+                alive.append(generation)
+            else:
+                generation.close()
+        self._retired = alive
+
+    def close(self) -> None:
+        if self.current is not None:
+            self._retired.append(self.current)
+            self.current = None
+        self._release_retired()
+
+
+class PanelPublisher:
+    """Сборка поколений панели и публикация их в разделяемой памяти."""
+
+    def __init__(self, store: Optional[PairStore] = None, source: str = DEFAULT_SOURCE,
+                 symbols: Optional[List[str]] = None, derived: Optional[PairStore] = None,
+                 rates_dir: str = ABSOLUTE_DIR, registry_path: str = REGISTRY_PATH,
+                 keep: int = KEEP_GENERATIONS):
+        self.store = store or PairStore()
+        self.source = source
+        self.symbols = symbols
+        self.derived = derived or derived_store()
+        self.rates_dir = rates_dir
+        self.registry_path = registry_path
+        self.keep = max(keep, 1)
+        self.generation = 0
+        self._segments: List[shared_memory.SharedMemory] = []
+
+    def stamp(self) -> str:
+        """Отметка изменений входных данных: последние meta.json рядов, производного слоя и решения."""
+        latest, count = 0, 0
+        for root in (self.store.root, self.derived.root):
+            directory = os.path.join(root, self.source)
+            for name in os.listdir(directory) if os.path.isdir(directory) else []:
+                meta = os.path.join(directory, name, META_FILE)
+                if os.path.exists(meta):
+                    latest, count = max(latest, os.stat(meta).st_mtime_ns), count + 1
+        rates_meta = os.path.join(self.rates_dir, 'meta.json')
+        if os.path.exists(rates_meta):
+            latest = max(latest, os.stat(rates_meta).st_mtime_ns)
+        return f'{count}:{latest}'
+
+    def build(self) -> Tuple[Dict[str, np.ndarray], List[str], List[str]]:
+        """Массивы поколения: (массивы, пары, валюты решения)."""
+        symbols = self.symbols or self.store.symbols(self.source)
+        close = build_panel(self.store, self.source, symbols)
+        arrays = {'days': close.days, 'close': close.values}
+        for column in DERIVED_COLUMNS:
+            arrays[column] = build_panel(self.derived, self.source, symbols, column, days=close.days).values
+        currencies = []
+        if os.path.exists(os.path.join(self.rates_dir, 'meta.json')):
+            rates = load_absolute_rates(self.rates_dir)
+            arrays['absolute_days'] = np.asarray(rates.days, dtype=np.int32)
+            arrays['absolute_log_rates'] = np.asarray(rates.log_rates, dtype=np.float64)
+            currencies = list(rates.currencies)
+        return arrays, list(symbols), currencies
+
+    def publish(self, stamp: Optional[str] = None) -> int:
+        """Собирает поколение, копирует его в новый сегмент и переключает реестр."""
+        stamp = self.stamp() if stamp is None else stamp
+        arrays, symbols, currencies = self.build()
+        layout, size = _layout(arrays)
+        self.generation += 1
+        segment = shared_memory.SharedMemory(
+            name=f'{SEGMENT_PREFIX}_{os.getpid()}_{self.generation}', create=True, size=size)
+        for name, view in _views(segment.buf, layout, writeable=True).items():
+            view[...] = arrays[name]
+        del view
+        self._segments.append(segment)
+        _created.add(segment.name)
+
+        atomic_write_json(self.registry_path, {
+            'generation': self.generation, 'segment': segment.name, 'size': size,
+            'pid': os.getpid(), 'source': self.source, 'stamp': stamp,
+            'created_at': datetime.now().isoformat(),
+            'symbols': symbols, 'currencies': currencies, 'arrays': layout,
+        })
+        while len(self._segments) > self.keep:
+            self._retire(self._segments.pop(0))
+        return self.generation
+
+    @staticmethod
+    def _retire(segment: shared_memory.SharedMemory) -> None:
+        # Клиенты, уже отобразившие сегмент, продолжают его видеть: удаляется только имя
+        segment.close()
+        segment.unlink()
+        _created.discard(segment.name)
+
+    def shutdown(self) -> None:
+        """Удаляет реестр и все сегменты демона."""
+        entry = read_registry(self.registry_path)
+        if entry is not None and entry.get('pid') == os.getpid():
+            os.remove(self.registry_path)
+        while self._segments:
+            self._retire(self._segments.pop(0))
+
+    def serve(self, poll_seconds: float = POLL_SECONDS, settle_seconds: float = SETTLE_SECONDS) -> None:
+        """
+        Публикует поколение и затем следит за хранилищем: новое поколение
+        собирается, когда отметка изменилась и затем settle секунд не менялась.
+        """
+        published = self.stamp()
+        self.publish(published)
+        self._report()
+        seen, changed_at = published, None
+        while True:
+            time.sleep(poll_seconds)
+            stamp = self.stamp()
+            if stamp != seen:
+                seen, changed_at = stamp, time.monotonic()
+            elif stamp != published and changed_at is not None and time.monotonic() - changed_at >= settle_seconds:
+                self.publish(stamp)
+                published, changed_at = stamp, None
+                self._report()
+
+    def _report(self) -> None:
+        entry = read_registry(self.registry_path)
+        days = _views(self._segments[-1].buf, {'days': entry['arrays']['days']})['days']
+        period = f"{days_to_dates(days[0])} - {days_to_dates(days[-1])}" if len(days) else "нет дат"
+        print(f"📡 Поколение {entry['generation']}: сегмент {entry['segment']}, "
+              f"{entry['size'] / 2 ** 20:.1f} МБ, пар {len(entry['symbols'])}, {period}")
+        del days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Демон общей панели в разделяемой памяти")
+    parser.add_argument('--source', default=DEFAULT_SOURCE)
+    parser.add_argument('--registry', default=REGISTRY_PATH)
+    parser.add_argument('--poll-seconds', type=float, default=POLL_SECONDS)
+    parser.add_argument('--settle-seconds', type=float, default=SETTLE_SECONDS,
+                        help="Сколько секунд хранилище не должно меняться перед сборкой поколения")
+    args = parser.parse_args()
+
+    print("🧠 ОБЩАЯ ПАНЕЛЬ В РАЗДЕЛЯЕМОЙ ПАМЯТИ")
+    print("=" * 60)
+    store = PairStore()
+    if not store.symbols(args.source):
+        print(f"✗ В хранилище нет рядов источника {args.source}. Запустите scripts/initial_load/build_store.py")
+        return 1
+    publisher = PanelPublisher(store, args.source, registry_path=args.registry)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        publisher.serve(args.poll_seconds, args.settle_seconds)
+    except KeyboardInterrupt:
+        print("\n⏹️  Остановлен")
+    finally:
+        publisher.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
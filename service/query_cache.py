@@ -0,0 +1,96 @@
+"""
+LRU-кэш результатов запросов к курсам с бюджетом памяти в байтах.
+
+Значение - массив numpy (ряд одной пары или валюты на диапазоне строк
+решения), его размер считается по nbytes. При превышении бюджета
+вытесняются давно не использованные записи; массив больше всего бюджета
+не кэшируется. Для каждой записи хранится конец диапазона строк
+(исключительно): при дописывании или пересчете решения с некоторой
+строки invalidate_from(row) удаляет только записи, задевающие эту строку
+и следующие, и увеличивает epoch: читатель, закрепивший старое решение,
+по эпохе понимает, что кэш ему больше не подходит.
+Счетчики попаданий/промахов/вытеснений - в stats().
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+ENTRY_OVERHEAD = 256        # ключ, заголовок массива и узел словаря - грубая оценка
+
+
+class QueryCache:
+    """Кэш ключ -> массив с вытеснением LRU по суммарному размеру."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, Tuple[np.ndarray, int]]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.epoch = 0
+
+    @staticmethod
+    def _size(value: np.ndarray) -> int:
+        return value.nbytes + ENTRY_OVERHEAD
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: np.ndarray, end_row: int) -> bool:
+        """
+        Кладет значение, рассчитанное по строкам решения до end_row (исключительно).
+        Массив только для чтения: вызывающий не должен менять закэшированное.
+        Возвращает False, если значение больше бюджета и не закэшировано.
+        """
+        size = self._size(value)
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        value.flags.writeable = False
+        self._entries[key] = (value, end_row)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def _remove(self, key: Hashable) -> None:
+        value, _ = self._entries.pop(key)
+        self.bytes -= self._size(value)
+
+    def invalidate_from(self, row: int) -> int:
+        """Удаляет записи, рассчитанные по строкам >= row. Возвращает число удаленных."""
+        stale = [key for key, (_, end_row) in self._entries.items() if end_row > row]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        self.epoch += 1
+        return len(stale)
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+        self.epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions, 'invalidations': self.invalidations, 'epoch': self.epoch}
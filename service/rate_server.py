@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Локальный HTTP-сервис курсов (asyncio, без сторонних веб-фреймворков).
+
+Массивы загружаются один раз при старте: абсолютные курсы
+(data/store/absolute, memory-mapping) и, по желанию, панель наблюдаемых
+закрытий одного источника. Запросы обслуживаются из индексов в памяти
+(валюта -> столбец, пара -> столбец, дата -> строка через searchsorted),
+файлы повторно не читаются.
+
+  GET /absolute?currencies=USD,EUR&date=2024-01-02[&normalization=geometric]
+  GET /cross?pairs=EUR/USD,USD/JPY&start=2020-01-01&end=2024-01-01[&source=observed]
+  GET /convert?from=EUR,GBP&to=USD&amount=100,250&date=2024-01-02
+  GET /health
+  GET /cache                               - счетчики кэша (попадания, промахи, байты)
+Дата - as-of: берется последняя дата решения не позже запрошенной.
+Диапазон (start/end) отдается потоково: NDJSON по строке на дату,
+Transfer-Encoding: chunked, блоками по STREAM_ROWS дат.
+Соединения keep-alive (HTTP/1.1).
+Ряды пар и валют кэшируются (service/query_cache.py) по ключу
+(вид, пара/валюта, источник или нормировка, строки решения) в пределах
+бюджета --cache-mb. Раз в --refresh-seconds сервис проверяет meta.json
+решения: если решение пересчитано (например, дописаны новые даты),
+массивы перечитываются (в пуле потоков, не блокируя цикл событий),
+а из кэша удаляются только ряды, задевающие первую изменившуюся строку.
+Запрос закрепляет массивы на своем начале (RateAPI.pinned): потоковый
+ответ целиком относится к одному решению, даже если оно заменится
+во время выдачи. Нормировки (--normalizations) считаются заранее: при
+старте и при перечитывании решения в пуле потоков; нормировка вне списка
+при первом запросе тоже считается в пуле потоков, а не в цикле событий.
+Запускать ИЗ КОРНЯ ПРОЕКТА:
+  python service/rate_server.py [--port 8080] [--panel-source best]
+"""
+
+import os
+import sys
+import copy
+import json
+import asyncio
+import argparse
+import itertools
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from storage.pair_store import PairStore, dates_to_days, days_to_dates
+from analysis.absolute_rates import ABSOLUTE_DIR, AbsoluteRates, load_absolute_rates
+from analysis.panel import Panel, build_panel
+from analysis.numeraire import DEFAULT_NORMALIZATIONS, NormalizationCache, basket_weights, normalize
+from service.query_cache import DEFAULT_MAX_BYTES, QueryCache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+STREAM_ROWS = 512
+MAX_HEADER_BYTES = 16384
+OBSERVED = 'observed'
+REFRESH_SECONDS = 60
+
+
+class RequestError(Exception):
+    """Ошибка параметров запроса (HTTP 400/404)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _split(params: Dict[str, List[str]], name: str, required: bool = True) -> List[str]:
+    values = [item for value in params.get(name, []) for item in value.split(',') if item]
+    if required and not values:
+        raise RequestError(f"Не задан параметр {name}")
+    return values
+
+
+def _parse_days(values: List[str]) -> np.ndarray:
+    try:
+        return dates_to_days(values)
+    except ValueError:
+        raise RequestError(f"Некорректная дата: {','.join(values)}")
+
+
+def _solution_stamp(rates_dir: str) -> Optional[str]:
+    with open(os.path.join(rates_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+        return json.load(f).get('updated_at')
+
+
+def first_changed_row(old_days: np.ndarray, old_values: np.ndarray,
+                      new_days: np.ndarray, new_values: np.ndarray) -> int:
+    """
+    Первая строка, начиная с которой новые массивы (даты x столбцы) отличаются
+    от старых; дописанные в конец даты не задевают старые строки.
+    NaN на одинаковых местах считаются совпадающими.
+    """
+    common = min(len(old_days), len(new_days))
+    if old_values.shape[1:] != new_values.shape[1:]:
+        return 0
+    moved = np.flatnonzero(np.asarray(old_days[:common]) != np.asarray(new_days[:common]))
+    first = int(moved[0]) if len(moved) else common
+    old, new = np.asarray(old_values[:first]), np.asarray(new_values[:first])
+    changed = np.flatnonzero(((old != new) & ~(np.isnan(old) & np.isnan(new))).reshape(first, -1).any(axis=1))
+    return int(changed[0]) if len(changed) else first
+
+
+class RateAPI:
+    """Запросы к курсам поверх массивов, загруженных один раз."""
+
+    def __init__(self, rates: AbsoluteRates, panel: Optional[Panel] = None,
+                 cache: Optional[QueryCache] = None):
+        self.cache = cache if cache is not None else QueryCache()
+        self.rates_dir: Optional[str] = None
+        self.store: Optional[PairStore] = None
+        self.panel_source: Optional[str] = None
+        self.stamp: Optional[str] = None
+        self.normalizations: List[str] = list(DEFAULT_NORMALIZATIONS)
+        self.cache_epoch = self.cache.epoch
+        self._set_arrays(rates, panel)
+
+    def _set_arrays(self, rates: AbsoluteRates, panel: Optional[Panel]) -> None:
+        self.rates = rates
+        self.days = np.asarray(rates.days)
+        self.currency_index = {code: i for i, code in enumerate(rates.currencies)}
+        self.panel = panel
+        self.symbol_index = {symbol: j for j, symbol in enumerate(panel.symbols)} if panel else {}
+        self._normalized: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_store(cls, rates_dir: str = ABSOLUTE_DIR, store: Optional[PairStore] = None,
+                   panel_source: Optional[str] = None, cache: Optional[QueryCache] = None) -> 'RateAPI':
+        stamp = _solution_stamp(rates_dir)
+        rates = load_absolute_rates(rates_dir, mmap=True)
+        if panel_source:
+            store = store or PairStore()
+        panel = build_panel(store, panel_source, days=np.asarray(rates.days)) if panel_source else None
+        api = cls(rates, panel, cache)
+        api.rates_dir, api.store, api.panel_source, api.stamp = rates_dir, store, panel_source, stamp
+        return api
+
+    def pinned(self) -> 'RateAPI':
+        """
+        Копия API с текущими массивами для одного запроса: refresh() заменяет
+        атрибуты самого API, а не копии, поэтому потоковая выдача не смешивает
+        решения. После инвалидации кэша копия работает мимо кэша (cached).
+        """
+        view = copy.copy(self)
+        view.cache_epoch = self.cache.epoch
+        return view
+
+    def load_refresh(self) -> Optional[Tuple[str, AbsoluteRates, Optional[Panel], int, Dict[str, np.ndarray]]]:
+        """
+        Читает пересчитанное решение (по updated_at в meta.json), не меняя API:
+        (отметка, курсы, панель, первая изменившаяся строка, нормировки
+        self.normalizations) или None, если решение не менялось.
+        Блокирующий ввод-вывод и расчет - вызывать вне цикла событий.
+        """
+        if self.rates_dir is None:
+            return None
+        stamp = _solution_stamp(self.rates_dir)
+        if stamp == self.stamp:
+            return None
+        rates = load_absolute_rates(self.rates_dir, mmap=True)
+        panel = build_panel(self.store, self.panel_source, days=np.asarray(rates.days)) if self.panel_source else None
+        if list(rates.currencies) != list(self.rates.currencies):
+            first = 0
+        else:
+            first = first_changed_row(self.days, self.rates.log_rates, rates.days, rates.log_rates)
+        if panel is not None and self.panel is not None:
+            first = min(first, first_changed_row(self.days, self.panel.values, panel.days, panel.values)
+                        if panel.symbols == self.panel.symbols else 0)
+        return stamp, rates, panel, first, self.load_normalizations(rates, self.normalizations)
+
+    def apply_refresh(self, loaded: Tuple[str, AbsoluteRates, Optional[Panel], int, Dict[str, np.ndarray]]) -> None:
+        """Заменяет массивы прочитанными load_refresh и удаляет устаревшие ряды из кэша."""
+        stamp, rates, panel, first, normalized = loaded
+        self._set_arrays(rates, panel)
+        self._normalized.update(normalized)
+        self.stamp = stamp
+        self.cache.invalidate_from(first)
+        self.cache_epoch = self.cache.epoch
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает решение, если оно пересчитано с момента загрузки, и удаляет
+        из кэша ряды, задевающие первую изменившуюся строку. Возвращает True,
+        если массивы заменены.
+        """
+        loaded = self.load_refresh()
+        if loaded is None:
+            return False
+        self.apply_refresh(loaded)
+        return True
+
+    # --- Индексы ---
+    def currency_ids(self, codes: List[str]) -> np.ndarray:
+        missing = [code for code in codes if code not in self.currency_index]
+        if missing:
+            raise RequestError(f"Неизвестные валюты: {','.join(missing)}", 404)
+        return np.array([self.currency_index[code] for code in codes], dtype=np.int64)
+
+    def asof_rows(self, days: np.ndarray) -> np.ndarray:
+        """Строки решения для дат as-of; дата раньше начала решения - ошибка."""
+        rows = np.searchsorted(self.days, days, side='right') - 1
+        if (rows < 0).any():
+            raise RequestError(f"Нет курсов раньше {days_to_dates(self.days[0])}", 404)
+        return rows
+
+    def range_rows(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(self.days, _parse_days([start])[0], side='left'))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, _parse_days([end])[0], side='right'))
+        return lo, max(lo, hi)
+
+    def load_normalizations(self, rates: AbsoluteRates, names: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Лог-курсы решения rates в нормировках names (кэш рядом с решением или
+        расчет в памяти). Нормировки, неприменимые к валютам решения, пропускаются.
+        Блокирующий ввод-вывод и расчет - вызывать вне цикла событий.
+        """
+        currencies = list(rates.currencies)
+        names = [name for name in names if _applicable(name, currencies)]
+        if not names:
+            return {}
+        if self.rates_dir is not None:
+            return {name: normalized.log_rates
+                    for name, normalized in NormalizationCache(self.rates_dir).get(names).items()}
+        return dict(zip(names, normalize(rates.log_rates, currencies, names)))
+
+    def prepare_normalizations(self) -> None:
+        """Считает нормировки self.normalizations для текущего решения (при старте сервиса)."""
+        self._normalized.update(self.load_normalizations(self.rates, self.normalizations))
+
+    def pending_normalization(self, path: str, params: Dict[str, List[str]]) -> Optional[str]:
+        """Нормировка, которую запрос потребует посчитать (None - не нужна или уже посчитана)."""
+        name = params.get('normalization', [None])[0]
+        if path != '/absolute' or name is None or name in self._normalized:
+            return None
+        return name
+
+    def log_rates(self, normalization: Optional[str] = None) -> np.ndarray:
+        """Лог-курсы решения как есть или в нормировке (считается один раз на загрузку решения)."""
+        if normalization is None:
+            return self.rates.log_rates
+        if normalization not in self._normalized:
+            try:
+                basket_weights(normalization, list(self.rates.currencies))   # до любого обращения к диску
+            except ValueError as e:
+                raise RequestError(str(e))
+            try:
+                values = self.load_normalizations(self.rates, [normalization])[normalization]
+            except ValueError as e:
+                raise RequestError(str(e))
+            self._normalized[normalization] = values
+        return self._normalized[normalization]
+
+    # --- Запросы ---
+    def absolute(self, codes: List[str], rows: np.ndarray, normalization: Optional[str] = None) -> np.ndarray:
+        """exp(x) для валют codes на строках rows: (len(rows), len(codes))."""
+        return np.exp(self.log_rates(normalization)[rows][:, self.currency_ids(codes)])
+
+    def cross(self, pairs: List[str], rows: np.ndarray, source: Optional[str] = None) -> np.ndarray:
+        """
+        Курсы пар BASE/QUOTE: exp(x_base - x_quote) или наблюдаемые закрытия (source='observed').
+        От нормировки кросс-курс не зависит - сдвиг на дату сокращается.
+        """
+        if source == OBSERVED:
+            if self.panel is None:
+                raise RequestError("Панель наблюдений не загружена (--panel-source)")
+            missing = [pair for pair in pairs if pair not in self.symbol_index]
+            if missing:
+                raise RequestError(f"Пар нет в панели: {','.join(missing)}", 404)
+            return self.panel.values[rows][:, [self.symbol_index[pair] for pair in pairs]]
+        try:
+            base, quote = zip(*(pair.split('/') for pair in pairs))
+        except ValueError:
+            raise RequestError(f"Пары задаются как BASE/QUOTE: {','.join(pairs)}")
+        log_rates = self.rates.log_rates[rows]
+        return np.exp(log_rates[:, self.currency_ids(list(base))] - log_rates[:, self.currency_ids(list(quote))])
+
+    def convert(self, from_codes: List[str], to_codes: List[str], amounts: np.ndarray,
+                days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Пакетная конвертация amount * exp(x_from - x_to) на даты as-of; возвращает (суммы, строки)."""
+        try:
+            f, t, a, d = np.broadcast_arrays(self.currency_ids(from_codes), self.currency_ids(to_codes),
+                                             amounts, days)
+        except ValueError:
+            raise RequestError("Длины списков from/to/amount/date должны совпадать или быть равны 1")
+        rows = self.asof_rows(d)
+        log_rates = self.rates.log_rates
+        return a * np.exp(log_rates[rows, f] - log_rates[rows, t]), rows
+
+    def cached(self, kind: str, variant: Optional[str], names: List[str], rows: np.ndarray,
+               rows_key: Tuple, compute) -> np.ndarray:
+        """
+        Столбцы names на строках rows через кэш: каждый ряд - отдельная запись
+        (kind, имя, variant, rows_key), недостающие считаются одним вызовом compute(names, rows).
+        """
+        if self.cache_epoch != self.cache.epoch:
+            # Запрос закреплен за решением, которое уже заменено: кэш относится к новому
+            return compute(names, rows)
+        keys = [(kind, name, variant, rows_key) for name in names]
+        columns = [self.cache.get(key) for key in keys]
+        missing = [i for i, column in enumerate(columns) if column is None]
+        if missing:
+            values = compute([names[i] for i in missing], rows)
+            end_row = int(rows.max()) + 1 if len(rows) else 0
+            for j, i in enumerate(missing):
+                columns[i] = np.ascontiguousarray(values[:, j])
+                self.cache.put(keys[i], columns[i], end_row)
+        return np.column_stack(columns) if columns else np.empty((len(rows), 0))
+
+    # --- Маршрутизация ---
+    def handle(self, path: str, params: Dict[str, List[str]]):
+        """
+        Возвращает готовый JSON-ответ (dict) или итератор строк NDJSON
+        для потоковой выдачи диапазона. Запрос видит массивы на момент вызова.
+        """
+        return self.pinned()._route(path, params)
+
+    def _route(self, path: str, params: Dict[str, List[str]]):
+        if path == '/cache':
+            return self.cache.stats()
+        if path == '/health':
+            return {'status': 'ok', 'days': int(len(self.days)), 'currencies': len(self.currency_index),
+                    'last_date': str(days_to_dates(self.days[-1])) if len(self.days) else None,
+                    'panel_pairs': len(self.symbol_index)}
+        if path == '/absolute':
+            names = _split(params, 'currencies')
+            kind, variant = 'absolute', params.get('normalization', [None])[0]
+            compute = lambda names, rows: self.absolute(names, rows, variant)
+        elif path == '/cross':
+            names = _split(params, 'pairs')
+            kind, variant = 'cross', params.get('source', [None])[0]
+            compute = lambda names, rows: self.cross(names, rows, variant)
+        elif path == '/convert':
+            amounts = _split(params, 'amount', required=False) or ['1']
+            try:
+                amounts = np.array(amounts, dtype=np.float64)
+            except ValueError:
+                raise RequestError("amount должен быть числом")
+            days = _parse_days(_split(params, 'date'))
+            values, rows = self.convert(_split(params, 'from'), _split(params, 'to'), amounts, days)
+            return {'dates': days_to_dates(self.days[rows]).astype(str).tolist(),
+                    'amounts': _json_values(values)}
+        else:
+            raise RequestError(f"Неизвестный путь {path}", 404)
+
+        # Ошибки параметров - до начала потоковой выдачи, пока можно вернуть 4xx
+        compute(names, np.empty(0, dtype=np.int64))
+        if 'date' in params:
+            rows = self.asof_rows(_parse_days(_split(params, 'date')))
+            values = self.cached(kind, variant, names, rows, tuple(rows.tolist()), compute)
+            return {'dates': days_to_dates(self.days[rows]).astype(str).tolist(),
+                    'names': names, 'values': [_json_values(row) for row in values]}
+        lo, hi = self.range_rows(params.get('start', [None])[0], params.get('end', [None])[0])
+        if (hi - lo) * 8 <= self.cache.max_bytes:
+            # Ряды диапазона целиком в кэше; большие диапазоны считаются блоками при выдаче
+            values = self.cached(kind, variant, names, np.arange(lo, hi), ('range', lo, hi), compute)
+            return self._stream(names, lambda rows: values[rows - lo], lo, hi)
+        return self._stream(names, lambda rows: compute(names, rows), lo, hi)
+
+    def _stream(self, names: List[str], compute, lo: int, hi: int) -> Iterator[bytes]:
+        for start in range(lo, hi, STREAM_ROWS):
+            rows = np.arange(start, min(start + STREAM_ROWS, hi))
+            values = compute(rows)
+            dates = days_to_dates(self.days[rows]).astype(str)
+            yield b''.join(
+                json.dumps({'date': date, **dict(zip(names, _json_values(row)))}).encode('utf-8') + b'\n'
+                for date, row in zip(dates, values))
+
+
+def _applicable(name: str, currencies: List[str]) -> bool:
+    try:
+        basket_weights(name, currencies)
+    except ValueError:
+        return False
+    return True
+
+
+def _json_values(values: np.ndarray) -> List[Optional[float]]:
+    """float -> JSON (NaN -> null)."""
+    return [None if v != v else v for v in np.asarray(values, dtype=np.float64).tolist()]
+
+
+# --- HTTP ---
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}'] + [f'{k}: {v}' for k, v in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def _respond_json(writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(_head(status, {'Content-Type': 'application/json; charset=utf-8',
+                                'Content-Length': str(len(body)),
+                                'Connection': 'keep-alive' if keep_alive else 'close'}) + body)
+    await writer.drain()
+
+
+class StreamAborted(Exception):
+    """Ошибка после отправки заголовков: ответ уже не исправить, соединение закрывается без завершающего блока."""
+
+
+async def _respond_stream(writer: asyncio.StreamWriter, chunks: Iterator[bytes], keep_alive: bool) -> None:
+    writer.write(_head(200, {'Content-Type': 'application/x-ndjson',
+                             'Transfer-Encoding': 'chunked',
+                             'Connection': 'keep-alive' if keep_alive else 'close'}))
+    try:
+        for chunk in chunks:
+            writer.write(f'{len(chunk):x}\r\n'.encode('latin-1') + chunk + b'\r\n')
+            await writer.drain()      # медленный клиент не раздувает буфер сервера
+    except Exception as e:
+        raise StreamAborted(f'{type(e).__name__}: {e}') from e
+    writer.write(b'0\r\n\r\n')
+    await writer.drain()
+
+
+class RateServer:
+    """HTTP/1.1-сервер поверх asyncio.start_server для одного RateAPI."""
+
+    def __init__(self, api: RateAPI):
+        self.api = api
+        self.requests = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.split(' ')
+                except ValueError:
+                    await _respond_json(writer, 400, {'error': 'Некорректная строка запроса'}, False)
+                    break
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                try:
+                    content_length = int(headers.get('content-length', 0) or 0)
+                    if content_length < 0:
+                        raise ValueError(content_length)
+                except ValueError:
+                    # Без длины тела границу следующего запроса не найти - соединение закрывается
+                    await _respond_json(writer, 400, {'error': 'Некорректный Content-Length'}, False)
+                    break
+                if content_length:
+                    await reader.readexactly(content_length)
+                self.requests += 1
+                if method != 'GET':
+                    await _respond_json(writer, 405, {'error': 'Поддерживается только GET'}, keep_alive)
+                else:
+                    try:
+                        await self.respond(writer, target, keep_alive)
+                    except StreamAborted as e:
+                        print(f"⚠️  Потоковый ответ прерван: {e}")
+                        break
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, target: str, keep_alive: bool) -> None:
+        """
+        Отвечает на GET target. Первый блок потокового ответа считается до
+        отправки заголовков, чтобы ошибка в нем еще могла стать 4xx/5xx.
+        """
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        try:
+            api = self.api.pinned()
+            normalization = api.pending_normalization(url.path, params)
+            if normalization is not None:
+                # Чтение кэша нормировки или расчет по всей панели - в пуле потоков
+                await asyncio.get_running_loop().run_in_executor(None, api.log_rates, normalization)
+            result = api._route(url.path, params)
+            if not isinstance(result, dict):
+                chunks = iter(result)
+                first = next(chunks, None)
+                result = chunks if first is None else itertools.chain([first], chunks)
+        except RequestError as e:
+            await _respond_json(writer, e.status, {'error': str(e)}, keep_alive)
+        except Exception as e:    # сервис не должен падать из-за одного запроса
+            await _respond_json(writer, 500, {'error': f'{type(e).__name__}: {e}'}, keep_alive)
+        else:
+            if isinstance(result, dict):
+                await _respond_json(writer, 200, result, keep_alive)
+            else:
+                await _respond_stream(writer, result, keep_alive)
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+
+async def refresh_periodically(api: RateAPI, seconds: float) -> None:
+    """Фоновая проверка пересчета решения (см. RateAPI.refresh)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            loaded = await loop.run_in_executor(None, api.load_refresh)
+        except (OSError, ValueError) as e:    # решение может быть на середине записи
+            print(f"⚠️  Не удалось перечитать решение: {e}")
+            continue
+        if loaded is not None:
+            # Замена массивов - в цикле событий, между запросами
+            api.apply_refresh(loaded)
+            print(f"🔄 Решение перечитано: дат {len(api.days)}, кэш: {api.cache.stats()}")
+
+
+async def run(api: RateAPI, host: str, port: int, refresh_seconds: float = REFRESH_SECONDS) -> None:
+    server = await RateServer(api).serve(host, port)
+    refresher = asyncio.create_task(refresh_periodically(api, refresh_seconds)) if refresh_seconds > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if refresher is not None:
+            refresher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-сервис абсолютных и кросс-курсов")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--rates-dir', default=ABSOLUTE_DIR)
+    parser.add_argument('--panel-source', help="Источник панели наблюдаемых курсов (например, best)")
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_MAX_BYTES / 2 ** 20,
+                        help="Бюджет кэша рядов, МБ (0 - без кэша)")
+    parser.add_argument('--refresh-seconds', type=float, default=REFRESH_SECONDS,
+                        help="Период проверки пересчета решения (0 - не проверять)")
+    parser.add_argument('--normalizations', default=','.join(DEFAULT_NORMALIZATIONS),
+                        help="Нормировки, считаемые заранее, через запятую")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.rates_dir, 'meta.json')):
+        print("✗ Нет абсолютных курсов. Запустите analysis/absolute_rates.py")
+        return 1
+    api = RateAPI.from_store(args.rates_dir, panel_source=args.panel_source,
+                             cache=QueryCache(int(args.cache_mb * 2 ** 20)))
+    api.normalizations = [name for name in args.normalizations.split(',') if name]
+    api.prepare_normalizations()
+    print(f"🌐 Сервис курсов: http://{args.host}:{args.port}")
+    print(f"   валют: {len(api.currency_index)}, дат: {len(api.days)}, пар в панели: {len(api.symbol_index)}")
+    try:
+        asyncio.run(run(api, args.host, args.port, args.refresh_seconds))
+    except KeyboardInterrupt:
+        print("\n⏹️  Остановлен")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
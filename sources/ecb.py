@@ -0,0 +1,201 @@
+"""
+Потоковая загрузка исторических курсов ECB (eurofxref-hist.xml) в колоночное хранилище.
+
+В отличие от scripts/research/ecb/test_historical_depth.py документ не
+собирается в ElementTree целиком: iterparse отдает по одному дню, обработанные
+элементы сразу очищаются. Курсы копятся в компактных типизированных буферах
+(array('i') / array('d')) блоками по ECB_BLOCK_DAYS дней документа; блоки
+превращаются в numpy-колонки (12 байт на курс), и каждая пара EUR/XXX
+источника 'ecb' пишется в хранилище один раз - дописыванием в конец ряда,
+если даты новые, иначе одним слиянием. Полная история при обновлении
+скачивается в файл HTTP-кэша по частям и разбирается из файла.
+"""
+
+import logging
+import itertools
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from storage.pair_store import PairStore, DATE_COLUMN, dates_to_days, earliest_last_day, rows_after
+from sources.http_cache import ConditionalFetcher
+
+SOURCE_NAME = 'ecb'
+BASE_CURRENCY = 'EUR'
+ECB_HISTORICAL_XML_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.xml"
+ECB_HIST_90D_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist-90d.xml"
+REQUEST_TIMEOUT = 30
+# Файл за 90 дней достаточен, если в хранилище нет пропуска длиннее этого окна
+HIST_90D_WINDOW_DAYS = 85
+# Дней документа в одном блоке, сливаемом в хранилище (~4 года, ~30 валют)
+ECB_BLOCK_DAYS = 1000
+
+logger = logging.getLogger(__name__)
+
+ECB_CUBE_TAG = '{http://www.ecb.int/vocabulary/2002-08-01/eurofxref}Cube'
+
+
+def iter_ecb_days(stream) -> Iterator[Tuple[str, List[Tuple[str, float]]]]:
+    """
+    Итерирует документ ECB по дням: (дата 'YYYY-MM-DD', [(валюта, курс), ...]).
+    stream - путь к файлу или файлоподобный объект.
+    Память не зависит от размера документа: каждый день очищается после разбора.
+    """
+    context = ET.iterparse(stream, events=('start', 'end'))
+    root = None
+    for event, elem in context:
+        if root is None:
+            root = elem
+        if event != 'end' or elem.tag != ECB_CUBE_TAG:
+            continue
+        day = elem.get('time')
+        if day is None:
+            continue
+        rates = [(cube.get('currency'), float(cube.get('rate'))) for cube in elem]
+        yield day, rates
+        # Очищаем и сам день, и ссылки на него у корня
+        elem.clear()
+        root.clear()
+
+
+def collect_ecb_rates(days: Iterable[Tuple[str, List[Tuple[str, float]]]],
+                      currencies: Optional[List[str]] = None,
+                      after_day: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Собирает поток дней в колонки по валютам: {'EUR/USD': {'datetime': ..., 'close': ...}}.
+    after_day - пропускать даты не позже указанной (int32 дни), для дозагрузки.
+    """
+    day_buffers: Dict[str, array] = {}
+    rate_buffers: Dict[str, array] = {}
+    wanted = set(currencies) if currencies else None
+
+    for day_str, rates in days:
+        day = int(dates_to_days(day_str))
+        if after_day is not None and day <= after_day:
+            continue
+        for currency, rate in rates:
+            if wanted is not None and currency not in wanted:
+                continue
+            if currency not in day_buffers:
+                day_buffers[currency] = array('i')
+                rate_buffers[currency] = array('d')
+            day_buffers[currency].append(day)
+            rate_buffers[currency].append(rate)
+
+    series = {}
+    for currency in day_buffers:
+        series[f"{BASE_CURRENCY}/{currency}"] = {
+            DATE_COLUMN: np.frombuffer(day_buffers[currency], dtype=np.int32),
+            'close': np.frombuffer(rate_buffers[currency], dtype=np.float64),
+        }
+    return series
+
+
+def iter_ecb_blocks(days: Iterable[Tuple[str, List[Tuple[str, float]]]],
+                    currencies: Optional[List[str]] = None,
+                    after_day: Optional[int] = None,
+                    block_days: int = ECB_BLOCK_DAYS) -> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+    """
+    То же, что collect_ecb_rates, но колонки отдаются блоками по block_days
+    дней потока; блоки без подходящих дат пропускаются.
+    """
+    days = iter(days)
+    while True:
+        block = list(itertools.islice(days, block_days))
+        if not block:
+            return
+        series = collect_ecb_rates(block, currencies, after_day)
+        if series:
+            yield series
+
+
+def merge_ecb_blocks(store: PairStore, blocks: Iterable[Dict[str, Dict[str, np.ndarray]]],
+                     after_days: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, int]:
+    """
+    Собирает колонки блоков по парам и пишет каждую пару в хранилище один
+    раз (append_series: дописывание, если даты позже сохраненных, иначе
+    слияние). after_days - последние сохраненные даты пар: строки не позже
+    даты своей пары пропускаются.
+    Возвращает словарь пара -> количество слитых строк.
+    """
+    after_days = after_days or {}
+    parts: Dict[str, List[Dict[str, np.ndarray]]] = {}
+    for series in blocks:
+        for symbol, columns in series.items():
+            columns = rows_after(columns, after_days.get(symbol))
+            if len(columns[DATE_COLUMN]):
+                parts.setdefault(symbol, []).append(columns)
+
+    merged: Dict[str, int] = {}
+    for symbol, symbol_parts in parts.items():
+        columns = {name: np.concatenate([part[name] for part in symbol_parts]) for name in symbol_parts[0]}
+        # Документ ECB идет от новых дат к старым
+        order = np.argsort(columns[DATE_COLUMN], kind='stable')
+        store.append_series(SOURCE_NAME, symbol, {name: values[order] for name, values in columns.items()})
+        merged[symbol] = len(order)
+    return merged
+
+
+def open_ecb_stream(url: str = ECB_HISTORICAL_XML_URL, session: Optional[requests.Session] = None):
+    """Открывает HTTP-ответ ECB как поток без буферизации всего тела."""
+    session = session or requests.Session()
+    response = session.get(url, timeout=REQUEST_TIMEOUT, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response.raw
+
+
+def ingest_ecb_history(store: PairStore, stream,
+                       currencies: Optional[List[str]] = None,
+                       block_days: int = ECB_BLOCK_DAYS) -> Dict[str, int]:
+    """
+    Загружает документ ECB (файл или поток) в хранилище, источник 'ecb',
+    блоками по block_days дней. Существующие ряды дополняются, совпадающие
+    даты перезаписываются. Возвращает словарь пара -> количество строк в хранилище.
+    """
+    merged = merge_ecb_blocks(store, iter_ecb_blocks(iter_ecb_days(stream), currencies,
+                                                     block_days=block_days))
+    return {symbol: store.read_meta(SOURCE_NAME, symbol)['rows'] for symbol in merged}
+
+
+def update_ecb(store: PairStore, fetcher: ConditionalFetcher,
+               currencies: Optional[List[str]] = None,
+               today: Optional[int] = None) -> Dict[str, int]:
+    """
+    Инкрементальное обновление рядов ECB (currencies=None - пары, уже есть
+    в хранилище). Если самый отстающий из рядов отстает не больше чем на окно
+    90-дневного файла, берется eurofxref-hist-90d.xml (десятки КБ) вместо
+    полной истории; в каждую пару добавляются только даты позже ее последней
+    сохраненной, поэтому отставшие ряды и новые валюты дозагружаются.
+    Возвращает словарь пара -> количество добавленных строк.
+    """
+    if currencies:
+        symbols = [f"{BASE_CURRENCY}/{c}" for c in currencies if c != BASE_CURRENCY]
+    else:
+        symbols = store.symbols(SOURCE_NAME)
+    last_days = store.last_days(SOURCE_NAME, symbols)
+    start_day = earliest_last_day(last_days)
+    if today is None:
+        today = int(dates_to_days(np.datetime64('today')))
+
+    if start_day is not None and today - start_day <= HIST_90D_WINDOW_DAYS:
+        url = ECB_HIST_90D_URL
+    else:
+        url = ECB_HISTORICAL_XML_URL
+
+    result = fetcher.fetch(url, stream=True)
+    # Неизмененный документ уже разобран, если все ряды дошли до одной даты;
+    # отставший ряд дозагружается и из кэшированного тела
+    if not result.changed and start_day is not None and start_day == max(last_days.values()):
+        logger.info("ECB: документ не изменился, обновление не требуется")
+        return {}
+
+    added = merge_ecb_blocks(store, iter_ecb_blocks(iter_ecb_days(result.path),
+                                                    currencies, after_day=start_day),
+                             after_days=last_days)
+    logger.info(f"ECB ({url.rsplit('/', 1)[-1]}): добавлено {sum(added.values())} строк "
+                f"по {len(added)} парам")
+    return added
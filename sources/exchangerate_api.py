@@ -0,0 +1,95 @@
+"""
+ExchangeRate-API: снимок курсов от одной базовой валюты (нумерера).
+
+Один запрос /latest/{base} возвращает курсы base -> все ~165 валют, поэтому
+полная кросс-матрица выводится локально: M[i, j] = r[j] / r[i].
+Вместо N запросов (по одному на базу) на снимок приходится один запрос.
+Снимок сохраняется в колоночное хранилище как пары USD/XXX источника
+'exchangerate_api' - по одной строке на дату.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from storage.pair_store import PairStore, DATE_COLUMN
+
+SOURCE_NAME = 'exchangerate_api'
+API_BASE_URL = "https://v6.exchangerate-api.com/v6"
+NUMERAIRE = 'USD'
+REQUEST_TIMEOUT = 15
+SECONDS_PER_DAY = 86400
+
+logger = logging.getLogger(__name__)
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """Сессия с пулом соединений и повторами на временные ошибки."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': 'AbsCur3-Research/1.0'})
+    return session
+
+
+def fetch_snapshot(session: requests.Session, api_key: str,
+                   numeraire: str = NUMERAIRE) -> Tuple[int, Dict[str, float]]:
+    """
+    Запрашивает снимок курсов от нумерера.
+    Возвращает (дата обновления в int32-днях, {валюта: курс}).
+    """
+    url = f"{API_BASE_URL}/{api_key}/latest/{numeraire}"
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('result') != 'success':
+        raise RuntimeError(f"ExchangeRate-API: {data.get('error-type', 'unknown error')}")
+
+    rates = {k: float(v) for k, v in data.get('conversion_rates', {}).items()
+             if isinstance(v, (int, float)) and v > 0}
+    day = int(data['time_last_update_unix']) // SECONDS_PER_DAY
+    return day, rates
+
+
+def cross_matrix(rates: Dict[str, float],
+                 currencies: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Полная кросс-матрица из одного снимка: M[i, j] - цена 1 единицы i в валюте j.
+    Валюты без курса в снимке пропускаются.
+    """
+    codes = [c for c in (currencies or sorted(rates)) if c in rates]
+    values = np.array([rates[c] for c in codes], dtype=np.float64)
+    return codes, values[np.newaxis, :] / values[:, np.newaxis]
+
+
+def store_snapshot(store: PairStore, day: int, rates: Dict[str, float],
+                   numeraire: str = NUMERAIRE) -> int:
+    """Дописывает снимок в хранилище (пары NUMERAIRE/XXX). Возвращает число пар."""
+    count = 0
+    for currency, rate in rates.items():
+        if currency == numeraire:
+            continue
+        store.merge_series(SOURCE_NAME, f"{numeraire}/{currency}", {
+            DATE_COLUMN: np.array([day], dtype=np.int32),
+            'close': np.array([rate], dtype=np.float64),
+        })
+        count += 1
+    logger.info(f"ExchangeRate-API: снимок {numeraire} сохранен, {count} пар")
+    return count
+
+
+def update_exchangerate_api(store: PairStore, session: requests.Session, api_key: str,
+                            numeraire: str = NUMERAIRE) -> Dict[str, int]:
+    """Ежедневный снимок: один запрос, результат - в хранилище."""
+    last_day = store.source_last_day(SOURCE_NAME)
+    day, rates = fetch_snapshot(session, api_key, numeraire)
+    if last_day is not None and day <= last_day:
+        logger.info("ExchangeRate-API: снимок за эту дату уже сохранен")
+        return {}
+    store_snapshot(store, day, rates, numeraire)
+    return {f"{numeraire}/{c}": 1 for c in rates if c != numeraire}
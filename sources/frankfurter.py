@@ -0,0 +1,102 @@
+"""
+Frankfurter.app: инкрементальная загрузка курсов к EUR в колоночное хранилище.
+
+Вместо запросов по отдельным датам используется эндпоинт диапазона
+/{start}..{end}: при ежедневном обновлении запрашиваются только дни после
+последней сохраненной даты, ответ занимает единицы килобайт. URL диапазона
+меняется каждый день, поэтому запись HTTP-кэша у запроса одна (постоянный
+ключ RANGE_CACHE_KEY) и перезаписывается, а не копится по файлу на день.
+Начало диапазона - самая ранняя из последних дат запрошенных пар: отставший
+ряд или новая валюта дозагружаются, остальные пары фильтруются по своей дате.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from storage.pair_store import (PairStore, DATE_COLUMN, dates_to_days, days_to_dates,
+                                earliest_last_day, rows_after)
+from sources.http_cache import ConditionalFetcher
+
+SOURCE_NAME = 'frankfurter'
+BASE_CURRENCY = 'EUR'
+FRANKFURTER_BASE_URL = "https://api.frankfurter.app"
+# Первая дата в данных Frankfurter (совпадает с началом истории ECB)
+HISTORY_START = '1999-01-04'
+RANGE_CACHE_KEY = f"{FRANKFURTER_BASE_URL}/range"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_range_response(payload: Dict) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Разбирает ответ /{start}..{end} в колонки по парам EUR/XXX.
+    Формат: {"base": "EUR", "rates": {"2024-01-02": {"USD": 1.0956, ...}, ...}}
+    """
+    days = defaultdict(list)
+    rates = defaultdict(list)
+    for day_str, day_rates in payload.get('rates', {}).items():
+        day = int(dates_to_days(day_str))
+        for currency, rate in day_rates.items():
+            days[currency].append(day)
+            rates[currency].append(rate)
+
+    base = payload.get('base', BASE_CURRENCY)
+    return {
+        f"{base}/{currency}": {
+            DATE_COLUMN: np.array(days[currency], dtype=np.int32),
+            'close': np.array(rates[currency], dtype=np.float64),
+        }
+        for currency in days
+    }
+
+
+def fetch_range(fetcher: ConditionalFetcher, start: str, end: str = '',
+                currencies: Optional[List[str]] = None):
+    """Запрашивает курсы к EUR за диапазон дат (end='' - по сегодняшний день)."""
+    params = {'from': BASE_CURRENCY}
+    if currencies:
+        params['to'] = ','.join(c for c in currencies if c != BASE_CURRENCY)
+    return fetcher.fetch(f"{FRANKFURTER_BASE_URL}/{start}..{end}", params,
+                         cache_key=RANGE_CACHE_KEY + json.dumps(params, sort_keys=True))
+
+
+def update_frankfurter(store: PairStore, fetcher: ConditionalFetcher,
+                       currencies: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Дозагружает в хранилище по каждой паре только даты после ее последней
+    сохраненной (currencies=None - пары, уже есть в хранилище).
+    Возвращает словарь пара -> количество добавленных строк.
+    """
+    if currencies:
+        symbols = [f"{BASE_CURRENCY}/{c}" for c in currencies if c != BASE_CURRENCY]
+    else:
+        symbols = store.symbols(SOURCE_NAME)
+    last_days = store.last_days(SOURCE_NAME, symbols)
+    start_day = earliest_last_day(last_days)
+    if start_day is None:
+        start = HISTORY_START
+    else:
+        start = str(days_to_dates(start_day + 1))
+
+    result = fetch_range(fetcher, start, currencies=currencies)
+    # Неизмененный документ уже разобран, если все ряды дошли до одной даты;
+    # отставший ряд дозагружается и из кэшированного тела
+    if not result.changed and start_day is not None and start_day == max(last_days.values()):
+        logger.info("Frankfurter: ответ не изменился, обновление не требуется")
+        return {}
+
+    series = parse_range_response(json.loads(result.content))
+    added = {}
+    for symbol, columns in series.items():
+        # Frankfurter отдает последний рабочий день, даже если он раньше start
+        fresh = rows_after(columns, last_days.get(symbol))
+        if not len(fresh[DATE_COLUMN]):
+            continue
+        store.merge_series(SOURCE_NAME, symbol, fresh)
+        added[symbol] = len(fresh[DATE_COLUMN])
+    logger.info(f"Frankfurter (с {start}): добавлено {sum(added.values())} строк по {len(added)} парам")
+    return added
@@ -0,0 +1,142 @@
+"""
+Условные HTTP-запросы с локальным кэшем (ETag / If-Modified-Since).
+
+Тело ответа и его валидаторы хранятся в data/cache/http/<ключ>.body|.json.
+Если сервер отвечает 304 Not Modified, тело берется из кэша и помечается как
+неизменившееся - вызывающий код может вообще пропустить разбор.
+Для запросов, URL которых меняется от запуска к запуску (диапазон дат от
+последней сохраненной), передается постоянный cache_key: запись кэша одна и
+перезаписывается, а валидаторы отправляются только для того же URL.
+prune удаляет записи, которые давно не обновлялись. С stream=True тело
+копируется в кэш по частям, не собираясь в памяти, и читается из файла path.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+import requests
+
+from storage.snapshots import atomic_write, atomic_write_json
+
+CACHE_DIR = os.path.join('data', 'cache', 'http')
+REQUEST_TIMEOUT = 30
+STREAM_CHUNK_BYTES = 1 << 20
+# Записи кэша, не обновлявшиеся дольше этого срока, удаляет prune
+CACHE_MAX_AGE_DAYS = 30
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult(NamedTuple):
+    content: Optional[bytes]    # None при stream=True: тело читается из path
+    changed: bool      # False - сервер подтвердил, что документ не изменился
+    status_code: int
+    path: Optional[str] = None  # файл тела в кэше
+
+
+class ConditionalFetcher:
+    """Загрузчик с кэшем на диске и условными запросами."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR,
+                 session: Optional[requests.Session] = None,
+                 timeout: int = REQUEST_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "AbsCur3-Research/1.0")
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_paths(self, url: str, params: Optional[Dict], cache_key: Optional[str] = None):
+        key_source = cache_key or url + json.dumps(params or {}, sort_keys=True)
+        key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return f'{base}.body', f'{base}.json'
+
+    def cached_meta(self, url: str, params: Optional[Dict] = None,
+                    cache_key: Optional[str] = None) -> Optional[Dict]:
+        _, meta_path = self._cache_paths(url, params, cache_key)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def fetch(self, url: str, params: Optional[Dict] = None,
+              cache_key: Optional[str] = None, stream: bool = False) -> FetchResult:
+        """
+        Загружает документ. При наличии кэша отправляет If-None-Match /
+        If-Modified-Since; на 304 возвращает кэшированное тело с changed=False.
+        cache_key - постоянный ключ записи кэша вместо URL и параметров.
+        stream=True - тело пишется в кэш по частям и не читается в память
+        (content=None, документ - файл path).
+        """
+        body_path, meta_path = self._cache_paths(url, params, cache_key)
+        meta = self.cached_meta(url, params, cache_key)
+        headers = {}
+        # Валидаторы относятся к конкретному URL: по общему ключу мог лежать другой документ
+        if meta and os.path.exists(body_path) and meta.get('url') == url and meta.get('params') == params:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout, stream=stream)
+
+        if response.status_code == 304:
+            logger.info(f"304 Not Modified: {url} (используется кэш)")
+            # Подтвержденная запись остается свежей для prune
+            os.utime(body_path)
+            os.utime(meta_path)
+            if stream:
+                return FetchResult(None, False, 304, body_path)
+            with open(body_path, 'rb') as f:
+                return FetchResult(f.read(), False, 304, body_path)
+
+        response.raise_for_status()
+        content = None if stream else response.content
+
+        def write_body(f):
+            if content is not None:
+                f.write(content)
+                return
+            for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+                f.write(chunk)
+
+        # Сначала тело, потом метаданные, оба файла заменяются атомарно: прерванная
+        # запись не оставляет оборванное тело рядом с валидаторами прежней версии
+        atomic_write(body_path, write_body, mode='wb')
+        size = os.path.getsize(body_path)
+        atomic_write_json(meta_path, {
+            'url': url,
+            'params': params,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': size,
+            'fetched_at': datetime.now().isoformat(),
+        })
+
+        logger.info(f"Загружено {size} байт: {url}")
+        return FetchResult(content, True, response.status_code, body_path)
+
+    def prune(self, max_age_days: float = CACHE_MAX_AGE_DAYS) -> int:
+        """
+        Удаляет записи кэша (тело и метаданные), не обновлявшиеся дольше
+        max_age_days, и брошенные временные файлы. Возвращает число удаленных файлов.
+        """
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info(f"Кэш HTTP: удалено {removed} устаревших файлов")
+        return removed
@@ -0,0 +1,150 @@
+"""
+Общий исполнитель исследовательских запросов к API провайдеров.
+
+Вместо последовательных циклов с time.sleep(1.5) / time.sleep(2) каждый
+провайдер получает свой ProbeRunner: пул соединений, ограничение
+параллельности и частоты запросов, кэш ответов в памяти (одинаковые URL в
+рамках прогона запрашиваются один раз). run_concurrently запускает аудиты
+разных провайдеров одновременно - общее время равно времени самого медленного.
+"""
+
+import time
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+REQUEST_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderLimits(NamedTuple):
+    max_concurrency: int
+    requests_per_minute: float
+
+
+# Лимиты по провайдерам (бесплатные тарифы)
+PROVIDER_LIMITS = {
+    'ecb': ProviderLimits(4, 120),
+    'frankfurter': ProviderLimits(4, 60),
+    'exchangerate_api': ProviderLimits(2, 30),
+    'twelve_data': ProviderLimits(2, 7),   # 8 запр/мин, 1 оставляем про запас
+}
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class RateLimiter:
+    """Потокобезопасный лимитер: равномерно раздает слоты раз в 60/rpm секунд."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ProbeRunner:
+    """Исполнитель запросов одного провайдера."""
+
+    def __init__(self, provider: str, limits: Optional[ProviderLimits] = None,
+                 timeout: int = REQUEST_TIMEOUT):
+        self.provider = provider
+        self.limits = limits or PROVIDER_LIMITS.get(provider, ProviderLimits(2, 30))
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(self.limits.requests_per_minute)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.limits.max_concurrency,
+                              pool_maxsize=self.limits.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"User-Agent": "AbsCur3-Research/1.0"})
+
+        self.cache: Dict[str, CachedResponse] = {}
+        self.cache_lock = threading.Lock()
+        self.in_flight: Dict[str, threading.Event] = {}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'errors': 0}
+
+    def get(self, url: str, params: Optional[Dict] = None) -> CachedResponse:
+        """
+        GET с кэшем и лимитами. Параллельные запросы одного URL ждут первый,
+        а не дублируют его. Сетевые ошибки пробрасываются вызывающему.
+        """
+        key = url + json.dumps(params or {}, sort_keys=True)
+        while True:
+            with self.cache_lock:
+                if key in self.cache:
+                    self.stats['cache_hits'] += 1
+                    return self.cache[key]
+                event = self.in_flight.get(key)
+                if event is None:
+                    self.in_flight[key] = threading.Event()
+                    break
+            # Ждем первый запрос; если он не попал в кэш (ошибка) - запрашиваем сами
+            event.wait()
+
+        try:
+            self.rate_limiter.wait()
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            cached = CachedResponse(response.status_code, dict(response.headers), response.content)
+            with self.cache_lock:
+                self.stats['requests'] += 1
+                if response.status_code == 200:
+                    self.cache[key] = cached
+            return cached
+        except requests.exceptions.RequestException:
+            with self.cache_lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self.cache_lock:
+                self.in_flight.pop(key).set()
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Применяет func к элементам с параллельностью провайдера, сохраняя порядок."""
+        with ThreadPoolExecutor(max_workers=self.limits.max_concurrency,
+                                thread_name_prefix=self.provider) as pool:
+            return list(pool.map(func, items))
+
+
+def run_concurrently(audits: Dict[str, Callable[[], Dict]]) -> Dict[str, Dict]:
+    """
+    Запускает аудиты провайдеров одновременно (по потоку на провайдера).
+    Ошибка одного аудита не останавливает остальные.
+    """
+    def timed(audit: Callable[[], Dict]) -> Dict:
+        started = time.monotonic()
+        result = audit()
+        result['elapsed_sec'] = round(time.monotonic() - started, 1)
+        return result
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(len(audits), 1)) as pool:
+        futures = {name: pool.submit(timed, audit) for name, audit in audits.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"{name}: аудит завершился ошибкой: {e}")
+                results[name] = {'error': str(e)}
+    return results
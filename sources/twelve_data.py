@@ -0,0 +1,118 @@
+"""
+Twelve Data: перенос дневных CSV-файлов пар в колоночное хранилище.
+CSV в data/raw/twelve_data/pairs остаются первичным форматом загрузчика,
+хранилище - быстрым бинарным представлением тех же данных.
+
+Ответы /time_series загрузчик запрашивает в формате CSV (format=CSV,
+delimiter=';') и разбирает сразу в типизированные колонки numpy, без
+промежуточных словарей на каждый бар. Внутридневные бары (intraday=True)
+получают колонку timestamp (int64, секунды UTC) вместо дней и сохраняются
+в storage/intraday_store.py.
+"""
+
+import io
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from storage.pair_store import PairStore, DATE_COLUMN, PRICE_COLUMNS, dates_to_days
+from storage.snapshots import SnapshotReader
+from storage.intraday_store import TIME_COLUMN
+
+SOURCE_NAME = 'twelve_data'
+PAIRS_DIR = os.path.join('data', 'raw', 'twelve_data', 'pairs')
+CSV_DELIMITER = ';'
+
+
+def csv_name_to_symbol(filename: str) -> str:
+    """'EURUSD.csv' -> 'EUR/USD'."""
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return f"{name[:3]}/{name[3:]}"
+
+
+def load_pair_csv(path: str) -> Dict[str, np.ndarray]:
+    """Читает CSV пары в словарь типизированных колонок."""
+    frame = pd.read_csv(path, dtype={col: np.float64 for col in PRICE_COLUMNS})
+    columns = {DATE_COLUMN: dates_to_days(frame[DATE_COLUMN].to_numpy(dtype=str))}
+    for column in PRICE_COLUMNS:
+        columns[column] = frame[column].to_numpy(dtype=np.float64)
+    return columns
+
+
+def empty_columns(intraday: bool = False) -> Dict[str, np.ndarray]:
+    columns = {TIME_COLUMN: np.empty(0, dtype=np.int64)} if intraday else {DATE_COLUMN: np.empty(0, dtype=np.int32)}
+    columns.update({column: np.empty(0, dtype=np.float64) for column in PRICE_COLUMNS})
+    return columns
+
+
+def parse_time_series_csv(content: bytes, delimiter: str = CSV_DELIMITER,
+                          intraday: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Разбирает CSV-ответ /time_series в колонки (по возрастанию дат).
+    Строки с некорректной датой отбрасываются. Для дневных баров время внутри
+    дня (если есть) игнорируется, для внутридневных - колонка timestamp
+    в секундах (ответ запрашивается с timezone=UTC).
+    """
+    if not content.strip():
+        return empty_columns(intraday)
+    frame = pd.read_csv(io.BytesIO(content), sep=delimiter,
+                        usecols=[DATE_COLUMN] + PRICE_COLUMNS,
+                        dtype={col: np.float64 for col in PRICE_COLUMNS})
+    if intraday:
+        moments = pd.to_datetime(frame[DATE_COLUMN], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        key, unit, dtype = TIME_COLUMN, 'datetime64[s]', np.int64
+    else:
+        moments = pd.to_datetime(frame[DATE_COLUMN].str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+        key, unit, dtype = DATE_COLUMN, 'datetime64[D]', np.int32
+    valid = moments.notna().to_numpy()
+    times = moments[valid].to_numpy(dtype=unit).astype(dtype)
+    order = np.argsort(times, kind='stable')
+    columns = {key: times[order]}
+    for column in PRICE_COLUMNS:
+        columns[column] = frame[column].to_numpy(dtype=np.float64)[valid][order]
+    return columns
+
+
+def concat_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Склеивает колонки нескольких ответов (чанков) одного ряда."""
+    intraday = bool(parts) and TIME_COLUMN in parts[0]
+    parts = [part for part in parts if len(next(iter(part.values())))]
+    if not parts:
+        return empty_columns(intraday)
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+
+@contextmanager
+def pair_csv_paths(pairs_dir: str = PAIRS_DIR) -> Iterator[Dict[str, str]]:
+    """
+    Пути к CSV пар: пара -> файл (with pair_csv_paths() as paths). Если
+    загрузчик публикует снимки каталога, последний снимок закрепляется
+    арендой до выхода из with: набор файлов согласован, и prune не удалит
+    его поколения, пока загрузчик пишет новые версии. Иначе - текущие файлы.
+    """
+    snapshot = SnapshotReader(pairs_dir).pin(lease=True)
+    if snapshot is None:
+        yield {csv_name_to_symbol(name): os.path.join(pairs_dir, name)
+               for name in sorted(os.listdir(pairs_dir)) if name.endswith('.csv')}
+        return
+    with snapshot:
+        yield {csv_name_to_symbol(name): snapshot.path(name) for name in snapshot.names()}
+
+
+def import_pairs_csv(store: PairStore, pairs_dir: str = PAIRS_DIR,
+                     symbols: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Переносит CSV-файлы пар в хранилище (источник 'twelve_data').
+    Возвращает словарь пара -> количество строк.
+    """
+    imported = {}
+    with pair_csv_paths(pairs_dir) as paths:
+        for symbol, path in paths.items():
+            if symbols is not None and symbol not in symbols:
+                continue
+            columns = load_pair_csv(path)
+            imported[symbol] = store.write_series(SOURCE_NAME, symbol, columns)
+    return imported
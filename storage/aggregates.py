@@ -0,0 +1,176 @@
+"""
+Предагрегированные OHLC-уровни (неделя, месяц, год) для рядов хранилища.
+
+Уровень хранится как отдельное хранилище той же структуры:
+data/store/aggregates/<уровень>/<источник>/<SYMBOL>/ - те же npy-колонки
+(datetime = первый календарный день периода) плюс count - число дневных
+баров в периоде. Периоды считаются векторно: границы - места смены ключа
+периода, high/low - np.fmax/np.fmin.reduceat по границам.
+
+Обновление инкрементальное: пересчитываются только дневные строки начиная
+с последнего (возможно, неполного) сохраненного периода. Если дневной ряд
+изменился раньше (ревизия бара или вставка даты в середину), пересчет
+начинается с периода первого измененного дня: он находится по записям
+журналов ряда, появившимся после позиций из state.json уровня.
+Недельный запрос за 45 лет читает ~2400 строк вместо ~12000 дневных.
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from storage.pair_store import PairStore, STORE_DIR, DATE_COLUMN, PRICE_COLUMNS, days_to_dates
+from storage.snapshots import atomic_write_json
+
+AGGREGATES_DIR = os.path.join(STORE_DIR, 'aggregates')
+LEVELS = ['week', 'month', 'year']
+COUNT_COLUMN = 'count'
+STATE_FILE = 'state.json'
+
+
+def period_start(days: np.ndarray, level: str) -> np.ndarray:
+    """Первый день периода для каждой даты (int32). Недели начинаются с понедельника."""
+    days = np.asarray(days, dtype=np.int32)
+    if level == 'week':
+        # 1970-01-01 - четверг: сдвиг на 3 дня дает понедельник
+        return (days - (days + 3) % 7).astype(np.int32)
+    if level == 'month':
+        return days_to_dates(days).astype('datetime64[M]').astype('datetime64[D]').astype(np.int32)
+    if level == 'year':
+        return days_to_dates(days).astype('datetime64[Y]').astype('datetime64[D]').astype(np.int32)
+    raise ValueError(f"Неизвестный уровень агрегации: {level}")
+
+
+def aggregate_ohlc(days: np.ndarray, columns: Dict[str, np.ndarray], level: str) -> Dict[str, np.ndarray]:
+    """
+    Агрегирует дневные бары (по возрастанию дат) в периоды уровня level.
+    Ряды только с close (ECB, абсолютные курсы) дают OHLC из close.
+    Пропуски (NaN) в high/low игнорируются.
+    """
+    days = np.asarray(days, dtype=np.int32)
+    close = np.asarray(columns['close'], dtype=np.float64)
+    present = np.isfinite(close)
+    if not present.all():
+        days, close = days[present], close[present]
+        columns = {c: np.asarray(v)[present] for c, v in columns.items()}
+    if len(days) == 0:
+        return {DATE_COLUMN: np.empty(0, dtype=np.int32), **{c: np.empty(0) for c in PRICE_COLUMNS},
+                COUNT_COLUMN: np.empty(0)}
+
+    keys = period_start(days, level)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    open_ = np.asarray(columns.get('open', close), dtype=np.float64)
+    high = np.asarray(columns.get('high', close), dtype=np.float64)
+    low = np.asarray(columns.get('low', close), dtype=np.float64)
+    return {
+        DATE_COLUMN: keys[starts],
+        'open': open_[starts],
+        'high': np.fmax.reduceat(high, starts),
+        'low': np.fmin.reduceat(low, starts),
+        'close': close[ends],
+        COUNT_COLUMN: np.diff(np.r_[starts, len(keys)]).astype(np.float64),
+    }
+
+
+def aggregate_store(level: str, root: str = AGGREGATES_DIR) -> PairStore:
+    """Хранилище одного уровня агрегации."""
+    return PairStore(os.path.join(root, level), track_revisions=False)
+
+
+def _state_path(agg: PairStore, source: str, symbol: str) -> str:
+    return os.path.join(agg.series_dir(source, symbol), STATE_FILE)
+
+
+def _read_state(agg: PairStore, source: str, symbol: str) -> Optional[Dict[str, int]]:
+    path = _state_path(agg, source, symbol)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_series_aggregates(days: np.ndarray, columns: Dict[str, np.ndarray],
+                             source: str, symbol: str,
+                             levels: Sequence[str] = LEVELS, root: str = AGGREGATES_DIR,
+                             since_day: Optional[int] = None) -> Dict[str, int]:
+    """
+    Обновляет уровни агрегации одного ряда по его дневным колонкам.
+    Читаются только строки начиная с последнего сохраненного периода
+    (или с периода since_day - первого измененного дня, если он раньше);
+    эти периоды пересчитываются и перезаписываются. Возвращает число
+    пересчитанных периодов по уровням.
+    """
+    updated = {}
+    for level in levels:
+        agg = aggregate_store(level, root)
+        last_period = agg.last_day(source, symbol)
+        if last_period is not None and since_day is not None:
+            last_period = min(last_period, int(period_start([since_day], level)[0]))
+        first = 0 if last_period is None else int(np.searchsorted(days, last_period))
+        if first >= len(days):
+            updated[level] = 0
+            continue
+        tail = {c: np.asarray(v[first:]) for c, v in columns.items()}
+        periods = aggregate_ohlc(days[first:], tail, level)
+        if last_period is None:
+            agg.write_series(source, symbol, periods)
+        else:
+            agg.merge_series(source, symbol, periods)
+        updated[level] = len(periods[DATE_COLUMN])
+    return updated
+
+
+def update_source_aggregates(store: PairStore, source: str, symbols: Optional[List[str]] = None,
+                             levels: Sequence[str] = LEVELS, root: str = AGGREGATES_DIR) -> int:
+    """
+    Инкрементально обновляет агрегаты всех (или указанных) рядов источника,
+    включая периоды, задетые ревизиями и вставками с прошлого обновления.
+    """
+    symbols = store.symbols(source) if symbols is None else symbols
+    total = 0
+    for symbol in symbols:
+        if not store.has_series(source, symbol):
+            continue
+        series = store.read_series(source, symbol)
+        days = series.pop(DATE_COLUMN)
+        if 'close' not in series:
+            continue
+        for level in levels:
+            agg = aggregate_store(level, root)
+            since_day, seen = store.first_changed_day(source, symbol, _read_state(agg, source, symbol))
+            total += update_series_aggregates(days, series, source, symbol, [level], root, since_day)[level]
+            if agg.has_series(source, symbol):
+                atomic_write_json(_state_path(agg, source, symbol), seen)
+    return total
+
+
+def update_matrix_aggregates(days: np.ndarray, names: List[str], matrix: np.ndarray, source: str,
+                             levels: Sequence[str] = LEVELS, root: str = AGGREGATES_DIR) -> int:
+    """
+    Агрегаты для матрицы рядов (даты x имена), например абсолютных лог-курсов:
+    каждый столбец хранится как ряд source/<имя> с OHLC из его значений.
+    Матрица пересчитывается целиком и журналов не имеет, поэтому периоды
+    строятся заново с первого дня; неизменившиеся ряды не перезаписываются.
+    """
+    since_day = int(days[0]) if len(days) else None
+    total = 0
+    for j, name in enumerate(names):
+        column = np.asarray(matrix[:, j])
+        total += sum(update_series_aggregates(days, {'close': column}, source, name, levels, root,
+                                              since_day).values())
+    return total
+
+
+def read_aggregate(level: str, source: str, symbol: str,
+                   first_day: Optional[int] = None, last_day: Optional[int] = None,
+                   root: str = AGGREGATES_DIR) -> Dict[str, np.ndarray]:
+    """Периоды ряда в диапазоне дат (по первому дню периода); срезы memory-mapped колонок."""
+    series = aggregate_store(level, root).read_series(source, symbol)
+    days = series[DATE_COLUMN]
+    lo = 0 if first_day is None else int(np.searchsorted(days, period_start([first_day], level)[0]))
+    hi = len(days) if last_day is None else int(np.searchsorted(days, last_day, side='right'))
+    return {column: values[lo:hi] for column, values in series.items()}
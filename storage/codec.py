@@ -0,0 +1,192 @@
+"""
+Сжатое кодирование колонок хранилища (формат .zd).
+
+Котировки меняются малыми шагами и имеют немного десятичных знаков,
+поэтому колонка делится на блоки по BLOCK_ROWS строк и каждый блок
+кодируется так:
+  - подбирается наименьший десятичный масштаб d (0..MAX_SCALE), при котором
+    q = round(v * 10^d) восстанавливает значения точно (q / 10^d == v);
+  - хранятся разности соседних q в самом узком целом (int8/16/32/64)
+    и маска NaN (packbits), все вместе - zlib;
+  - если масштаб не найден, блок кодируется XOR соседних float64
+    (как в Gorilla) - тоже без потерь.
+Декодирование векторное: cumsum разностей (или bitwise_xor.accumulate)
+и деление на 10^d. Дни (int32) кодируются тем же путем с d = 0.
+
+Файл: b'ZDC1' + длина заголовка (uint32) + JSON-заголовок (dtype, число
+строк, для каждого блока - смещение, размер, число строк, режим, масштаб,
+ширина разностей, первое значение) + данные блоков. Заголовок позволяет
+читать диапазон строк, распаковывая только нужные блоки (ColumnReader.read).
+"""
+
+import json
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b'ZDC1'
+EXTENSION = '.zd'
+BLOCK_ROWS = 4096
+MAX_SCALE = 10
+ZLIB_LEVEL = 6
+DELTA = 'delta'
+XOR = 'xor'
+NAN = 'nan'          # блок целиком из NaN
+_WIDTHS = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _narrowest(deltas: np.ndarray) -> np.dtype:
+    if not len(deltas):
+        return np.dtype(np.int8)
+    lo, hi = deltas.min(), deltas.max()
+    for dtype in _WIDTHS:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _decimal_scale(values: np.ndarray) -> Optional[int]:
+    """Наименьший масштаб d, при котором значения точно представимы как q / 10^d."""
+    if np.issubdtype(values.dtype, np.integer):
+        return 0
+    # -0.0 в целых разностях превратился бы в 0.0
+    if np.signbit(values[values == 0]).any():
+        return None
+    magnitude = np.abs(values).max() if len(values) else 0.0
+    for scale in range(MAX_SCALE + 1):
+        factor = 10.0 ** scale
+        if magnitude * factor >= 2 ** 53:
+            return None
+        q = np.round(values * factor)
+        if np.array_equal(q / factor, values):
+            return scale
+    return None
+
+
+def encode_block(values: np.ndarray) -> Tuple[bytes, Dict]:
+    """Кодирует один блок; возвращает (данные, описание блока для заголовка)."""
+    rows = len(values)
+    nan = np.isnan(values) if values.dtype.kind == 'f' else np.zeros(rows, dtype=bool)
+    if nan.all():
+        return b'', {'rows': rows, 'mode': NAN}
+    mask = np.packbits(nan).tobytes() if nan.any() else b''
+    filled = values
+    if nan.any():
+        # NaN заменяются предыдущим значением - разность в них равна нулю
+        index = np.where(~nan, np.arange(rows), 0)
+        np.maximum.accumulate(index, out=index)
+        filled = values[index]
+        filled[:np.argmax(~nan)] = values[np.argmax(~nan)]
+
+    scale = _decimal_scale(filled)
+    info = {'rows': rows, 'nan': bool(len(mask))}
+    if scale is None:
+        bits = filled.astype(np.float64).view(np.uint64)
+        xored = np.empty_like(bits)
+        xored[0] = bits[0]
+        np.bitwise_xor(bits[1:], bits[:-1], out=xored[1:])
+        payload = xored.tobytes()
+        info['mode'] = XOR
+    else:
+        q = filled.astype(np.int64) if scale == 0 and filled.dtype.kind in 'iu' else \
+            np.round(filled * 10.0 ** scale).astype(np.int64)
+        deltas = np.diff(q)
+        width = _narrowest(deltas)
+        payload = deltas.astype(width).tobytes()
+        info.update({'mode': DELTA, 'scale': scale, 'width': width.str, 'first': int(q[0])})
+    return zlib.compress(mask + payload, ZLIB_LEVEL), info
+
+
+def decode_block(data: bytes, info: Dict, dtype: np.dtype) -> np.ndarray:
+    rows = info['rows']
+    if info['mode'] == NAN:
+        return np.full(rows, np.nan, dtype=dtype)
+    raw = zlib.decompress(data)
+    mask_size = (rows + 7) // 8 if info.get('nan') else 0
+    if info['mode'] == XOR:
+        bits = np.bitwise_xor.accumulate(np.frombuffer(raw, dtype=np.uint64, offset=mask_size))
+        values = bits.view(np.float64).astype(dtype)
+    else:
+        q = np.empty(rows, dtype=np.int64)
+        q[0] = info['first']
+        np.cumsum(np.frombuffer(raw, dtype=np.dtype(info['width']), offset=mask_size), out=q[1:])
+        q[1:] += info['first']
+        if np.dtype(dtype).kind in 'iu':
+            values = q.astype(dtype)
+        else:
+            values = q / 10.0 ** info['scale']
+    if mask_size:
+        nan = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, count=mask_size))[:rows].astype(bool)
+        values[nan] = np.nan
+    return values
+
+
+def encode_array(values: np.ndarray, block_rows: int = BLOCK_ROWS) -> bytes:
+    """Кодирует одномерный массив (float64 или целый) в содержимое файла .zd."""
+    values = np.asarray(values)
+    blocks, payloads, offset = [], [], 0
+    for start in range(0, len(values), block_rows):
+        data, info = encode_block(values[start:start + block_rows])
+        info.update({'offset': offset, 'size': len(data)})
+        blocks.append(info)
+        payloads.append(data)
+        offset += len(data)
+    header = json.dumps({'dtype': values.dtype.str, 'rows': int(len(values)),
+                         'block_rows': block_rows, 'blocks': blocks}).encode('utf-8')
+    return MAGIC + struct.pack('<I', len(header)) + header + b''.join(payloads)
+
+
+class ColumnReader:
+    """Чтение колонки .zd целиком или диапазоном строк (только нужные блоки)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path}: не файл колонки {EXTENSION}")
+            header_size, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size))
+        self.data_offset = 8 + header_size
+        self.dtype = np.dtype(header['dtype'])
+        self.rows = header['rows']
+        self.blocks: List[Dict] = header['blocks']
+        self.block_starts = np.cumsum([0] + [block['rows'] for block in self.blocks])
+
+    def block_firsts(self) -> np.ndarray:
+        """Первое значение каждого блока (для отсортированных колонок - поиск блока по ключу)."""
+        return np.array([block.get('first', 0) for block in self.blocks], dtype=np.int64)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+        first = int(np.searchsorted(self.block_starts, start, side='right')) - 1
+        last = int(np.searchsorted(self.block_starts, stop, side='left'))
+        blocks = self.blocks[first:last]
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset + blocks[0]['offset'])
+            data = f.read(blocks[-1]['offset'] + blocks[-1]['size'] - blocks[0]['offset'])
+        base = blocks[0]['offset']
+        parts = [decode_block(data[b['offset'] - base:b['offset'] - base + b['size']], b, self.dtype)
+                 for b in blocks]
+        values = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        offset = self.block_starts[first]
+        return values[start - offset:stop - offset]
+
+
+def decode_array(content: bytes) -> np.ndarray:
+    """Декодирует содержимое файла .zd целиком (из памяти)."""
+    header_size, = struct.unpack('<I', content[4:8])
+    header = json.loads(content[8:8 + header_size])
+    data = memoryview(content)[8 + header_size:]
+    dtype = np.dtype(header['dtype'])
+    parts = [decode_block(bytes(data[b['offset']:b['offset'] + b['size']]), b, dtype) for b in header['blocks']]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+def read_column(path: str) -> np.ndarray:
+    with open(path, 'rb') as f:
+        return decode_array(f.read())
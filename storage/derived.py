@@ -0,0 +1,298 @@
+"""
+Слой производных данных: лог-доходности и волатильности рядов хранилища.
+
+Для каждой пары (и каждого ряда абсолютного курса валюты) хранится ряд
+data/store/derived/<источник>/<SYMBOL>/ с колонками:
+  log_return  - log(close_t / close_{t-1}) по соседним наблюдениям;
+  ewma_vol    - EWMA-волатильность (RiskMetrics, lambda = 0.94);
+  rolling_vol - стандартное отклонение доходностей в окне ROLLING_WINDOW.
+Волатильности дневные, без аннуализации.
+
+Обновление инкрементальное: состояние рекурсии (последний close, EWMA-дисперсия)
+лежит в state.json ряда, для скользящего окна читается только хвост
+доходностей; новые строки дописываются PairStore.append_series. Стоимость
+обновления - O(новых строк). Читатели получают memory-mapped колонки.
+Если исходный ряд изменился раньше последнего обработанного дня (ревизия
+close из журнала revisions.bin или вставка даты в середину ряда из журнала
+insertions.bin), слой откатывается к строкам до первого измененного дня и
+пересчитывается с него: состояние рекурсии восстанавливается из последней
+сохраненной строки. Позиции журналов и число строк исходного ряда до
+последнего обработанного дня лежат в state.json, поэтому изменения ищутся
+только среди новых записей журналов; полное сравнение дней нужно лишь
+тогда, когда строки исчезли из середины ряда (удаления журналы не пишут).
+Матрица абсолютных курсов каждый раз пересчитывается целиком, поэтому для
+ее рядов первый измененный день ищется сравнением доходностей с сохраненными.
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from storage.pair_store import PairStore, STORE_DIR, DATE_COLUMN
+from storage.snapshots import atomic_write_json
+
+DERIVED_DIR = os.path.join(STORE_DIR, 'derived')
+STATE_FILE = 'state.json'
+DERIVED_COLUMNS = ['log_return', 'ewma_vol', 'rolling_vol']
+
+EWMA_LAMBDA = 0.94
+ROLLING_WINDOW = 21
+EWMA_BLOCK = 256   # 0.94 ** -256 ~ 7.6e6: блок без переполнения и потери точности
+
+
+def ewma_variance(squared: np.ndarray, lam: float = EWMA_LAMBDA,
+                  initial: Optional[float] = None, block: int = EWMA_BLOCK) -> np.ndarray:
+    """
+    Рекурсия v_t = lam * v_{t-1} + (1 - lam) * r_t^2 без цикла по строкам:
+    внутри блока - взвешенная кумулятивная сумма, между блоками переносится
+    последнее значение. initial - v до первой строки (по умолчанию r_0^2).
+    """
+    squared = np.asarray(squared, dtype=np.float64)
+    out = np.empty(len(squared))
+    if len(squared) == 0:
+        return out
+    prev = squared[0] if initial is None else initial
+    for start in range(0, len(squared), block):
+        chunk = squared[start:start + block]
+        k = np.arange(1, len(chunk) + 1)
+        decay = lam ** k
+        out[start:start + len(chunk)] = decay * (prev + (1 - lam) * np.cumsum(chunk / decay))
+        prev = out[start + len(chunk) - 1]
+    return out
+
+
+def rolling_std(returns: np.ndarray, window: int = ROLLING_WINDOW, history: int = 0) -> np.ndarray:
+    """
+    Выборочное стандартное отклонение в окне через кумулятивные суммы.
+    Первые history элементов - хвост уже обработанных доходностей: для них
+    результат не возвращается. Позиции, где в окне меньше window значений, - NaN.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    c1 = np.concatenate([[0.0], np.cumsum(returns)])
+    c2 = np.concatenate([[0.0], np.cumsum(returns ** 2)])
+    end = np.arange(history + 1, len(returns) + 1)
+    start = end - window
+    out = np.full(len(end), np.nan)
+    full = start >= 0
+    s1 = c1[end[full]] - c1[start[full]]
+    s2 = c2[end[full]] - c2[start[full]]
+    variance = (s2 - s1 ** 2 / window) / (window - 1)
+    out[full] = np.sqrt(np.maximum(variance, 0.0))
+    return out
+
+
+def derived_store(root: str = DERIVED_DIR) -> PairStore:
+    return PairStore(root, track_revisions=False)
+
+
+def _state_path(store: PairStore, source: str, symbol: str) -> str:
+    return os.path.join(store.series_dir(source, symbol), STATE_FILE)
+
+
+def _read_state(store: PairStore, source: str, symbol: str) -> Optional[Dict]:
+    path = _state_path(store, source, symbol)
+    if not os.path.exists(path) or not store.has_series(source, symbol):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _valid_days(days: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Дни с положительным конечным close - строки, из которых строится слой."""
+    close = np.asarray(close, dtype=np.float64)
+    return np.asarray(days, dtype=np.int32)[np.isfinite(close) & (close > 0)]
+
+
+def first_diverged_day(store: PairStore, source: str, symbol: str, days: np.ndarray,
+                       close: np.ndarray) -> Optional[int]:
+    """
+    Первый день, начиная с которого обработанные строки слоя расходятся с днями
+    исходного ряда (дата вставлена в середину или удалена); None, если не расходятся.
+    """
+    derived_days = np.asarray(store.read_series(source, symbol, [])[DATE_COLUMN])
+    valid = _valid_days(days, close)
+    valid = valid[:np.searchsorted(valid, derived_days[-1], side='right')] if len(derived_days) else valid[:0]
+    common = min(len(valid), len(derived_days))
+    diverged = np.flatnonzero(valid[:common] != derived_days[:common])
+    if len(diverged):
+        return int(min(valid[diverged[0]], derived_days[diverged[0]]))
+    if len(valid) != len(derived_days):
+        return int(derived_days[common]) if common < len(derived_days) else int(valid[common])
+    return None
+
+
+def first_changed_return_day(store: PairStore, source: str, symbol: str, days: np.ndarray,
+                             close: np.ndarray) -> Optional[int]:
+    """
+    Первый уже обработанный день, где лог-доходность по close отличается от
+    сохраненной (или ряд дней разошелся); None, если совпадают.
+    """
+    if not store.has_series(source, symbol):
+        return None
+    diverged = first_diverged_day(store, source, symbol, days, close)
+    derived = store.read_series(source, symbol, ['log_return'])
+    close = np.asarray(close, dtype=np.float64)
+    valid = np.isfinite(close) & (close > 0)
+    n = len(derived[DATE_COLUMN]) if diverged is None else \
+        int(np.searchsorted(derived[DATE_COLUMN], diverged))
+    returns = np.diff(np.log(np.concatenate([[np.nan], close[valid][:n]])))
+    changed = np.flatnonzero(~np.isclose(returns, derived['log_return'][:n], rtol=0.0, atol=1e-12,
+                                         equal_nan=True))
+    if len(changed):
+        return int(derived[DATE_COLUMN][changed[0]])
+    return diverged
+
+
+def _rewind(store: PairStore, source: str, symbol: str, days: np.ndarray, close: np.ndarray,
+            since_day: int):
+    """
+    Строки слоя до since_day и состояние рекурсии на последней из них
+    (None, если таких строк нет - слой строится заново).
+    """
+    derived = store.read_series(source, symbol, mmap=False)
+    keep = derived[DATE_COLUMN] < since_day
+    kept = {column: values[keep] for column, values in derived.items()}
+    if not keep.any():
+        return kept, None
+    last_day = int(kept[DATE_COLUMN][-1])
+    days = np.asarray(days, dtype=np.int32)
+    return kept, {'last_day': last_day,
+                  'last_close': float(close[int(np.searchsorted(days, last_day))]),
+                  'ewma_var': float(kept['ewma_vol'][-1] ** 2)}
+
+
+def update_series_derived(days: np.ndarray, close: np.ndarray, source: str, symbol: str,
+                          root: str = DERIVED_DIR, since_day: Optional[int] = None,
+                          log_positions: Optional[Dict[str, int]] = None) -> int:
+    """
+    Дописывает производные колонки для дневных строк ряда, появившихся после
+    последнего обработанного дня. Если задан since_day (первый день, где
+    исходный ряд изменился) не позже последнего обработанного дня, строки
+    слоя с этого дня пересчитываются. log_positions - учтенные позиции
+    журналов исходного ряда {'revisions': n, 'insertions': m} (сохраняются в state.json).
+    Возвращает количество новых и пересчитанных строк.
+    """
+    store = derived_store(root)
+    state = _read_state(store, source, symbol)
+    days = np.asarray(days, dtype=np.int32)
+    kept = None
+    if state is not None and since_day is not None and since_day <= state['last_day']:
+        kept, state = _rewind(store, source, symbol, days, close, since_day)
+    first = 0 if state is None else int(np.searchsorted(days, state['last_day'], side='right'))
+    new_days = days[first:]
+    new_close = np.asarray(close[first:], dtype=np.float64)
+    valid = np.isfinite(new_close) & (new_close > 0)
+    new_days, new_close = new_days[valid], new_close[valid]
+    if len(new_days) == 0 and kept is None:
+        if state is not None and log_positions is not None and state.get('log_positions') != log_positions:
+            state['log_positions'] = log_positions
+            atomic_write_json(_state_path(store, source, symbol), state)
+        return 0
+
+    prev_close = np.nan if state is None else state['last_close']
+    log_close = np.log(np.concatenate([[prev_close], new_close]))
+    returns = np.diff(log_close)
+
+    # Первая доходность ряда не определена: в рекурсии она равна 0, а
+    # начальная дисперсия - квадрат первой определенной доходности
+    squared = np.nan_to_num(returns) ** 2
+    if state is None:
+        initial = squared[1] if len(squared) > 1 else 0.0
+    else:
+        initial = state['ewma_var']
+    variance = ewma_variance(squared, initial=initial)
+
+    history = np.empty(0)
+    if kept is not None:
+        history = np.asarray(kept['log_return'][-(ROLLING_WINDOW - 1):])
+    elif state is not None:
+        tail = store.read_series(source, symbol, ['log_return'])['log_return'][-(ROLLING_WINDOW - 1):]
+        history = np.asarray(tail)
+    window_returns = np.concatenate([history, returns])
+    rolling = rolling_std(np.nan_to_num(window_returns), history=len(history))
+    # Окна, захватывающие неопределенную первую доходность, не считаем
+    undefined = np.flatnonzero(~np.isfinite(window_returns))
+    if len(undefined):
+        last_undefined = undefined[-1] - len(history)
+        rolling[:max(last_undefined + ROLLING_WINDOW, 0)] = np.nan
+
+    new = {
+        DATE_COLUMN: new_days,
+        'log_return': returns,
+        'ewma_vol': np.sqrt(variance),
+        'rolling_vol': rolling,
+    }
+    if kept is None:
+        store.append_series(source, symbol, new)
+    else:
+        store.write_series(source, symbol, {column: np.concatenate([kept[column], new[column]])
+                                            for column in new})
+    if len(new_days):
+        state = {'last_day': int(new_days[-1]), 'last_close': float(new_close[-1]),
+                 'ewma_var': float(variance[-1])}
+    if state is None:
+        if os.path.exists(_state_path(store, source, symbol)):
+            os.remove(_state_path(store, source, symbol))
+    else:
+        if log_positions is None:
+            log_positions = (_read_state(store, source, symbol) or {}).get('log_positions')
+        atomic_write_json(_state_path(store, source, symbol), {
+            **state, 'ewma_lambda': EWMA_LAMBDA, 'rolling_window': ROLLING_WINDOW,
+            'log_positions': log_positions,
+            'source_rows': int(np.searchsorted(days, state['last_day'], side='right'))})
+    return len(new_days)
+
+
+def update_source_derived(store: PairStore, source: str, symbols: Optional[List[str]] = None,
+                          root: str = DERIVED_DIR) -> int:
+    """
+    Инкрементально обновляет производные колонки рядов источника (по close).
+    Первый измененный день берется из новых записей журналов ревизий close
+    и вставок (store.first_changed_day), поэтому обновление без изменений
+    истории стоит O(новых строк).
+    """
+    symbols = store.symbols(source) if symbols is None else symbols
+    derived = derived_store(root)
+    total = 0
+    for symbol in symbols:
+        if not store.has_series(source, symbol):
+            continue
+        series = store.read_series(source, symbol, ['close'])
+        days = series[DATE_COLUMN]
+        state = _read_state(derived, source, symbol)
+        seen = None if state is None else state.get('log_positions')
+        since_day, positions = store.first_changed_day(source, symbol, seen, column='close')
+        if state is not None and seen is None and len(days):
+            # Состояние без позиций журналов: изменения неизвестны, пересчет целиком
+            since_day = int(days[0])
+        elif state is not None and (since_day is None or since_day > state['last_day']):
+            # Журналы не видят удаленных строк: число строк до last_day должно совпасть
+            processed = int(np.searchsorted(days, state['last_day'], side='right'))
+            if (not processed or processed != state.get('source_rows')
+                    or days[processed - 1] != state['last_day']):
+                diverged = first_diverged_day(derived, source, symbol, days, series['close'])
+                if diverged is not None:
+                    since_day = diverged if since_day is None else min(since_day, diverged)
+        total += update_series_derived(days, series['close'], source, symbol, root,
+                                       since_day=since_day, log_positions=positions)
+    return total
+
+
+def update_matrix_derived(days: np.ndarray, names: Sequence[str], log_values: np.ndarray,
+                          source: str, root: str = DERIVED_DIR) -> int:
+    """Производные колонки для матрицы лог-рядов (даты x имена), например абсолютных курсов."""
+    store = derived_store(root)
+    total = 0
+    for j, name in enumerate(names):
+        close = np.exp(np.asarray(log_values[:, j]))
+        since_day = first_changed_return_day(store, source, name, days, close)
+        total += update_series_derived(days, close, source, name, root, since_day=since_day)
+    return total
+
+
+def read_derived(source: str, symbol: str, columns: Optional[List[str]] = None,
+                 root: str = DERIVED_DIR) -> Dict[str, np.ndarray]:
+    """Производные колонки ряда (memory-mapped)."""
+    return derived_store(root).read_series(source, symbol, columns)
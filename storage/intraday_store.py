@@ -0,0 +1,149 @@
+"""
+Хранилище внутридневных баров (1min, 1h, ...) с разбиением по месяцам.
+
+Минутные ряды в 1440 раз длиннее дневных, поэтому ряд не хранится одним
+файлом: data/store/intraday/<интервал>/<источник>/<ПАРА>/<ГГГГ-ММ>.npz -
+сжатый npz на месяц (колонки timestamp int64, секунды UTC, и float64 цены)
+плюс index.json с числом строк и границами каждой партиции.
+Дозапись переписывает только затронутые месяцы; чтение диапазона
+открывает только партиции, пересекающиеся с ним.
+Партиции и индекс заменяются атомарно (storage.snapshots.atomic_write).
+"""
+
+import os
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from storage.pair_store import STORE_DIR, symbol_to_dirname
+from storage.snapshots import atomic_write, atomic_write_json
+
+INTRADAY_DIR = os.path.join(STORE_DIR, 'intraday')
+TIME_COLUMN = 'timestamp'
+INDEX_FILE = 'index.json'
+INTERVAL_SECONDS = {
+    '1min': 60, '5min': 300, '15min': 900, '30min': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400,
+}
+
+
+def to_timestamps(values) -> np.ndarray:
+    """Даты/время ('YYYY-MM-DD HH:MM:SS', datetime64) -> int64 секунды UTC."""
+    return np.asarray(values, dtype='datetime64[s]').astype(np.int64)
+
+
+def month_keys(timestamps: np.ndarray) -> np.ndarray:
+    """Ключ партиции 'ГГГГ-ММ' для каждой метки времени."""
+    return np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]').astype('datetime64[M]').astype(str)
+
+
+def _sort_unique(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Сортировка по времени, из дубликатов остается последнее значение."""
+    times = columns[TIME_COLUMN]
+    order = np.argsort(times, kind='stable')
+    sorted_times = times[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = sorted_times[1:] != sorted_times[:-1]
+    order = order[keep]
+    return {name: values[order] for name, values in columns.items()}
+
+
+class IntradayStore:
+    """Внутридневные ряды: интервал -> источник -> пара -> месячные партиции."""
+
+    def __init__(self, root: str = INTRADAY_DIR):
+        self.root = root
+
+    def series_dir(self, interval: str, source: str, symbol: str) -> str:
+        return os.path.join(self.root, interval, source, symbol_to_dirname(symbol))
+
+    def read_index(self, interval: str, source: str, symbol: str) -> Dict[str, Dict]:
+        """Партиции ряда: 'ГГГГ-ММ' -> {rows, first, last} (пусто, если ряда нет)."""
+        path = os.path.join(self.series_dir(interval, source, symbol), INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['partitions']
+
+    def last_timestamp(self, interval: str, source: str, symbol: str) -> Optional[int]:
+        partitions = self.read_index(interval, source, symbol)
+        if not partitions:
+            return None
+        return partitions[max(partitions)]['last']
+
+    def _read_partition(self, path: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        with np.load(path) as data:
+            names = data.files if columns is None else [TIME_COLUMN] + [c for c in columns if c != TIME_COLUMN]
+            return {name: data[name] for name in names}
+
+    def write_bars(self, interval: str, source: str, symbol: str, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Добавляет бары (колонка timestamp + цены) к ряду: строки делятся по
+        месяцам, каждая затронутая партиция сливается с новыми строками
+        (новые значения перезаписывают старые) и перезаписывается.
+        Возвращает количество новых строк.
+        """
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Неизвестный внутридневной интервал: {interval}")
+        columns = _sort_unique({name: np.asarray(values) for name, values in columns.items()})
+        times = columns[TIME_COLUMN].astype(np.int64)
+        if len(times) == 0:
+            return 0
+        path = self.series_dir(interval, source, symbol)
+        os.makedirs(path, exist_ok=True)
+        partitions = self.read_index(interval, source, symbol)
+
+        keys = month_keys(times)
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+        added = 0
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            month = str(keys[lo])
+            part = {name: values[lo:hi] for name, values in columns.items()}
+            file = os.path.join(path, f'{month}.npz')
+            old_rows = 0
+            if month in partitions:
+                old = self._read_partition(file)
+                old_rows = len(old[TIME_COLUMN])
+                names = list(old) + [c for c in part if c not in old]
+                part = _sort_unique({
+                    name: np.concatenate([old.get(name, np.full(old_rows, np.nan)),
+                                          part.get(name, np.full(hi - lo, np.nan))])
+                    for name in names})
+            atomic_write(file, lambda f: np.savez_compressed(f, **part), mode='wb')
+            rows = len(part[TIME_COLUMN])
+            partitions[month] = {'rows': rows, 'first': int(part[TIME_COLUMN][0]),
+                                 'last': int(part[TIME_COLUMN][-1])}
+            added += rows - old_rows
+
+        atomic_write_json(os.path.join(path, INDEX_FILE), {
+            'interval': interval, 'source': source, 'symbol': symbol,
+            'partitions': dict(sorted(partitions.items())),
+        })
+        return added
+
+    def read_range(self, interval: str, source: str, symbol: str,
+                   start: Optional[int] = None, end: Optional[int] = None,
+                   columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Бары с метками времени в [start, end] (секунды UTC, границы включительно).
+        Читаются только партиции, пересекающиеся с диапазоном.
+        """
+        partitions = self.read_index(interval, source, symbol)
+        if not partitions:
+            raise KeyError(f"Ряд {interval}:{source}:{symbol} не найден в {self.root}")
+        path = self.series_dir(interval, source, symbol)
+        parts = [self._read_partition(os.path.join(path, f'{month}.npz'), columns)
+                 for month, info in sorted(partitions.items())
+                 if (start is None or info['last'] >= start) and (end is None or info['first'] <= end)]
+        if not parts:
+            names = [TIME_COLUMN] + [c for c in (columns or []) if c != TIME_COLUMN]
+            return {name: np.empty(0, dtype=np.int64 if name == TIME_COLUMN else np.float64) for name in names}
+
+        names = [name for name in parts[0]]
+        result = {name: np.concatenate([part.get(name, np.full(len(part[TIME_COLUMN]), np.nan))
+                                        for part in parts]) for name in names}
+        times = result[TIME_COLUMN]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+        return {name: values[lo:hi] for name, values in result.items()}
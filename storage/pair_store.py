@@ -0,0 +1,620 @@
+"""
+Колоночное хранилище временных рядов валютных пар проекта AbsCur3.
+
+Каждый ряд лежит в каталоге data/store/<источник>/<ПАРА>/ и состоит из
+отдельных .npy-колонок: datetime (int32, дни от 1970-01-01) и float64 цены
+(open/high/low/close или только close для фиксингов ЦБ).
+Колонки читаются через memory-mapping, поэтому открытие ряда не копирует данные.
+Хранилище с compressed=True пишет колонки в сжатом формате .zd
+(storage/codec.py, meta['encoding'] = 'zd'): они декодируются при чтении,
+а read_range распаковывает только блоки нужного диапазона дат.
+
+Если провайдер пересматривает уже сохраненный бар, старое и новое значения
+дописываются в журнал ревизий revisions.bin того же каталога (записи
+REVISION_DTYPE: день, номер колонки в meta['columns'], старое, новое,
+время загрузки).
+Журнал вставок insertions.bin хранит для каждой записи диапазоны дат
+добавленных строк и время, когда они стали известны. Вместе журналы
+позволяют восстановить ряд «как он был известен на момент» (read_series_asof):
+к текущим массивам применяются только ревизии, сделанные позже этого
+момента, - объем истории пропорционален числу пересмотров, а не длине ряда.
+
+Запись атомарна по файлам: колонки и meta.json заменяются через
+atomic_write (временный файл + os.replace), meta.json - последним, и
+читатель берет из колонок только meta['rows'] строк. Поэтому отображенный
+в память ряд никогда не обрезается под читателем, а прерванная запись
+оставляет прежний ряд. Дописывание в конец (append_series) пишет данные за
+концом файлов, затем заголовки и meta.json. Журналы дописываются целыми
+записями: обрезанный хвост прерванной записи отбрасывается при чтении и
+следующей записи. Ограничение: читатель, попавший между заменами колонок
+при полной перезаписи ряда, может увидеть колонки разных версий.
+Запускать ИЗ КОРНЯ ПРОЕКТА.
+"""
+
+import io
+import os
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from storage import codec
+from storage.snapshots import atomic_write, atomic_write_json
+
+STORE_DIR = os.path.join('data', 'store')
+DATE_COLUMN = 'datetime'
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+META_FILE = 'meta.json'
+ZD_ENCODING = 'zd'
+REVISIONS_FILE = 'revisions.bin'
+REVISION_DTYPE = np.dtype([('day', '<i4'), ('column', 'u1'), ('old', '<f8'), ('new', '<f8'),
+                           ('fetched_at', '<i8')])   # fetched_at - секунды Unix
+INSERTIONS_FILE = 'insertions.bin'
+# Строки ряда с датами first_day..last_day, которых не было до записи known_at
+# (между ними нет строк, записанных раньше)
+INSERTION_DTYPE = np.dtype([('first_day', '<i4'), ('last_day', '<i4'), ('known_at', '<i8')])
+
+
+def dates_to_days(dates) -> np.ndarray:
+    """Преобразует даты ('YYYY-MM-DD', datetime64) в int32 дни от 1970-01-01."""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int32)
+
+
+def days_to_dates(days) -> np.ndarray:
+    """Обратное преобразование: int32 дни -> datetime64[D]."""
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]')
+
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    """Заголовок .npy (версия 1.0) для одномерного массива rows элементов."""
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, {
+        'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+    return buffer.getvalue()
+
+
+def _npy_layout(path: str):
+    """(dtype, число строк, смещение данных) одномерного .npy-файла."""
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        return dtype, shape[0], f.tell()
+
+
+def _read_log(path: str, dtype: np.dtype, start: int = 0) -> np.ndarray:
+    """Целые записи журнала начиная с записи start (обрезанный хвост пропускается)."""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=dtype)
+    count = os.path.getsize(path) // dtype.itemsize - start
+    if count <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.fromfile(path, dtype=dtype, count=count, offset=start * dtype.itemsize)
+
+
+def _append_log(path: str, records: np.ndarray) -> None:
+    """Дописывает записи в журнал, предварительно отрезав недописанную прерванную запись."""
+    with open(path, 'ab') as f:
+        size = f.seek(0, os.SEEK_END)
+        torn = size % records.dtype.itemsize
+        if torn:
+            f.truncate(size - torn)
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def sort_unique(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Сортирует строки по дате и схлопывает дубликаты дат (побеждает последнее значение)."""
+    days = np.asarray(columns[DATE_COLUMN], dtype=np.int32)
+    order = np.argsort(days, kind='stable')
+    sorted_days = days[order]
+    keep = np.ones(len(sorted_days), dtype=bool)
+    keep[:-1] = sorted_days[1:] != sorted_days[:-1]
+    order = order[keep]
+    return {column: np.asarray(values)[order] for column, values in columns.items()}
+
+
+def merge_sorted(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray], value_columns: List[str]):
+    """
+    Слияние двух рядов с возрастающими уникальными датами за O(n + m):
+    позиции новых дат в старом ряду находятся одним searchsorted, совпавшие
+    даты перезаписываются, остальные вставляются. Колонки, которых нет
+    в одном из рядов, заполняются NaN.
+    Возвращает (слитые колонки, ревизии) - ревизии в формате REVISION_DTYPE
+    без fetched_at для совпавших дат с изменившимся значением (NaN == NaN).
+    """
+    old_days = np.asarray(old[DATE_COLUMN], dtype=np.int32)
+    new_days = np.asarray(new[DATE_COLUMN], dtype=np.int32)
+    n, m = len(old_days), len(new_days)
+    pos = np.searchsorted(old_days, new_days)
+    matched = pos < n
+    matched[matched] = old_days[pos[matched]] == new_days[matched]
+    inserted = ~matched
+
+    # Итоговые позиции: старая строка i сдвигается на число вставок перед ней,
+    # новая вставляемая - на число старых строк перед ней плюс вставок до нее
+    insert_pos = pos[inserted]
+    shift = np.searchsorted(insert_pos, np.arange(n), side='right')
+    old_target = np.arange(n) + shift
+    new_target = np.empty(m, dtype=np.int64)
+    new_target[inserted] = insert_pos + np.arange(len(insert_pos))
+    new_target[matched] = old_target[pos[matched]]
+
+    size = n + len(insert_pos)
+    merged_days = np.empty(size, dtype=np.int32)
+    merged_days[old_target] = old_days
+    merged_days[new_target] = new_days
+    merged = {DATE_COLUMN: merged_days}
+
+    revisions = []
+    for index, column in enumerate(value_columns):
+        old_values = np.asarray(old[column], dtype=np.float64) if column in old else np.full(n, np.nan)
+        new_values = np.asarray(new[column], dtype=np.float64) if column in new else np.full(m, np.nan)
+        values = np.empty(size, dtype=np.float64)
+        values[old_target] = old_values
+        if column in new:
+            values[new_target] = new_values
+            before = old_values[pos[matched]]
+            after = new_values[matched]
+            changed = (before != after) & ~(np.isnan(before) & np.isnan(after))
+            if changed.any():
+                record = np.zeros(int(changed.sum()), dtype=REVISION_DTYPE)
+                record['day'] = new_days[matched][changed]
+                record['column'] = index
+                record['old'] = before[changed]
+                record['new'] = after[changed]
+                revisions.append(record)
+        merged[column] = values
+    revisions = np.concatenate(revisions) if revisions else np.zeros(0, dtype=REVISION_DTYPE)
+    return merged, revisions
+
+
+def insertion_runs(days: np.ndarray, inserted: np.ndarray) -> np.ndarray:
+    """
+    Диапазоны подряд идущих вставленных строк ряда days (маска inserted)
+    в формате INSERTION_DTYPE без known_at.
+    """
+    flags = np.concatenate([[False], inserted, [False]]).astype(np.int8)
+    edges = np.diff(flags)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    runs = np.zeros(len(starts), dtype=INSERTION_DTYPE)
+    runs['first_day'] = days[starts]
+    runs['last_day'] = days[ends]
+    return runs
+
+
+def earliest_last_day(last_days: Dict[str, Optional[int]]) -> Optional[int]:
+    """
+    Дата, после которой нужно дозагружать набор рядов: самая ранняя из
+    last_day. None, если рядов нет или хотя бы один ряд отсутствует -
+    тогда нужна полная история.
+    """
+    if not last_days or any(day is None for day in last_days.values()):
+        return None
+    return min(last_days.values())
+
+
+def rows_after(columns: Dict[str, np.ndarray], last_day: Optional[int]) -> Dict[str, np.ndarray]:
+    """Строки колонок с датами позже last_day (None - все строки)."""
+    if last_day is None:
+        return columns
+    fresh = columns[DATE_COLUMN] > last_day
+    return {name: values[fresh] for name, values in columns.items()}
+
+
+def _timestamp(moment: Optional[datetime]) -> int:
+    return int((moment or datetime.now()).timestamp())
+
+
+def symbol_to_dirname(symbol: str) -> str:
+    """'EUR/USD' -> 'EURUSD' (как у CSV-файлов Twelve Data)."""
+    return symbol.replace('/', '')
+
+
+class PairStore:
+    """
+    Хранилище рядов: один каталог на источник, один подкаталог на пару.
+    track_revisions=False отключает журналы ревизий и вставок (для производных
+    хранилищ, где пересчет хвоста - норма, а не пересмотр данных).
+    compressed=True - новые и перезаписываемые ряды сохраняются в формате .zd.
+    """
+
+    def __init__(self, root: str = STORE_DIR, track_revisions: bool = True, compressed: bool = False):
+        self.root = root
+        self.track_revisions = track_revisions
+        self.compressed = compressed
+
+    # --- Навигация ---
+    def series_dir(self, source: str, symbol: str) -> str:
+        return os.path.join(self.root, source, symbol_to_dirname(symbol))
+
+    def sources(self) -> List[str]:
+        """Список источников, для которых есть данные."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def symbols(self, source: str) -> List[str]:
+        """Список пар источника в формате 'EUR/USD'."""
+        source_dir = os.path.join(self.root, source)
+        if not os.path.isdir(source_dir):
+            return []
+        symbols = []
+        for name in sorted(os.listdir(source_dir)):
+            meta = self._read_meta(os.path.join(source_dir, name))
+            if meta:
+                symbols.append(meta['symbol'])
+        return symbols
+
+    def has_series(self, source: str, symbol: str) -> bool:
+        return os.path.exists(os.path.join(self.series_dir(source, symbol), META_FILE))
+
+    def read_meta(self, source: str, symbol: str) -> Optional[Dict]:
+        return self._read_meta(self.series_dir(source, symbol))
+
+    def _read_meta(self, path: str) -> Optional[Dict]:
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # --- Чтение ---
+    def read_series(self, source: str, symbol: str,
+                    columns: Optional[List[str]] = None,
+                    mmap: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Возвращает словарь колонок ряда. Колонка datetime присутствует всегда.
+        При mmap=True массивы отображаются в память только для чтения
+        (сжатые ряды всегда декодируются в память).
+        """
+        path = self.series_dir(source, symbol)
+        meta = self._read_meta(path)
+        if meta is None:
+            raise KeyError(f"Ряд {source}:{symbol} не найден в {self.root}")
+
+        wanted = meta['columns'] if columns is None else columns
+        rows = meta['rows']
+        if meta.get('encoding') == ZD_ENCODING:
+            return {column: codec.read_column(os.path.join(path, column + codec.EXTENSION))[:rows]
+                    for column in [DATE_COLUMN] + [c for c in wanted if c != DATE_COLUMN]}
+        mmap_mode = 'r' if mmap else None
+        # Файлы могут быть длиннее meta['rows'], если дописывание еще идет или прервано
+        result = {DATE_COLUMN: np.load(os.path.join(path, f'{DATE_COLUMN}.npy'), mmap_mode=mmap_mode)[:rows]}
+        for column in wanted:
+            if column == DATE_COLUMN:
+                continue
+            result[column] = np.load(os.path.join(path, f'{column}.npy'), mmap_mode=mmap_mode)[:rows]
+        return result
+
+    def read_range(self, source: str, symbol: str, first_day: Optional[int] = None,
+                   last_day: Optional[int] = None,
+                   columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Строки ряда с датами в [first_day, last_day] (включительно). Для сжатых
+        рядов распаковываются только блоки, пересекающиеся с диапазоном.
+        """
+        path = self.series_dir(source, symbol)
+        meta = self._read_meta(path)
+        if meta is None:
+            raise KeyError(f"Ряд {source}:{symbol} не найден в {self.root}")
+        wanted = [c for c in (meta['columns'] if columns is None else columns) if c != DATE_COLUMN]
+        if meta.get('encoding') != ZD_ENCODING:
+            series = self.read_series(source, symbol, wanted)
+            days = series[DATE_COLUMN]
+            lo = 0 if first_day is None else int(np.searchsorted(days, first_day, side='left'))
+            hi = len(days) if last_day is None else int(np.searchsorted(days, last_day, side='right'))
+            return {column: np.array(values[lo:hi]) for column, values in series.items()}
+
+        dates = codec.ColumnReader(os.path.join(path, DATE_COLUMN + codec.EXTENSION))
+        # Первые даты блоков лежат в заголовке: распаковываются только блоки диапазона
+        firsts = dates.block_firsts()
+        block_lo = 0 if first_day is None else max(int(np.searchsorted(firsts, first_day, side='right')) - 1, 0)
+        block_hi = len(firsts) if last_day is None else int(np.searchsorted(firsts, last_day, side='right'))
+        start, stop = int(dates.block_starts[block_lo]), int(dates.block_starts[block_hi])
+        days = dates.read(start, stop)
+        lo = start + (0 if first_day is None else int(np.searchsorted(days, first_day, side='left')))
+        hi = start + (len(days) if last_day is None else int(np.searchsorted(days, last_day, side='right')))
+        result = {DATE_COLUMN: days[lo - start:hi - start]}
+        for column in wanted:
+            result[column] = codec.ColumnReader(os.path.join(path, column + codec.EXTENSION)).read(lo, hi)
+        return result
+
+    def last_day(self, source: str, symbol: str) -> Optional[int]:
+        """Последняя дата ряда (int32 дни) или None, если ряда нет."""
+        meta = self.read_meta(source, symbol)
+        if not meta or not meta['rows']:
+            return None
+        return int(meta['last_day'])
+
+    def source_last_day(self, source: str) -> Optional[int]:
+        """Самая поздняя дата среди всех рядов источника."""
+        last_days = [day for day in self.last_days(source).values() if day is not None]
+        return max(last_days) if last_days else None
+
+    def last_days(self, source: str, symbols: Optional[List[str]] = None) -> Dict[str, Optional[int]]:
+        """
+        Последние даты рядов источника: пара -> last_day (None - ряда нет или он пуст).
+        symbols=None - все ряды источника.
+        """
+        if symbols is None:
+            symbols = self.symbols(source)
+        return {symbol: self.last_day(source, symbol) for symbol in symbols}
+
+    def read_revisions(self, source: str, symbol: str,
+                       column: Optional[str] = None) -> np.ndarray:
+        """
+        Журнал ревизий ряда (REVISION_DTYPE, в порядке записи); column
+        оставляет только ревизии одной колонки.
+        """
+        revisions = _read_log(os.path.join(self.series_dir(source, symbol), REVISIONS_FILE), REVISION_DTYPE)
+        if column is not None:
+            meta = self.read_meta(source, symbol)
+            revisions = revisions[revisions['column'] == meta['columns'].index(column)]
+        return revisions
+
+    def read_insertions(self, source: str, symbol: str) -> np.ndarray:
+        """Журнал вставок ряда (INSERTION_DTYPE, в порядке записи)."""
+        return _read_log(os.path.join(self.series_dir(source, symbol), INSERTIONS_FILE), INSERTION_DTYPE)
+
+    def first_changed_day(self, source: str, symbol: str, seen: Optional[Dict[str, int]],
+                          column: Optional[str] = None) -> Tuple[Optional[int], Dict[str, int]]:
+        """
+        Первый день ряда, измененный (ревизия или вставка) после позиций
+        журналов seen = {'revisions': n, 'insertions': m}, и новые позиции.
+        Читаются только записи журналов после seen; column оставляет только
+        ревизии одной колонки. Если журнал короче seen (ряд записан заново),
+        изменившимся считается весь ряд.
+        При seen=None день не определяется - возвращаются только позиции.
+        """
+        path = self.series_dir(source, symbol)
+        counts = {}
+        changed = []
+        for key, name, dtype, field in [('revisions', REVISIONS_FILE, REVISION_DTYPE, 'day'),
+                                        ('insertions', INSERTIONS_FILE, INSERTION_DTYPE, 'first_day')]:
+            log_path = os.path.join(path, name)
+            counts[key] = os.path.getsize(log_path) // dtype.itemsize if os.path.exists(log_path) else 0
+            if seen is None:
+                continue
+            start = seen.get(key, 0)
+            if start > counts[key]:
+                changed.append(self.read_meta(source, symbol)['first_day'])
+            elif start < counts[key]:
+                records = _read_log(log_path, dtype, start)
+                if column is not None and key == 'revisions':
+                    records = records[records['column'] == self.read_meta(source, symbol)['columns'].index(column)]
+                if len(records):
+                    changed.append(int(records[field].min()))
+        changed = [day for day in changed if day is not None]
+        return (min(changed) if changed else None), counts
+
+    def read_series_asof(self, source: str, symbol: str, known_at: datetime,
+                         columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Ряд в том виде, в каком он был известен на момент known_at:
+        строки, вставленные позже, отбрасываются, ревизии, сделанные позже,
+        откатываются (берется старое значение самой ранней из них).
+        Строки, записанные до появления журнала вставок, считаются известными всегда.
+        """
+        moment = _timestamp(known_at)
+        current = self.read_series(source, symbol, columns)
+        days = np.asarray(current[DATE_COLUMN])
+
+        # Время вставки строки - время последней записи, диапазон которой ее
+        # содержит: более поздние записи не могут охватывать уже существовавшие строки
+        inserted_at = np.full(len(days), np.iinfo(np.int64).min)
+        for run in self.read_insertions(source, symbol):
+            lo = np.searchsorted(days, run['first_day'], side='left')
+            hi = np.searchsorted(days, run['last_day'], side='right')
+            inserted_at[lo:hi] = run['known_at']
+        known = inserted_at <= moment
+        result = {name: np.array(values[known]) for name, values in current.items()}
+
+        revisions = self.read_revisions(source, symbol)
+        revisions = revisions[revisions['fetched_at'] > moment]
+        if len(revisions):
+            value_columns = self.read_meta(source, symbol)['columns']
+            # Журнал хронологический: первая запись пары (колонка, дата) - самая ранняя
+            keys = revisions['column'].astype(np.int64) << 32 | (revisions['day'].astype(np.int64) & 0xFFFFFFFF)
+            _, first = np.unique(keys, return_index=True)
+            revisions = revisions[first]
+            for index, column in enumerate(value_columns):
+                if column not in result:
+                    continue
+                own = revisions[revisions['column'] == index]
+                pos = np.searchsorted(result[DATE_COLUMN], own['day'])
+                found = pos < len(result[DATE_COLUMN])
+                found[found] = result[DATE_COLUMN][pos[found]] == own['day'][found]
+                result[column][pos[found]] = own['old'][found]
+        return result
+
+    def _log_revisions(self, source: str, symbol: str, revisions: np.ndarray,
+                       fetched_at: Optional[datetime]) -> None:
+        revisions = revisions.copy()
+        revisions['fetched_at'] = _timestamp(fetched_at)
+        _append_log(os.path.join(self.series_dir(source, symbol), REVISIONS_FILE), revisions)
+
+    def _log_insertions(self, source: str, symbol: str, runs: np.ndarray,
+                        fetched_at: Optional[datetime], reset: bool = False) -> None:
+        runs = runs.copy()
+        runs['known_at'] = _timestamp(fetched_at)
+        path = os.path.join(self.series_dir(source, symbol), INSERTIONS_FILE)
+        if reset:
+            atomic_write(path, lambda f: f.write(runs.tobytes()), mode='wb')
+        else:
+            _append_log(path, runs)
+
+    # --- Запись ---
+    def write_series(self, source: str, symbol: str, columns: Dict[str, np.ndarray],
+                     fetched_at: Optional[datetime] = None) -> int:
+        """
+        Полностью перезаписывает ряд. Строки сортируются по дате,
+        дубликаты дат схлопываются (побеждает последнее значение).
+        История существующего ряда сохраняется: измененные значения совпавших
+        дат пишутся в журнал ревизий, новые даты - в журнал вставок с временем
+        fetched_at, а повторная запись тех же данных ничего не меняет.
+        Заново история начинается только у нового ряда или если среди новых
+        колонок нет какой-то из прежних (номера колонок в журнале потеряли бы смысл).
+        Возвращает количество сохраненных строк.
+        """
+        columns = sort_unique(columns)
+        value_columns = [c for c in columns if c != DATE_COLUMN]
+        meta = self.read_meta(source, symbol) if self.track_revisions else None
+        if meta is not None and set(meta['columns']) <= set(value_columns):
+            return self._rewrite_series(source, symbol, columns, meta, fetched_at)
+
+        rows = self._save_columns(source, symbol, columns, value_columns)
+        if self.track_revisions:
+            path = self.series_dir(source, symbol)
+            if os.path.exists(os.path.join(path, REVISIONS_FILE)):
+                os.remove(os.path.join(path, REVISIONS_FILE))
+            days = columns[DATE_COLUMN]
+            self._log_insertions(source, symbol, insertion_runs(days, np.ones(len(days), dtype=bool)),
+                                 fetched_at, reset=True)
+        return rows
+
+    def _rewrite_series(self, source: str, symbol: str, columns: Dict[str, np.ndarray], meta: Dict,
+                        fetched_at: Optional[datetime]) -> int:
+        """Перезапись существующего ряда с продолжением его журналов (см. write_series)."""
+        value_columns = list(meta['columns'])
+        value_columns += [c for c in columns if c != DATE_COLUMN and c not in value_columns]
+        existing = self.read_series(source, symbol, mmap=False)
+        _, revisions = merge_sorted(existing, columns, value_columns)
+        old_days, new_days = existing[DATE_COLUMN], columns[DATE_COLUMN]
+        same_format = (meta.get('encoding') == ZD_ENCODING) == self.compressed
+        if (same_format and not len(revisions) and np.array_equal(old_days, new_days)
+                and value_columns == list(meta['columns'])):
+            return int(len(new_days))
+        rows = self._save_columns(source, symbol, columns, value_columns)
+        if len(revisions):
+            self._log_revisions(source, symbol, revisions, fetched_at)
+        inserted = ~np.isin(new_days, old_days)
+        if inserted.any():
+            self._log_insertions(source, symbol, insertion_runs(new_days, inserted), fetched_at)
+        return rows
+
+    def _save_columns(self, source: str, symbol: str, columns: Dict[str, np.ndarray],
+                      value_columns: List[str]) -> int:
+        """Записывает уже отсортированные колонки без дубликатов дат и meta.json."""
+        days = np.asarray(columns[DATE_COLUMN], dtype=np.int32)
+        path = self.series_dir(source, symbol)
+        os.makedirs(path, exist_ok=True)
+        extension = codec.EXTENSION if self.compressed else '.npy'
+        for column in [DATE_COLUMN] + value_columns:
+            values = days if column == DATE_COLUMN else np.asarray(columns[column], dtype=np.float64)
+            if self.compressed:
+                encoded = codec.encode_array(values)
+                atomic_write(os.path.join(path, column + extension), lambda f: f.write(encoded), mode='wb')
+            else:
+                atomic_write(os.path.join(path, column + extension),
+                             lambda f: np.save(f, values), mode='wb')
+        # Файлы другого формата от прежней записи ряда
+        for name in os.listdir(path):
+            if name.endswith(('.npy', codec.EXTENSION)) and not name.endswith(extension):
+                os.remove(os.path.join(path, name))
+
+        rows = int(len(days))
+        meta = {
+            'source': source,
+            'symbol': symbol,
+            'columns': value_columns,
+            'rows': rows,
+            'first_day': int(days[0]) if rows else None,
+            'last_day': int(days[-1]) if rows else None,
+            'updated_at': datetime.now().isoformat(),
+        }
+        if self.compressed:
+            meta['encoding'] = ZD_ENCODING
+        atomic_write_json(os.path.join(path, META_FILE), meta)
+        return rows
+
+    def append_series(self, source: str, symbol: str, columns: Dict[str, np.ndarray],
+                      fetched_at: Optional[datetime] = None) -> int:
+        """
+        Дописывает строки в конец ряда за O(новых строк): данные добавляются
+        в конец .npy-файлов, заголовок переписывается на месте (np.save
+        оставляет в нем запас под рост размерности), после сброса на диск
+        атомарно заменяется meta.json - до этого читатели видят прежние
+        meta['rows'] строк, а прерванное дописывание не портит ряд. Если новые даты не идут
+        строго после last_day, набор колонок другой или ряд сжатый - выполняется merge_series.
+        Возвращает итоговое количество строк.
+        """
+        meta = self.read_meta(source, symbol)
+        days = np.asarray(columns[DATE_COLUMN], dtype=np.int32)
+        value_columns = [c for c in columns if c != DATE_COLUMN]
+        if (meta is None or not meta['rows'] or sorted(value_columns) != sorted(meta['columns'])
+                or meta.get('encoding') == ZD_ENCODING or self.compressed):
+            return self.merge_series(source, symbol, columns, fetched_at)
+        if len(days) == 0:
+            return meta['rows']
+        if days[0] <= meta['last_day'] or (len(days) > 1 and (np.diff(days) <= 0).any()):
+            return self.merge_series(source, symbol, columns, fetched_at)
+
+        path = self.series_dir(source, symbol)
+        files = {column: os.path.join(path, f'{column}.npy') for column in [DATE_COLUMN] + meta['columns']}
+        layouts = {column: _npy_layout(file) for column, file in files.items()}
+        rows = meta['rows'] + len(days)
+        for column, (dtype, old_rows, offset) in layouts.items():
+            if old_rows != meta['rows'] or len(_npy_header(dtype, rows)) != offset:
+                return self.merge_series(source, symbol, columns, fetched_at)
+
+        for column, file in files.items():
+            dtype, _, offset = layouts[column]
+            values = days if column == DATE_COLUMN else columns[column]
+            with open(file, 'r+b') as f:
+                # Хвост после meta['rows'] строк - данные прерванного дописывания
+                f.seek(offset + meta['rows'] * dtype.itemsize)
+                f.truncate()
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                f.seek(0)
+                f.write(_npy_header(dtype, rows))
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta.update({'rows': rows, 'last_day': int(days[-1]), 'updated_at': datetime.now().isoformat()})
+        atomic_write_json(os.path.join(path, META_FILE), meta)
+        if self.track_revisions:
+            self._log_insertions(source, symbol, insertion_runs(days, np.ones(len(days), dtype=bool)),
+                                 fetched_at)
+        return rows
+
+    def merge_series(self, source: str, symbol: str, columns: Dict[str, np.ndarray],
+                     fetched_at: Optional[datetime] = None) -> int:
+        """
+        Добавляет строки к существующему ряду (новые значения перезаписывают
+        старые при совпадении дат) слиянием отсортированных массивов дат.
+        Измененные значения существующих дат пишутся в журнал ревизий,
+        новые даты - в журнал вставок с временем загрузки fetched_at
+        (по умолчанию - текущее время).
+        Возвращает итоговое количество строк.
+        """
+        if not self.has_series(source, symbol):
+            return self.write_series(source, symbol, columns, fetched_at)
+
+        existing = self.read_series(source, symbol, mmap=False)
+        value_columns = list(self.read_meta(source, symbol)['columns'])
+        value_columns += [c for c in columns if c != DATE_COLUMN and c not in value_columns]
+        merged, revisions = merge_sorted(existing, sort_unique(columns), value_columns)
+        unchanged = (len(merged[DATE_COLUMN]) == len(existing[DATE_COLUMN]) and not len(revisions)
+                     and len(value_columns) == len(existing) - 1)
+        if unchanged:
+            return len(existing[DATE_COLUMN])
+        rows = self._save_columns(source, symbol, merged, value_columns)
+        if self.track_revisions:
+            if len(revisions):
+                self._log_revisions(source, symbol, revisions, fetched_at)
+            merged_days = merged[DATE_COLUMN]
+            old_days = existing[DATE_COLUMN]
+            pos = np.minimum(np.searchsorted(old_days, merged_days), max(len(old_days) - 1, 0))
+            inserted = ~(old_days[pos] == merged_days) if len(old_days) else np.ones(rows, dtype=bool)
+            if inserted.any():
+                self._log_insertions(source, symbol, insertion_runs(merged_days, inserted), fetched_at)
+        return rows
@@ -0,0 +1,297 @@
+"""
+Атомарная публикация файлов и версионированные снимки каталога.
+
+Запись файла: данные пишутся во временный файл того же каталога,
+сбрасываются на диск и переименовываются поверх цели (os.replace атомарен
+в пределах файловой системы) - читатель видит либо старый, либо новый
+файл целиком, но не обрезанный.
+
+Снимки каталога (например, data/raw/twelve_data/pairs):
+  <каталог>/EURUSD.csv                      - текущая версия (для старых читателей);
+  <каталог>/.snapshots/generations/EURUSD/000042.csv
+                                            - неизменяемые поколения файлов
+                                              (жесткая ссылка на текущую версию);
+  <каталог>/.snapshots/manifests/000107.json - неизменяемый манифест: файл -> поколение;
+  <каталог>/.snapshots/CURRENT              - номер последнего манифеста.
+  <каталог>/.snapshots/readers/<pid>-<id>.json - аренды читателей: версия, которую они читают.
+Читатель закрепляет манифест (SnapshotReader.pin) и читает только
+перечисленные в нем поколения: пока писатель публикует новые версии,
+закрепленный снимок остается согласованным, без блокировок.
+Долгий читатель берет аренду (pin(lease=True), лучше в with): prune не
+удаляет манифест, пока на него есть аренда живого процесса, а также
+последние KEEP_MANIFESTS манифестов и все манифесты моложе GRACE_SECONDS.
+Поколения удаляются, только когда на них не ссылается ни один оставшийся
+манифест.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, IO, List, Optional, Set
+
+SNAPSHOTS_DIR = '.snapshots'
+GENERATIONS_DIR = 'generations'
+MANIFESTS_DIR = 'manifests'
+CURRENT_FILE = 'CURRENT'
+READERS_DIR = 'readers'
+KEEP_MANIFESTS = 20
+GRACE_SECONDS = 3600          # манифест моложе часа не удаляется даже без аренды
+NUMBER_WIDTH = 6
+
+
+def atomic_write(path: str, write: Callable[[IO], None], mode: str = 'w', **open_kwargs) -> None:
+    """
+    Атомарно заменяет файл path: write(f) пишет во временный файл
+    в том же каталоге, который затем переименовывается поверх path.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, data) -> None:
+    atomic_write(path, lambda f: json.dump(data, f, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def _number(value: int) -> str:
+    return f'{value:0{NUMBER_WIDTH}d}'
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Snapshot:
+    """Закрепленная версия каталога: имена файлов -> неизменяемые поколения."""
+
+    def __init__(self, root: str, version: int, files: Dict[str, str], created_at: Optional[str] = None,
+                 lease_path: Optional[str] = None):
+        self.root = root
+        self.version = version
+        self.files = files
+        self.created_at = created_at
+        self.lease_path = lease_path
+
+    def names(self) -> List[str]:
+        return sorted(self.files)
+
+    def path(self, name: str) -> str:
+        """Путь к поколению файла name в этом снимке."""
+        if name not in self.files:
+            raise KeyError(f"Файла {name} нет в снимке {self.version} каталога {self.root}")
+        return os.path.join(self.root, SNAPSHOTS_DIR, self.files[name])
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def release(self) -> None:
+        """Снимает аренду снимка (если она была): после этого prune может его удалить."""
+        if self.lease_path is not None:
+            if os.path.exists(self.lease_path):
+                os.remove(self.lease_path)
+            self.lease_path = None
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class SnapshotReader:
+    """Читатель снимков каталога (без блокировок)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.base = os.path.join(root, SNAPSHOTS_DIR)
+
+    def current_version(self) -> Optional[int]:
+        path = os.path.join(self.base, CURRENT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+
+    def versions(self) -> List[int]:
+        manifests = os.path.join(self.base, MANIFESTS_DIR)
+        if not os.path.isdir(manifests):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(manifests) if name.endswith('.json'))
+
+    def _read_manifest(self, version: int) -> Dict:
+        with open(os.path.join(self.base, MANIFESTS_DIR, f'{_number(version)}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def pin(self, version: Optional[int] = None, lease: bool = False) -> Optional[Snapshot]:
+        """
+        Снимок версии version (по умолчанию - последней); None, если снимков нет.
+        lease=True записывает аренду: до Snapshot.release() (или выхода из with)
+        prune не удалит ни манифест, ни его поколения.
+        """
+        requested = version
+        version = self.current_version() if requested is None else requested
+        if version is None:
+            return None
+        lease_path = self._take_lease(version) if lease else None
+        try:
+            manifest = self._read_manifest(version)
+        except FileNotFoundError:
+            if lease_path is not None:
+                os.remove(lease_path)
+            if requested is not None:
+                raise
+            return self.pin(None, lease)     # манифест удален до аренды - последний уже новее
+        return Snapshot(self.root, manifest['version'], manifest['files'], manifest.get('created_at'), lease_path)
+
+    def _take_lease(self, version: int) -> str:
+        readers = os.path.join(self.base, READERS_DIR)
+        path = os.path.join(readers, f'{os.getpid()}-{uuid.uuid4().hex[:12]}.json')
+        atomic_write_json(path, {'version': version, 'pid': os.getpid(), 'taken_at': datetime.now().isoformat()})
+        return path
+
+    def leased_versions(self) -> Set[int]:
+        """Версии, закрепленные арендами живых процессов; аренды умерших процессов удаляются."""
+        readers = os.path.join(self.base, READERS_DIR)
+        versions = set()
+        for name in os.listdir(readers) if os.path.isdir(readers) else []:
+            path = os.path.join(readers, name)
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lease = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            if _process_alive(lease['pid']):
+                versions.add(lease['version'])
+            elif os.path.exists(path):
+                os.remove(path)
+        return versions
+
+
+class SnapshotWriter(SnapshotReader):
+    """
+    Писатель снимков: put() атомарно заменяет текущий файл и добавляет
+    его поколение, publish() выпускает новый манифест. Предполагается
+    один писатель на каталог; номера манифестов занимаются эксклюзивным
+    созданием файла, поэтому параллельный писатель не перезапишет чужую версию.
+    """
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self._pending: Dict[str, str] = {}
+
+    def _next_generation(self, name: str) -> str:
+        directory = os.path.join(self.base, GENERATIONS_DIR, name.rsplit('.', 1)[0])
+        os.makedirs(directory, exist_ok=True)
+        extension = os.path.splitext(name)[1]
+        existing = [int(n.split('.')[0]) for n in os.listdir(directory) if n.split('.')[0].isdigit()]
+        return os.path.join(directory, f'{_number(max(existing, default=0) + 1)}{extension}')
+
+    def put(self, name: str, write: Callable[[IO], None], mode: str = 'w', **open_kwargs) -> str:
+        """
+        Записывает файл name: сначала неизменяемое поколение, затем атомарная
+        замена текущего файла (жесткая ссылка, при невозможности - копия).
+        Поколение попадает в снимок при следующем publish().
+        """
+        generation = self._next_generation(name)
+        atomic_write(generation, write, mode, **open_kwargs)
+        current = os.path.join(self.root, name)
+        tmp_path = f'{os.path.join(self.root, "." + name)}.{os.getpid()}.tmp'
+        try:
+            os.link(generation, tmp_path)
+        except OSError:
+            shutil.copyfile(generation, tmp_path)
+        os.replace(tmp_path, current)
+        self._pending[name] = os.path.relpath(generation, self.base)
+        return generation
+
+    def publish(self) -> Optional[int]:
+        """Выпускает манифест: предыдущий снимок + записанные поколения. Возвращает номер версии."""
+        if not self._pending:
+            return self.current_version()
+        previous = self.pin()
+        files = dict(previous.files) if previous else {}
+        files.update(self._pending)
+        manifests = os.path.join(self.base, MANIFESTS_DIR)
+        os.makedirs(manifests, exist_ok=True)
+        version = (previous.version if previous else 0) + 1
+        while True:
+            try:
+                fd = os.open(os.path.join(manifests, f'{_number(version)}.json'), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+                break
+            except FileExistsError:
+                version += 1
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'created_at': datetime.now().isoformat(), 'files': files},
+                      f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        atomic_write(os.path.join(self.base, CURRENT_FILE), lambda f: f.write(str(version)), encoding='utf-8')
+        self._pending = {}
+        return version
+
+    def adopt(self, names: List[str]) -> Optional[int]:
+        """
+        Первый снимок каталога, заполненного до появления снимков: текущие
+        файлы становятся поколениями (жесткими ссылками) и публикуются.
+        """
+        for name in names:
+            generation = self._next_generation(name)
+            try:
+                os.link(os.path.join(self.root, name), generation)
+            except OSError:
+                shutil.copyfile(os.path.join(self.root, name), generation)
+            self._pending[name] = os.path.relpath(generation, self.base)
+        return self.publish()
+
+    def prune(self, keep: int = KEEP_MANIFESTS, grace_seconds: float = GRACE_SECONDS) -> int:
+        """
+        Удаляет манифесты, которые одновременно: не входят в последние keep,
+        старше grace_seconds и не закреплены арендой живого читателя; затем -
+        поколения, на которые не ссылается ни один оставшийся манифест.
+        Возвращает число удаленных поколений.
+        """
+        versions = self.versions()
+        leased = self.leased_versions()
+        current = self.current_version()
+        deadline = time.time() - grace_seconds
+        for version in versions[:-max(keep, 1)]:
+            path = os.path.join(self.base, MANIFESTS_DIR, f'{_number(version)}.json')
+            if version in leased or version == current or os.path.getmtime(path) > deadline:
+                continue
+            os.remove(path)
+        referenced = set()
+        for version in self.versions():
+            referenced.update(self.pin(version).files.values())
+        referenced.update(self._pending.values())
+
+        removed = 0
+        generations = os.path.join(self.base, GENERATIONS_DIR)
+        for directory in os.listdir(generations) if os.path.isdir(generations) else []:
+            for name in os.listdir(os.path.join(generations, directory)):
+                relative = os.path.join(GENERATIONS_DIR, directory, name)
+                if relative not in referenced:
+                    os.remove(os.path.join(self.base, relative))
+                    removed += 1
+        return removed
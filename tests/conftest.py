@@ -0,0 +1,27 @@
+"""
+Общие фикстуры тестов. Тесты запускаются из корня проекта: python -m pytest -q
+Модули проекта - пакеты пространства имен без __init__.py, поэтому корень
+добавляется в sys.path.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from analysis.absolute_rates import AbsoluteRates, save_absolute_rates
+
+
+@pytest.fixture
+def rates_dir(tmp_path):
+    """Небольшое решение: 3 валюты, 10 дней, курсы меняются по дням."""
+    days = np.arange(19000, 19010, dtype=np.int32)
+    base = np.log(np.array([1.0, 1.1, 150.0]))
+    log_rates = base[np.newaxis, :] + 0.01 * np.arange(10)[:, np.newaxis] * np.array([0.0, 1.0, -1.0])
+    path = str(tmp_path / 'absolute')
+    save_absolute_rates(AbsoluteRates(days, ['USD', 'EUR', 'JPY'], log_rates), path)
+    return path
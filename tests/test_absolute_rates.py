@@ -0,0 +1,99 @@
+import numpy as np
+
+from analysis.absolute_rates import (AbsoluteRates, Observations, collect_observations, load_absolute_rates,
+                                     panel_observations, save_absolute_rates, solve_absolute_rates,
+                                     solve_day_block, solve_day_block_robust)
+from analysis.data_quality import FLAG_SPIKE, QualityLayer, save_quality_layer
+from analysis.pair_universe import PairUniverse
+from analysis.panel import Panel
+from storage.pair_store import DATE_COLUMN, PairStore
+
+CURRENCIES = ['USD', 'EUR', 'JPY', 'GBP']
+
+
+def true_rates(n_days, seed=0):
+    """Логарифмы абсолютных курсов с нулевой суммой по валютам на каждую дату."""
+    x = np.random.default_rng(seed).normal(0, 1, (n_days, len(CURRENCIES)))
+    return x - x.mean(axis=1, keepdims=True)
+
+
+def observations(x, pairs, weight=1.0, noise=None):
+    days = np.repeat(np.arange(len(x)), len(pairs)).astype(np.int32)
+    base = np.tile([b for b, _ in pairs], len(x)).astype(np.int32)
+    quote = np.tile([q for _, q in pairs], len(x)).astype(np.int32)
+    log_rate = x[days, base] - x[days, quote]
+    if noise is not None:
+        log_rate = log_rate + noise
+    return Observations(days, base, quote, log_rate, np.full(len(days), weight))
+
+
+def test_exact_observations_recover_rates():
+    x = true_rates(30)
+    obs = observations(x, [(1, 0), (0, 2), (3, 0), (1, 3)])
+    solution = solve_absolute_rates(obs, 30, len(CURRENCIES), chunk_days=7)
+    np.testing.assert_allclose(solution, x, atol=1e-6)
+
+
+def test_weights_blend_conflicting_sources():
+    a = Observations(np.array([0], np.int32), np.array([1], np.int32), np.array([0], np.int32),
+                     np.array([0.10]), np.array([3.0]))
+    b = a._replace(log_rate=np.array([0.02]), weight=np.array([1.0]))
+    solution = solve_day_block(Observations.concat([a, b]), 0, 1, 2)
+    # Взвешенное среднее наблюдений: (3 * 0.10 + 1 * 0.02) / 4
+    np.testing.assert_allclose(solution[0, 1] - solution[0, 0], 0.08, atol=1e-6)
+    np.testing.assert_allclose(solution.sum(), 0.0, atol=1e-9)
+
+
+def test_unobserved_currency_is_nan():
+    x = true_rates(3)
+    solution = solve_absolute_rates(observations(x, [(1, 0), (2, 0)]), 3, len(CURRENCIES))
+    assert np.isnan(solution[:, 3]).all()
+    assert np.isfinite(solution[:, :3]).all()
+
+
+def test_robust_solution_ignores_outlier():
+    x = true_rates(1)
+    pairs = [(1, 0), (2, 0), (3, 0), (1, 2), (1, 3), (2, 3)]
+    obs = observations(x, pairs)
+    log_rate = obs.log_rate.copy()
+    log_rate[0] += 0.5
+    obs = obs._replace(log_rate=log_rate)
+    plain = solve_day_block(obs, 0, 1, len(CURRENCIES))
+    robust = solve_day_block_robust(obs, 0, 1, len(CURRENCIES))
+    assert np.abs(robust - x).max() < np.abs(plain - x).max() / 3
+
+
+def test_panel_observations_skip_invalid_and_masked():
+    universe = PairUniverse(['EUR/USD', 'USD/JPY'])
+    panel = Panel(np.array([0, 1], np.int32), ['EUR/USD', 'USD/JPY', 'XXX/USD'],
+                  np.array([[1.1, np.nan, 2.0], [-1.0, 150.0, 2.0]]))
+    obs = panel_observations(panel, universe, 'test', weight_fn=lambda source, symbol: 2.0)
+    assert obs.day_idx.tolist() == [0, 1]
+    assert obs.weight.tolist() == [2.0, 2.0]
+    np.testing.assert_allclose(obs.log_rate, np.log([1.1, 150.0]))
+    mask = np.array([[False, True, True], [True, True, True]])
+    assert panel_observations(panel, universe, 'test', mask=mask).day_idx.tolist() == [1]
+
+
+def test_collect_observations_uses_all_sources_and_quality(tmp_path):
+    store = PairStore(str(tmp_path / 'store'))
+    days = np.arange(19000, 19004, dtype=np.int32)
+    store.write_series('a', 'EUR/USD', {DATE_COLUMN: days, 'close': np.full(4, 1.1)})
+    store.write_series('b', 'EUR/USD', {DATE_COLUMN: days[2:], 'close': np.full(2, 1.2)})
+    quality = str(tmp_path / 'quality')
+    save_quality_layer(QualityLayer(days, ['EUR/USD'], np.array([[0], [FLAG_SPIKE], [0], [0]], np.uint8)),
+                       'a', quality)
+    universe = PairUniverse(['EUR/USD'])
+    calendar, obs = collect_observations(store, universe, ['a', 'b'], quality_dir=quality,
+                                         weight_fn=lambda source, symbol: 1.0)
+    assert calendar.tolist() == days.tolist()
+    assert sorted(zip(obs.day_idx.tolist(), np.round(np.exp(obs.log_rate), 6).tolist())) == [
+        (0, 1.1), (2, 1.1), (2, 1.2), (3, 1.1), (3, 1.2)]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rates = AbsoluteRates(np.arange(19000, 19003, dtype=np.int32), CURRENCIES, true_rates(3))
+    save_absolute_rates(rates, str(tmp_path))
+    loaded = load_absolute_rates(str(tmp_path))
+    assert loaded.currencies == CURRENCIES
+    np.testing.assert_array_equal(loaded.log_rates, rates.log_rates)
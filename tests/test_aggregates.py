@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from storage.aggregates import (aggregate_ohlc, period_start, read_aggregate, update_matrix_aggregates,
+                                update_source_aggregates)
+from storage.pair_store import DATE_COLUMN, PairStore, dates_to_days
+
+SOURCE, SYMBOL = 'test', 'EUR/USD'
+T0 = datetime(2024, 1, 1, 12)
+
+
+def bars(days, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + 0.01 * rng.normal(size=len(days)).cumsum()
+    return {DATE_COLUMN: np.asarray(days, dtype=np.int32), 'open': close - 0.001, 'high': close + 0.002,
+            'low': close - 0.002, 'close': close}
+
+
+def full_aggregates(tmp_path, columns, level):
+    store = PairStore(str(tmp_path / 'fresh_pairs'))
+    store.write_series(SOURCE, SYMBOL, columns)
+    root = str(tmp_path / 'fresh_aggregates')
+    update_source_aggregates(store, SOURCE, root=root)
+    return read_aggregate(level, SOURCE, SYMBOL, root=root)
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for column in actual:
+        np.testing.assert_array_equal(actual[column], expected[column])
+
+
+@pytest.fixture
+def pairs(tmp_path):
+    return PairStore(str(tmp_path / 'pairs'))
+
+
+def test_period_start():
+    days = dates_to_days(['2024-01-01', '2024-01-07', '2024-01-08', '2024-02-29', '2024-12-31'])
+    assert period_start(days, 'week').tolist() == dates_to_days(
+        ['2024-01-01', '2024-01-01', '2024-01-08', '2024-02-26', '2024-12-30']).tolist()
+    assert period_start(days, 'month').tolist() == dates_to_days(
+        ['2024-01-01', '2024-01-01', '2024-01-01', '2024-02-01', '2024-12-01']).tolist()
+    assert set(period_start(days, 'year').tolist()) == {int(dates_to_days('2024-01-01'))}
+    with pytest.raises(ValueError):
+        period_start(days, 'decade')
+
+
+def test_aggregate_ohlc_week():
+    days = dates_to_days(['2024-01-01', '2024-01-02', '2024-01-08'])
+    result = aggregate_ohlc(days, {'open': [1, 2, 3], 'high': [5, np.nan, 4], 'low': [0, 1, 2],
+                                   'close': [1.5, 2.5, 3.5]}, 'week')
+    assert result['open'].tolist() == [1, 3]
+    assert result['high'].tolist() == [5, 4]
+    assert result['low'].tolist() == [0, 2]
+    assert result['close'].tolist() == [2.5, 3.5]
+    assert result['count'].tolist() == [2, 1]
+
+
+def test_revision_rebuilds_its_period(tmp_path, pairs):
+    columns = bars(np.arange(19000, 19120))
+    root = str(tmp_path / 'aggregates')
+    pairs.write_series(SOURCE, SYMBOL, columns, T0)
+    update_source_aggregates(pairs, SOURCE, root=root)
+
+    revised = {name: values.copy() for name, values in columns.items()}
+    revised['close'][10] += 0.5
+    revised['high'][10] += 0.5
+    pairs.merge_series(SOURCE, SYMBOL, {name: values[10:11] for name, values in revised.items()}, T0)
+    assert update_source_aggregates(pairs, SOURCE, root=root) > 0
+    for level in ['week', 'month', 'year']:
+        assert_same(read_aggregate(level, SOURCE, SYMBOL, root=root), full_aggregates(tmp_path, revised, level))
+
+    # Изменения учтены: пересчитывается только последний период каждого уровня
+    assert update_source_aggregates(pairs, SOURCE, root=root) == 3
+
+
+def test_inserted_middle_day_updates_count(tmp_path, pairs):
+    columns = bars(np.arange(19000, 19060))
+    gap = np.ones(60, dtype=bool)
+    gap[5] = False
+    root = str(tmp_path / 'aggregates')
+    pairs.write_series(SOURCE, SYMBOL, {name: values[gap] for name, values in columns.items()}, T0)
+    update_source_aggregates(pairs, SOURCE, root=root)
+
+    pairs.merge_series(SOURCE, SYMBOL, {name: values[5:6] for name, values in columns.items()}, T0)
+    update_source_aggregates(pairs, SOURCE, root=root)
+    assert_same(read_aggregate('week', SOURCE, SYMBOL, root=root), full_aggregates(tmp_path, columns, 'week'))
+
+
+def test_first_changed_day_reads_new_log_entries(pairs):
+    columns = bars(np.arange(19000, 19010))
+    pairs.write_series(SOURCE, SYMBOL, columns, T0)
+    day, seen = pairs.first_changed_day(SOURCE, SYMBOL, None)
+    assert day is None and seen == {'revisions': 0, 'insertions': 1}
+    assert pairs.first_changed_day(SOURCE, SYMBOL, seen) == (None, seen)
+
+    pairs.merge_series(SOURCE, SYMBOL, {DATE_COLUMN: np.array([19003, 19012], dtype=np.int32),
+                                        'close': np.array([2.0, 2.0])}, T0)
+    day, later = pairs.first_changed_day(SOURCE, SYMBOL, seen)
+    assert day == 19003
+    assert later == {'revisions': 1, 'insertions': 2}
+    # Журнал короче учтенного: изменился весь ряд
+    assert pairs.first_changed_day(SOURCE, SYMBOL, {'revisions': 5, 'insertions': 2})[0] == 19000
+
+
+def test_matrix_aggregates_follow_restated_history(tmp_path):
+    days = np.arange(19000, 19090, dtype=np.int32)
+    root = str(tmp_path / 'aggregates')
+    matrix = np.linspace(0.0, 1.0, 90)[:, np.newaxis]
+    update_matrix_aggregates(days, ['EUR'], matrix, 'absolute', root=root)
+    restated = matrix.copy()
+    restated[3] = 5.0
+    update_matrix_aggregates(days, ['EUR'], restated, 'absolute', root=root)
+    month = read_aggregate('month', 'absolute', 'EUR', root=root)
+    assert month['high'][0] == 5.0
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from analysis.alignment import (ASOF, align_asof, align_exact, align_many, business_calendar,
+                                master_calendar)
+from storage.pair_store import dates_to_days
+
+MON = int(dates_to_days('2024-01-08'))
+
+
+def test_business_calendar_skips_weekends_and_holidays():
+    calendar = business_calendar(MON - 2, MON + 6, holidays=[MON + 2])
+    assert (calendar - MON).tolist() == [0, 1, 3, 4]
+    assert len(business_calendar(MON, MON - 1)) == 0
+
+
+def test_master_calendar_keeps_weekend_observations():
+    saturday = np.array([MON + 5], dtype=np.int32)
+    calendar = master_calendar([np.array([MON], dtype=np.int32), saturday])
+    assert (calendar - MON).tolist() == [0, 1, 2, 3, 4, 5]
+    assert (master_calendar([saturday], include_observed=False)).tolist() == []
+
+
+def test_align_exact_places_matching_days_only():
+    calendar = np.array([MON, MON + 1, MON + 2], dtype=np.int32)
+    days = np.array([MON - 1, MON + 1, MON + 3], dtype=np.int32)
+    result = align_exact(calendar, days, np.array([1.0, 2.0, 3.0]))
+    np.testing.assert_array_equal(result, [np.nan, 2.0, np.nan])
+
+
+def test_align_asof_limits_staleness_and_skips_nan():
+    calendar = np.arange(MON, MON + 6, dtype=np.int32)
+    days = np.array([MON + 1, MON + 2], dtype=np.int32)
+    values, age = align_asof(calendar, days, np.array([1.0, np.nan]), max_staleness=2)
+    np.testing.assert_array_equal(values, [np.nan, 1.0, 1.0, 1.0, np.nan, np.nan])
+    assert age.tolist() == [-1, 0, 1, 2, -1, -1]
+
+
+def test_align_many_builds_day_major_matrix():
+    calendar = np.array([MON, MON + 1, MON + 2], dtype=np.int32)
+    series = [(np.array([MON], dtype=np.int32), np.array([1.0])),
+              (np.array([MON + 1, MON + 2], dtype=np.int32), np.array([2.0, 3.0]))]
+    values, age = align_many(calendar, series, how=ASOF)
+    assert values.flags['C_CONTIGUOUS'] and values.shape == (3, 2)
+    np.testing.assert_array_equal(values, [[1.0, np.nan], [1.0, 2.0], [1.0, 3.0]])
+    assert age.tolist() == [[0, -1], [1, 0], [2, 0]]
+    exact_values, exact_age = align_many(calendar, series)
+    np.testing.assert_array_equal(exact_values, [[1.0, np.nan], [np.nan, 2.0], [np.nan, 3.0]])
+    assert exact_age.tolist() == [[0, -1], [-1, 0], [-1, 0]]
+    with pytest.raises(ValueError):
+        align_many(calendar, series, how='nearest')
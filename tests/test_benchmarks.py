@@ -0,0 +1,31 @@
+import json
+
+import numpy as np
+
+from benchmarks.run_benchmarks import Case, compare, cross_lookup_case, measure, synthetic_panel
+
+
+def test_synthetic_panel_is_reproducible_and_consistent():
+    panel, universe = synthetic_panel(40, 10, 30)
+    again, _ = synthetic_panel(40, 10, 30)
+    np.testing.assert_array_equal(panel.values, again.values)
+    assert panel.values.shape == (30, 40)
+    assert len(set(panel.symbols)) == 40 and universe.n_pairs == 40
+    assert np.isnan(panel.values).any() and (panel.values[np.isfinite(panel.values)] > 0).all()
+
+
+def test_measure_and_compare(tmp_path, capsys):
+    calls = []
+    result = measure(Case('noop', lambda: calls.append(1), {'n': 1}), repeat=3)
+    assert len(calls) == 3
+    assert result['repeat'] == 3 and result['params'] == {'n': 1}
+    assert 0 <= result['min_sec'] <= result['median_sec']
+
+    lookups = cross_lookup_case('cross', np.zeros((5, 3))).run()
+    assert np.all(lookups == 1.0)
+
+    previous = tmp_path / 'previous.json'
+    previous.write_text(json.dumps({'commit': 'abc', 'results': {'noop': {'min_sec': 1.0}}}))
+    compare({'results': {'noop': {'min_sec': 1.5}, 'new': {'min_sec': 1.0}}}, str(previous))
+    output = capsys.readouterr().out
+    assert '⚠️' in output and 'x1.50' in output and 'new' not in output
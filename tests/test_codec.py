@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from storage import codec
+
+
+def round_trip(values, block_rows=codec.BLOCK_ROWS):
+    decoded = codec.decode_array(codec.encode_array(values, block_rows))
+    assert decoded.dtype == np.asarray(values).dtype
+    return decoded
+
+
+def assert_bitwise_equal(actual, expected):
+    assert actual.shape == expected.shape
+    np.testing.assert_array_equal(actual.view(np.uint64), expected.view(np.uint64))
+
+
+@pytest.mark.parametrize('decimals', [0, 2, 5])
+def test_quoted_prices_round_trip_exactly(decimals):
+    rng = np.random.default_rng(decimals)
+    values = np.round(1.1 + np.cumsum(rng.normal(0, 0.001, 10_000)), decimals)
+    assert_bitwise_equal(round_trip(values, block_rows=1000), values)
+
+
+def test_prices_compress_better_than_raw():
+    values = np.round(1.1 + np.cumsum(np.random.default_rng(0).normal(0, 0.0005, 10_000)), 5)
+    assert len(codec.encode_array(values)) < values.nbytes / 3
+
+
+def test_arbitrary_floats_use_xor_and_round_trip():
+    values = np.random.default_rng(1).random(3000) * 1e-3
+    data, info = codec.encode_block(values)
+    assert info['mode'] == codec.XOR
+    assert_bitwise_equal(round_trip(values, block_rows=1024), values)
+
+
+def test_nan_inf_and_all_nan_blocks():
+    values = np.array([np.nan, 1.5, np.nan, np.inf, 2.25, -np.inf] + [np.nan] * 8)
+    decoded = round_trip(values, block_rows=6)
+    np.testing.assert_array_equal(decoded, values)
+    assert codec.encode_block(np.full(4, np.nan))[1]['mode'] == codec.NAN
+
+
+def test_days_round_trip_and_empty():
+    days = np.cumsum(np.random.default_rng(2).integers(1, 4, 5000)).astype(np.int32) + 19000
+    np.testing.assert_array_equal(round_trip(days, block_rows=512), days)
+    assert len(round_trip(np.empty(0))) == 0
+
+
+def test_column_reader_reads_ranges_across_blocks(tmp_path):
+    values = np.round(np.linspace(1.0, 2.0, 10_000), 4)
+    path = str(tmp_path / 'close.zd')
+    with open(path, 'wb') as f:
+        f.write(codec.encode_array(values, block_rows=1000))
+    reader = codec.ColumnReader(path)
+    assert reader.rows == 10_000
+    for start, stop in [(0, 10_000), (999, 1001), (1500, 1600), (9999, 20_000), (5, 5)]:
+        np.testing.assert_array_equal(reader.read(start, stop), values[start:stop])
+    np.testing.assert_array_equal(codec.read_column(path), values)
+
+
+def test_reader_rejects_foreign_file(tmp_path):
+    path = tmp_path / 'bad.zd'
+    path.write_bytes(b'NOPE' + b'\x00' * 16)
+    with pytest.raises(ValueError):
+        codec.ColumnReader(str(path))
+
+
+def test_negative_zero_keeps_its_sign():
+    values = np.array([1.5, -0.0, 0.25, 0.0])
+    assert_bitwise_equal(round_trip(values), values)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from analysis.absolute_rates import load_absolute_rates
+from analysis.conversion import ConversionIndex, convert_batch, pack_codes
+
+
+@pytest.fixture
+def index(rates_dir):
+    return ConversionIndex(load_absolute_rates(rates_dir))
+
+
+def test_pack_codes_unicode_and_bytes_agree():
+    codes = ['AAA', 'EUR', 'ZZZ']
+    keys = pack_codes(codes)
+    assert keys.tolist() == [0, (4 * 26 + 20) * 26 + 17, 26 ** 3 - 1]
+    assert pack_codes(np.array(codes, dtype='S3')).tolist() == keys.tolist()
+
+
+@pytest.mark.parametrize('code', ['USDT', 'EURO', 'eur', 'EU', '', 'E1R', 'ÉUR'])
+def test_pack_codes_rejects_non_codes(code):
+    assert pack_codes([code, 'USD'])[0] == -1
+    assert pack_codes([code, 'USD'])[1] >= 0
+
+
+def test_pack_codes_long_bytes():
+    assert pack_codes(np.array([b'USDT', b'USD'])).tolist()[0] == -1
+
+
+def test_convert_codes(index, rates_dir):
+    rates = load_absolute_rates(rates_dir)
+    days = rates.days[[0, 5]]
+    result = convert_batch([100.0, 100.0], ['EUR', 'JPY'], ['USD', 'EUR'], days, index=index)
+    expected = 100.0 * np.exp([rates.log_rates[0, 1] - rates.log_rates[0, 0],
+                               rates.log_rates[5, 2] - rates.log_rates[5, 1]])
+    np.testing.assert_allclose(result, expected)
+
+
+def test_convert_asof_and_before_start(index, rates_dir):
+    rates = load_absolute_rates(rates_dir)
+    result = convert_batch([1.0, 1.0, 1.0], 'EUR', 'USD',
+                           [rates.days[0] - 1, rates.days[-1] + 30, rates.days[3]], index=index)
+    assert np.isnan(result[0])
+    np.testing.assert_allclose(result[1:], np.exp(rates.log_rates[[-1, 3], 1] - rates.log_rates[[-1, 3], 0]))
+
+
+def test_integer_ids_are_bounds_checked(index, rates_dir):
+    rates = load_absolute_rates(rates_dir)
+    day = rates.days[0]
+    result = convert_batch([1.0, 1.0, 1.0, 1.0], np.array([1, 3, -1, 1]), np.array([0, 0, 0, 99]), day,
+                           index=index)
+    np.testing.assert_allclose(result[0], np.exp(rates.log_rates[0, 1] - rates.log_rates[0, 0]))
+    assert np.isnan(result[1:]).all()
+
+    rows = index.day_rows([day, day])
+    assert np.isnan(index.convert([1.0, 1.0], np.array([5, -2]), np.array([0, 0]), rows)).all()
+
+
+def test_unknown_codes_give_nan(index, rates_dir):
+    result = convert_batch([1.0, 1.0], ['USDT', 'GBP'], 'USD', load_absolute_rates(rates_dir).days[0],
+                           index=index)
+    assert np.isnan(result).all()
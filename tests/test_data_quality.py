@@ -0,0 +1,76 @@
+import numpy as np
+
+from analysis.data_quality import (FLAG_GAP, FLAG_HIGH_LOW, FLAG_NONPOSITIVE, FLAG_RECIPROCAL, FLAG_SPIKE,
+                                   MAX_GAP_BUSINESS_DAYS, QualityLayer, flags_panel, load_quality_layer,
+                                   quality_mask, save_quality_layer, scan_panel)
+from analysis.pair_universe import PairUniverse
+from storage.pair_store import dates_to_days
+
+
+def ohlc_from_close(close):
+    close = np.asarray(close, dtype=np.float64)
+    return {'open': close, 'high': close * 1.001, 'low': close * 0.999, 'close': close}
+
+
+def test_quality_mask_on_empty_layer_is_all_good():
+    layer = QualityLayer(np.empty(0, dtype=np.int32), [], np.empty((0, 0), dtype=np.uint8))
+    mask = quality_mask(layer, np.arange(19000, 19003, dtype=np.int32), ['EUR/USD'])
+    assert mask.shape == (3, 1) and mask.all()
+
+
+def test_quality_mask_matches_dates_and_symbols():
+    flags = np.array([[0, FLAG_SPIKE], [FLAG_GAP, 0]], dtype=np.uint8)
+    layer = QualityLayer(np.array([19000, 19002], dtype=np.int32), ['EUR/USD', 'USD/JPY'], flags)
+    days = np.array([18999, 19000, 19001, 19002, 19003], dtype=np.int32)
+    mask = quality_mask(layer, days, ['USD/JPY', 'GBP/USD', 'EUR/USD'])
+    # Флаг GAP информационный; даты и пары вне слоя пригодны
+    assert mask.tolist() == [[True, True, True], [False, True, True], [True, True, True],
+                             [True, True, True], [True, True, True]]
+    assert flags_panel(layer, days, ['EUR/USD'])[:, 0].tolist() == [0, 0, 0, FLAG_GAP, 0]
+
+
+def test_gap_counts_business_days_between_bars():
+    universe = PairUniverse(['EUR/USD', 'GBP/USD'])
+    days = dates_to_days(['2024-01-05', '2024-01-06', '2024-01-15', '2024-01-16',
+                          '2024-01-22', '2024-01-23', '2024-01-24'])
+    close = np.full((7, 2), np.nan)
+    # EUR/USD: бар в субботу, затем вторник через неделю - 6 рабочих дней между ними
+    close[[0, 1, 3], 0] = 1.1
+    # GBP/USD: понедельник -> вторник через неделю (5 дней) -> среда через неделю (6 дней)
+    close[[2, 5], 1] = 1.3
+    flags = scan_panel(days, ohlc_from_close(close), universe)
+    assert MAX_GAP_BUSINESS_DAYS == 5
+    assert flags[3, 0] & FLAG_GAP
+    assert not flags[5, 1] & FLAG_GAP
+
+    close[5, 1] = np.nan
+    close[6, 1] = 1.3
+    flags = scan_panel(days, ohlc_from_close(close), universe)
+    assert flags[6, 1] & FLAG_GAP
+
+
+def test_scan_panel_flags():
+    universe = PairUniverse(['EUR/USD', 'USD/EUR'])
+    days = np.arange(19000, 19040, dtype=np.int32)
+    rng = np.random.default_rng(0)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.001, 40)))
+    panel = np.column_stack([close, 1.0 / close])
+    panel[20, 0] *= 1.5                     # выброс и рассогласование зеркал
+    ohlc = ohlc_from_close(panel)
+    ohlc['low'][5, 1] = ohlc['high'][5, 1] * 2
+    ohlc['close'][7, 1] = -1.0
+    flags = scan_panel(days, ohlc, universe)
+    assert flags[20, 0] & FLAG_SPIKE
+    assert flags[20, 0] & FLAG_RECIPROCAL and flags[20, 1] & FLAG_RECIPROCAL
+    assert flags[5, 1] & FLAG_HIGH_LOW
+    assert flags[7, 1] & FLAG_NONPOSITIVE
+
+
+def test_quality_layer_round_trip(tmp_path):
+    layer = QualityLayer(np.array([19000, 19001], dtype=np.int32), ['EUR/USD'],
+                         np.array([[0], [FLAG_SPIKE]], dtype=np.uint8))
+    save_quality_layer(layer, 'test', str(tmp_path))
+    loaded = load_quality_layer('test', str(tmp_path))
+    assert loaded.symbols == ['EUR/USD']
+    assert loaded.days.tolist() == [19000, 19001]
+    assert loaded.flags[:, 0].tolist() == [0, FLAG_SPIKE]
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from storage import derived
+from storage.derived import (ROLLING_WINDOW, ewma_variance, read_derived, rolling_std,
+                             update_matrix_derived, update_source_derived)
+from storage.pair_store import DATE_COLUMN, PairStore
+
+SOURCE, SYMBOL = 'test', 'EUR/USD'
+
+
+def close_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    days = np.arange(19000, 19000 + n, dtype=np.int32)
+    return days, 1.1 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def columns(days, close):
+    return {DATE_COLUMN: np.asarray(days, dtype=np.int32), 'close': np.asarray(close, dtype=np.float64)}
+
+
+def full_recompute(tmp_path, days, close):
+    """Производные колонки, посчитанные за один проход с нуля."""
+    store = PairStore(str(tmp_path / 'fresh_pairs'))
+    store.write_series(SOURCE, SYMBOL, columns(days, close))
+    root = str(tmp_path / 'fresh_derived')
+    update_source_derived(store, SOURCE, root=root)
+    return read_derived(SOURCE, SYMBOL, root=root)
+
+
+def assert_same(actual, expected):
+    assert np.array_equal(actual[DATE_COLUMN], expected[DATE_COLUMN])
+    for column in ['log_return', 'ewma_vol', 'rolling_vol']:
+        np.testing.assert_allclose(actual[column], expected[column], rtol=1e-10, equal_nan=True)
+
+
+@pytest.fixture
+def pairs(tmp_path):
+    return PairStore(str(tmp_path / 'pairs'))
+
+
+def test_ewma_variance_matches_loop():
+    squared = np.random.default_rng(1).random(700)
+    expected, prev = [], 0.5
+    for value in squared:
+        prev = 0.94 * prev + 0.06 * value
+        expected.append(prev)
+    np.testing.assert_allclose(ewma_variance(squared, initial=0.5), expected, rtol=1e-10)
+
+
+def test_rolling_std_matches_sample_std():
+    returns = np.random.default_rng(2).normal(size=50)
+    result = rolling_std(returns)
+    assert np.isnan(result[:ROLLING_WINDOW - 1]).all()
+    expected = [np.std(returns[i - ROLLING_WINDOW + 1:i + 1], ddof=1) for i in range(ROLLING_WINDOW - 1, 50)]
+    np.testing.assert_allclose(result[ROLLING_WINDOW - 1:], expected, rtol=1e-8)
+
+
+def test_incremental_appends_match_full_recompute(tmp_path, pairs):
+    days, close = close_series(80)
+    root = str(tmp_path / 'derived')
+    pairs.write_series(SOURCE, SYMBOL, columns(days[:50], close[:50]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 50
+    pairs.merge_series(SOURCE, SYMBOL, columns(days[50:], close[50:]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 30
+    assert update_source_derived(pairs, SOURCE, root=root) == 0
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days, close))
+
+
+def test_revision_of_earlier_close_is_recomputed(tmp_path, pairs):
+    days, close = close_series(80)
+    root = str(tmp_path / 'derived')
+    pairs.write_series(SOURCE, SYMBOL, columns(days[:60], close[:60]))
+    update_source_derived(pairs, SOURCE, root=root)
+
+    revised = close.copy()
+    revised[30] *= 1.05
+    pairs.merge_series(SOURCE, SYMBOL, columns(days[30:31], revised[30:31]))
+    pairs.merge_series(SOURCE, SYMBOL, columns(days[60:], revised[60:]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 50
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days, revised))
+
+    # Ревизии учтены: повторный вызов ничего не пересчитывает
+    assert update_source_derived(pairs, SOURCE, root=root) == 0
+
+
+def test_inserted_middle_day_is_recomputed(tmp_path, pairs):
+    days, close = close_series(40)
+    root = str(tmp_path / 'derived')
+    gap = np.ones(40, dtype=bool)
+    gap[10] = False
+    pairs.write_series(SOURCE, SYMBOL, columns(days[gap], close[gap]))
+    update_source_derived(pairs, SOURCE, root=root)
+
+    pairs.merge_series(SOURCE, SYMBOL, columns(days[10:11], close[10:11]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 30
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days, close))
+
+
+def test_unchanged_history_skips_full_comparison(tmp_path, pairs, monkeypatch):
+    days, close = close_series(60)
+    root = str(tmp_path / 'derived')
+    pairs.write_series(SOURCE, SYMBOL, {**columns(days[:40], close[:40]), 'open': close[:40]})
+    update_source_derived(pairs, SOURCE, root=root)
+
+    def compare(*args):
+        raise AssertionError('full comparison of the series')
+
+    monkeypatch.setattr(derived, 'first_diverged_day', compare)
+    pairs.append_series(SOURCE, SYMBOL, {**columns(days[40:], close[40:]), 'open': close[40:]})
+    # Ревизия другой колонки не трогает слой close
+    pairs.merge_series(SOURCE, SYMBOL, {**columns(days[5:6], close[5:6]), 'open': np.array([1.0])})
+    assert len(pairs.read_revisions(SOURCE, SYMBOL, 'open')) == 1
+    assert update_source_derived(pairs, SOURCE, root=root) == 20
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days, close))
+
+
+def test_removed_middle_day_is_recomputed(tmp_path, pairs):
+    days, close = close_series(40)
+    root = str(tmp_path / 'derived')
+    pairs.write_series(SOURCE, SYMBOL, columns(days, close))
+    update_source_derived(pairs, SOURCE, root=root)
+
+    keep = np.ones(40, dtype=bool)
+    keep[15] = False
+    pairs.write_series(SOURCE, SYMBOL, columns(days[keep], close[keep]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 24
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days[keep], close[keep]))
+
+
+def test_revision_of_first_close_rebuilds_series(tmp_path, pairs):
+    days, close = close_series(30)
+    root = str(tmp_path / 'derived')
+    pairs.write_series(SOURCE, SYMBOL, columns(days, close))
+    update_source_derived(pairs, SOURCE, root=root)
+
+    revised = close.copy()
+    revised[0] *= 0.9
+    pairs.merge_series(SOURCE, SYMBOL, columns(days[:1], revised[:1]))
+    assert update_source_derived(pairs, SOURCE, root=root) == 30
+    assert_same(read_derived(SOURCE, SYMBOL, root=root), full_recompute(tmp_path, days, revised))
+
+
+def test_matrix_recomputed_from_first_changed_return(tmp_path):
+    days, close = close_series(50)
+    root = str(tmp_path / 'derived')
+    log_values = np.log(close)[:, np.newaxis]
+    assert update_matrix_derived(days[:40], ['EUR'], log_values[:40], 'absolute', root) == 40
+
+    # Сдвиг всего уровня не меняет доходностей, изменение одного дня - меняет
+    restated = log_values + 0.3
+    restated[25] += 0.02
+    assert update_matrix_derived(days, ['EUR'], restated, 'absolute', root) == 25
+
+    expected_root = str(tmp_path / 'expected')
+    update_matrix_derived(days, ['EUR'], restated, 'absolute', expected_root)
+    assert_same(read_derived('absolute', 'EUR', root=root), read_derived('absolute', 'EUR', root=expected_root))
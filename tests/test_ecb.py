@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+
+from sources import ecb
+from sources.http_cache import FetchResult
+from storage.pair_store import DATE_COLUMN, PairStore, dates_to_days
+
+# Документ ECB: даты по убыванию, как в eurofxref-hist.xml
+DOCUMENT = b'''<?xml version="1.0" encoding="UTF-8"?>
+<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01"
+                 xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">
+  <gesmes:subject>Reference rates</gesmes:subject>
+  <Cube>
+    <Cube time="2024-01-05"><Cube currency="USD" rate="1.0921"/><Cube currency="JPY" rate="158.2"/></Cube>
+    <Cube time="2024-01-04"><Cube currency="USD" rate="1.0953"/><Cube currency="JPY" rate="158.9"/></Cube>
+    <Cube time="2024-01-03"><Cube currency="USD" rate="1.0919"/></Cube>
+    <Cube time="2024-01-02"><Cube currency="USD" rate="1.0956"/><Cube currency="JPY" rate="155.7"/></Cube>
+  </Cube>
+</gesmes:Envelope>
+'''
+
+
+class StaticFetcher:
+    """Кэш с готовым телом документа в файле, как ConditionalFetcher(stream=True)."""
+
+    def __init__(self, content, directory, changed=True):
+        path = directory / 'body'
+        path.write_bytes(content)
+        self.result = FetchResult(None, changed, 200 if changed else 304, str(path))
+        self.calls = []
+
+    def fetch(self, url, params=None, stream=False):
+        self.calls.append((url, stream))
+        return self.result
+
+
+def test_iter_ecb_days():
+    days = list(ecb.iter_ecb_days(io.BytesIO(DOCUMENT)))
+    assert [day for day, _ in days] == ['2024-01-05', '2024-01-04', '2024-01-03', '2024-01-02']
+    assert days[2][1] == [('USD', 1.0919)]
+
+
+def test_blocks_cover_the_same_rows_as_collect():
+    days = list(ecb.iter_ecb_days(io.BytesIO(DOCUMENT)))
+    blocks = list(ecb.iter_ecb_blocks(days, block_days=3))
+    assert len(blocks) == 2
+    whole = ecb.collect_ecb_rates(days)
+    for symbol, columns in whole.items():
+        rows = np.concatenate([block[symbol][DATE_COLUMN] for block in blocks if symbol in block])
+        assert rows.tolist() == columns[DATE_COLUMN].tolist()
+
+
+def test_ingest_streams_blocks_into_store(tmp_path, monkeypatch):
+    store = PairStore(str(tmp_path / 'store'))
+    writes = []
+    monkeypatch.setattr(store, 'merge_series',
+                        lambda *args, **kwargs: writes.append(args[1]) or PairStore.merge_series(store, *args, **kwargs))
+    rows = ecb.ingest_ecb_history(store, io.BytesIO(DOCUMENT), block_days=1)
+    assert rows == {'EUR/USD': 4, 'EUR/JPY': 3}
+    # Одна запись на пару, а не на каждый блок
+    assert sorted(writes) == ['EUR/JPY', 'EUR/USD']
+    series = store.read_series(ecb.SOURCE_NAME, 'EUR/USD')
+    assert series[DATE_COLUMN].tolist() == dates_to_days(
+        ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']).tolist()
+    assert series['close'].tolist() == [1.0956, 1.0919, 1.0953, 1.0921]
+
+
+def test_update_adds_only_days_after_stored(tmp_path):
+    store = PairStore(str(tmp_path))
+    ecb.ingest_ecb_history(store, io.BytesIO(DOCUMENT.replace(b'1.0921', b'9.9')), currencies=['USD'])
+    store.write_series(ecb.SOURCE_NAME, 'EUR/USD', {
+        name: values[:-1] for name, values in store.read_series(ecb.SOURCE_NAME, 'EUR/USD', mmap=False).items()})
+    today = int(dates_to_days('2024-01-06'))
+    added = ecb.update_ecb(store, StaticFetcher(DOCUMENT, tmp_path), currencies=['USD'], today=today)
+    assert added == {'EUR/USD': 1}
+    assert store.read_series(ecb.SOURCE_NAME, 'EUR/USD')['close'][-1] == 1.0921
+    assert ecb.update_ecb(store, StaticFetcher(DOCUMENT, tmp_path, changed=False), today=today) == {}
+
+
+def test_update_backfills_lagging_pair(tmp_path):
+    store = PairStore(str(tmp_path))
+    ecb.ingest_ecb_history(store, io.BytesIO(DOCUMENT))
+    jpy = store.read_series(ecb.SOURCE_NAME, 'EUR/JPY', mmap=False)
+    store.write_series(ecb.SOURCE_NAME, 'EUR/JPY', {name: values[:1] for name, values in jpy.items()})
+    usd_rows = store.read_meta(ecb.SOURCE_NAME, 'EUR/USD')['rows']
+    today = int(dates_to_days('2024-01-06'))
+    assert ecb.update_ecb(store, StaticFetcher(DOCUMENT, tmp_path, changed=False), today=today) == {'EUR/JPY': 2}
+    assert store.read_meta(ecb.SOURCE_NAME, 'EUR/USD')['rows'] == usd_rows
+    assert store.read_series(ecb.SOURCE_NAME, 'EUR/JPY')['close'].tolist() == [155.7, 158.9, 158.2]
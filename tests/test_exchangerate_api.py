@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from sources import exchangerate_api as api
+from storage.pair_store import DATE_COLUMN, PairStore
+
+DAY = 19725
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, payload):
+        self.payload = payload
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        return FakeResponse(self.payload)
+
+
+def snapshot(day=DAY, **rates):
+    return {'result': 'success', 'time_last_update_unix': day * api.SECONDS_PER_DAY + 60,
+            'conversion_rates': {'USD': 1, **rates}}
+
+
+def test_fetch_snapshot_filters_invalid_rates():
+    session = FakeSession(snapshot(EUR=0.9, JPY=150, BAD='x', ZERO=0))
+    day, rates = api.fetch_snapshot(session, 'key')
+    assert day == DAY
+    assert rates == {'USD': 1.0, 'EUR': 0.9, 'JPY': 150.0}
+    assert session.urls == [f'{api.API_BASE_URL}/key/latest/USD']
+    with pytest.raises(RuntimeError):
+        api.fetch_snapshot(FakeSession({'result': 'error', 'error-type': 'invalid-key'}), 'key')
+
+
+def test_cross_matrix():
+    codes, matrix = api.cross_matrix({'USD': 1.0, 'EUR': 0.8, 'JPY': 160.0}, ['EUR', 'USD', 'XXX'])
+    assert codes == ['EUR', 'USD']
+    np.testing.assert_allclose(matrix, [[1.0, 1.25], [0.8, 1.0]])
+
+
+def test_update_stores_one_row_per_day(tmp_path):
+    store = PairStore(str(tmp_path))
+    assert api.update_exchangerate_api(store, FakeSession(snapshot(EUR=0.9, JPY=150)), 'key') == {
+        'USD/EUR': 1, 'USD/JPY': 1}
+    assert api.update_exchangerate_api(store, FakeSession(snapshot(EUR=0.8)), 'key') == {}
+    assert api.update_exchangerate_api(store, FakeSession(snapshot(DAY + 1, EUR=0.8)), 'key') == {'USD/EUR': 1}
+    series = store.read_series(api.SOURCE_NAME, 'USD/EUR')
+    assert series[DATE_COLUMN].tolist() == [DAY, DAY + 1]
+    assert series['close'].tolist() == [0.9, 0.8]
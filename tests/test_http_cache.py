@@ -0,0 +1,137 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import requests
+
+from sources import frankfurter
+from sources.http_cache import ConditionalFetcher
+from storage.pair_store import DATE_COLUMN, PairStore, dates_to_days
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), 2):
+            yield self.content[start:start + 2]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code}')
+
+
+class FakeSession:
+    """Отдает ответы из очереди и запоминает заголовки запросов."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.headers = {}
+
+    def get(self, url, params=None, headers=None, timeout=None, stream=False):
+        self.requests.append((url, params, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+def test_not_modified_returns_cached_body(tmp_path):
+    session = FakeSession(FakeResponse(200, b'v1', {'ETag': '"a"', 'Last-Modified': 'Mon, 01 Jan 2024'}),
+                          FakeResponse(304))
+    fetcher = ConditionalFetcher(str(tmp_path), session=session)
+    first = fetcher.fetch('https://x/doc', {'q': 1})
+    assert (first.content, first.changed, first.status_code) == (b'v1', True, 200)
+    second = fetcher.fetch('https://x/doc', {'q': 1})
+    assert (second.content, second.changed, second.status_code) == (b'v1', False, 304)
+    assert session.requests[0][2] == {}
+    assert session.requests[1][2] == {'If-None-Match': '"a"', 'If-Modified-Since': 'Mon, 01 Jan 2024'}
+    assert fetcher.cached_meta('https://x/doc', {'q': 1})['size'] == 2
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith('.tmp')]
+
+
+def test_params_are_part_of_the_key_and_errors_keep_cache(tmp_path):
+    session = FakeSession(FakeResponse(200, b'one', {'ETag': '"1"'}), FakeResponse(200, b'two'),
+                          FakeResponse(500))
+    fetcher = ConditionalFetcher(str(tmp_path), session=session)
+    fetcher.fetch('https://x/doc', {'q': 1})
+    fetcher.fetch('https://x/doc', {'q': 2})
+    assert session.requests[1][2] == {}
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch('https://x/doc', {'q': 1})
+    assert fetcher.cached_meta('https://x/doc', {'q': 1})['etag'] == '"1"'
+
+
+def frankfurter_payload(rates):
+    return json.dumps({'base': 'EUR', 'rates': rates}).encode()
+
+
+def test_frankfurter_adds_only_new_days(tmp_path):
+    store = PairStore(str(tmp_path / 'store'))
+    session = FakeSession(
+        FakeResponse(200, frankfurter_payload({'2024-01-02': {'USD': 1.09, 'JPY': 155.0},
+                                               '2024-01-03': {'USD': 1.1}})),
+        FakeResponse(200, frankfurter_payload({'2024-01-03': {'USD': 1.1}, '2024-01-04': {'USD': 1.2}})))
+    fetcher = ConditionalFetcher(str(tmp_path / 'cache'), session=session)
+    assert frankfurter.update_frankfurter(store, fetcher) == {'EUR/USD': 2, 'EUR/JPY': 1}
+    assert session.requests[0][0].endswith(f'/{frankfurter.HISTORY_START}..')
+    assert frankfurter.update_frankfurter(store, fetcher) == {'EUR/USD': 1}
+    # EUR/JPY отстает: диапазон начинается после его последней даты
+    assert session.requests[1][0].endswith('/2024-01-03..')
+    series = store.read_series(frankfurter.SOURCE_NAME, 'EUR/USD')
+    assert series[DATE_COLUMN].tolist() == dates_to_days(['2024-01-02', '2024-01-03', '2024-01-04']).tolist()
+    assert series['close'].tolist() == [1.09, 1.1, 1.2]
+
+
+def test_stable_key_keeps_one_entry_and_skips_foreign_validators(tmp_path):
+    session = FakeSession(FakeResponse(200, b'day1', {'ETag': '"1"'}), FakeResponse(200, b'day2', {'ETag': '"2"'}),
+                          FakeResponse(304))
+    fetcher = ConditionalFetcher(str(tmp_path), session=session)
+    fetcher.fetch('https://x/2024-01-02..', cache_key='range')
+    second = fetcher.fetch('https://x/2024-01-03..', cache_key='range')
+    assert second.content == b'day2'
+    # Валидаторы первого URL не отправляются для другого диапазона
+    assert session.requests[1][2] == {}
+    assert len(list(tmp_path.iterdir())) == 2
+    assert fetcher.fetch('https://x/2024-01-03..', cache_key='range').content == b'day2'
+    assert session.requests[2][2] == {'If-None-Match': '"2"'}
+
+
+def test_prune_removes_stale_entries(tmp_path):
+    session = FakeSession(FakeResponse(200, b'old'), FakeResponse(200, b'new'))
+    fetcher = ConditionalFetcher(str(tmp_path), session=session)
+    fetcher.fetch('https://x/old')
+    for path in tmp_path.iterdir():
+        os.utime(path, (0, 0))
+    fetcher.fetch('https://x/new')
+    assert fetcher.prune(max_age_days=1) == 2
+    assert fetcher.cached_meta('https://x/old') is None
+    assert fetcher.cached_meta('https://x/new')['size'] == 3
+
+
+def test_frankfurter_backfills_lagging_and_new_pairs(tmp_path):
+    store = PairStore(str(tmp_path / 'store'))
+    store.write_series(frankfurter.SOURCE_NAME, 'EUR/USD', {
+        DATE_COLUMN: dates_to_days(['2024-01-02', '2024-01-03']), 'close': np.array([1.09, 1.1])})
+    session = FakeSession(FakeResponse(200, frankfurter_payload({
+        '2024-01-03': {'USD': 9.9, 'JPY': 155.0}, '2024-01-04': {'USD': 1.2, 'JPY': 156.0}})))
+    fetcher = ConditionalFetcher(str(tmp_path / 'cache'), session=session)
+    assert frankfurter.update_frankfurter(store, fetcher, currencies=['USD', 'JPY']) == {
+        'EUR/USD': 1, 'EUR/JPY': 2}
+    # У EUR/JPY нет ряда - нужна вся история
+    assert session.requests[0][0].endswith(f'/{frankfurter.HISTORY_START}..')
+    assert store.read_series(frankfurter.SOURCE_NAME, 'EUR/USD')['close'].tolist() == [1.09, 1.1, 1.2]
+
+
+def test_stream_writes_body_to_cache_file(tmp_path):
+    session = FakeSession(FakeResponse(200, b'<xml/>', {'ETag': '"x"'}), FakeResponse(304))
+    fetcher = ConditionalFetcher(str(tmp_path), session=session)
+    result = fetcher.fetch('https://x/doc.xml', stream=True)
+    assert result.content is None and result.changed
+    with open(result.path, 'rb') as f:
+        assert f.read() == b'<xml/>'
+    assert fetcher.cached_meta('https://x/doc.xml')['size'] == 6
+    again = fetcher.fetch('https://x/doc.xml', stream=True)
+    assert (again.content, again.changed, again.path) == (None, False, result.path)
@@ -0,0 +1,94 @@
+import importlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from storage.intraday_store import TIME_COLUMN, IntradayStore, to_timestamps
+
+SOURCE, SYMBOL = 'twelve_data', 'EUR/USD'
+
+
+def utc_days_ago(days):
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+
+def bars(start, count, step=3600, value=1.0):
+    times = to_timestamps(start) + step * np.arange(count, dtype=np.int64)
+    return {TIME_COLUMN: times, 'close': np.full(count, value)}
+
+
+def test_write_bars_splits_months_and_overwrites(tmp_path):
+    store = IntradayStore(str(tmp_path))
+    assert store.write_bars('1h', SOURCE, SYMBOL, bars('2024-01-31T20:00:00', 8)) == 8
+    assert sorted(store.read_index('1h', SOURCE, SYMBOL)) == ['2024-01', '2024-02']
+    # Повтор с новыми значениями: строк не добавилось, значения заменены
+    assert store.write_bars('1h', SOURCE, SYMBOL, bars('2024-01-31T22:00:00', 3, value=2.0)) == 0
+    result = store.read_range('1h', SOURCE, SYMBOL)
+    assert result['close'].tolist() == [1, 1, 2, 2, 2, 1, 1, 1]
+    assert store.last_timestamp('1h', SOURCE, SYMBOL) == int(to_timestamps('2024-02-01T03:00:00'))
+
+    window = store.read_range('1h', SOURCE, SYMBOL, start=int(to_timestamps('2024-02-01T00:00:00')),
+                              end=int(to_timestamps('2024-02-01T01:00:00')))
+    assert window['close'].tolist() == [2, 1]
+    with pytest.raises(ValueError):
+        store.write_bars('1day', SOURCE, SYMBOL, bars('2024-01-01', 1))
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    # Загрузчик при импорте создает каталоги данных и логов в текущей директории
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('scripts.initial_load.historical_loader')
+    monkeypatch.setattr(module, 'INTERVAL', '1h')
+    return module
+
+
+class NoLimit:
+    def wait_if_needed(self):
+        pass
+
+
+def test_intraday_load_fails_when_every_chunk_fails(tmp_path, loader, monkeypatch):
+    store = IntradayStore(str(tmp_path / 'intraday'))
+    store.write_bars('1h', SOURCE, SYMBOL, bars(np.datetime64(utc_days_ago(400), 's'), 2))
+    monkeypatch.setattr(loader, 'fetch_historical_chunk', lambda *args: None)
+    assert loader.load_pair_intraday(SYMBOL, NoLimit(), store=store) is False
+
+
+def test_intraday_load_partial_success(tmp_path, loader, monkeypatch):
+    store = IntradayStore(str(tmp_path / 'intraday'))
+    calls = []
+
+    def fetch(symbol, start, end):
+        calls.append(start)
+        if len(calls) == 1:
+            return None
+        return bars(np.datetime64(start.replace(' ', 'T')), 3)
+
+    monkeypatch.setattr(loader, 'fetch_historical_chunk', fetch)
+    since = utc_days_ago(400).strftime('%Y-%m-%d')
+    assert loader.load_pair_intraday(SYMBOL, NoLimit(), store=store, since=since) is True
+    assert len(calls) > 1
+    assert len(store.read_range('1h', SOURCE, SYMBOL)[TIME_COLUMN]) == 3 * (len(calls) - 1)
+
+
+class JsonResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+@pytest.mark.parametrize('body', [b'{"meta": {"symbol": "EUR/USD"}, "values": []}',
+                                  b'{"status": "error", "message": "bad symbol"}',
+                                  b'{not json'])
+def test_json_instead_of_csv_is_a_failed_chunk(loader, monkeypatch, body):
+    monkeypatch.setattr(loader.requests, 'get', lambda *args, **kwargs: JsonResponse(body))
+    assert loader.fetch_historical_chunk(SYMBOL, '2024-01-01', '2024-01-31') is None
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+from analysis.absolute_rates import AbsoluteRates, load_absolute_rates, save_absolute_rates
+from analysis.numeraire import GEOMETRIC, NormalizationCache, _cache_file, basket_weights, normalize
+
+
+def test_geometric_normalization_sums_to_zero(rates_dir):
+    rates = load_absolute_rates(rates_dir)
+    normalized = normalize(rates.log_rates, rates.currencies, [GEOMETRIC])[0]
+    np.testing.assert_allclose(normalized.sum(axis=1), 0.0, atol=1e-12)
+
+
+def test_numeraire_fixes_currency_at_zero(rates_dir):
+    result = NormalizationCache(rates_dir).get(['numeraire:EUR'])['numeraire:EUR']
+    np.testing.assert_allclose(result.log_rates[:, 1], 0.0, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', ['../log_rates', '../../../escaped', 'numeraire:../x', 'unknown'])
+def test_unknown_names_rejected_before_any_write(rates_dir, name):
+    before = np.array(load_absolute_rates(rates_dir, mmap=False).log_rates)
+    with pytest.raises(ValueError):
+        NormalizationCache(rates_dir).get([name])
+    np.testing.assert_array_equal(load_absolute_rates(rates_dir, mmap=False).log_rates, before)
+    assert not os.path.exists(os.path.join(rates_dir, 'normalized'))
+
+
+def test_cache_file_is_a_plain_name():
+    assert _cache_file('numeraire:USD') == 'numeraire_USD.npy'
+    assert os.sep not in _cache_file('../../x') and '..' not in _cache_file('../../x')
+
+
+def test_basket_without_solution_currencies_rejected():
+    with pytest.raises(ValueError):
+        basket_weights('sdr', ['AAA', 'BBB'])
+
+
+def test_recompute_does_not_touch_mapped_cache(rates_dir):
+    cache = NormalizationCache(rates_dir)
+    old = cache.get(['numeraire:USD'])['numeraire:USD'].log_rates
+    before = np.array(old)
+    rates = load_absolute_rates(rates_dir, mmap=False)
+    save_absolute_rates(AbsoluteRates(rates.days, rates.currencies, rates.log_rates * 2), rates_dir)
+    new = NormalizationCache(rates_dir).get(['numeraire:USD'])['numeraire:USD'].log_rates
+    np.testing.assert_array_equal(old, before)
+    np.testing.assert_allclose(new, before * 2)
+    assert not [name for name in os.listdir(os.path.join(rates_dir, 'normalized')) if name.endswith('.tmp')]
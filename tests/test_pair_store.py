@@ -0,0 +1,124 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from storage.pair_store import (DATE_COLUMN, REVISIONS_FILE, PairStore, _npy_header, merge_sorted,
+                                sort_unique)
+
+SOURCE, SYMBOL = 'test', 'EUR/USD'
+T0 = datetime(2024, 1, 1, 12)
+
+
+def columns(days, close):
+    return {DATE_COLUMN: np.asarray(days, dtype=np.int32), 'close': np.asarray(close, dtype=np.float64)}
+
+
+@pytest.fixture(params=[False, True], ids=['npy', 'zd'])
+def store(tmp_path, request):
+    return PairStore(str(tmp_path), compressed=request.param)
+
+
+def test_sort_unique_keeps_last_duplicate():
+    result = sort_unique(columns([3, 1, 3, 2], [30, 10, 31, 20]))
+    assert result[DATE_COLUMN].tolist() == [1, 2, 3]
+    assert result['close'].tolist() == [10, 20, 31]
+
+
+def test_merge_sorted_interleaves_and_reports_revisions():
+    merged, revisions = merge_sorted(columns([1, 3, 5], [1, 3, 5]), columns([2, 3, 6], [2, 33, 6]), ['close'])
+    assert merged[DATE_COLUMN].tolist() == [1, 2, 3, 5, 6]
+    assert merged['close'].tolist() == [1, 2, 33, 5, 6]
+    assert revisions[['day', 'old', 'new']].tolist() == [(3, 3.0, 33.0)]
+
+
+def test_merge_sorted_nan_equal_to_nan():
+    _, revisions = merge_sorted(columns([1], [np.nan]), columns([1], [np.nan]), ['close'])
+    assert len(revisions) == 0
+
+
+def test_append_and_merge_round_trip(store):
+    store.write_series(SOURCE, SYMBOL, columns([1, 2, 3], [1, 2, 3]), T0)
+    store.append_series(SOURCE, SYMBOL, columns([4, 5], [4, 5]), T0)
+    store.merge_series(SOURCE, SYMBOL, columns([0, 2], [0, 22]), T0)
+    series = store.read_series(SOURCE, SYMBOL)
+    assert series[DATE_COLUMN].tolist() == [0, 1, 2, 3, 4, 5]
+    assert series['close'].tolist() == [0, 1, 22, 3, 4, 5]
+    assert store.read_meta(SOURCE, SYMBOL)['rows'] == 6
+    assert store.read_range(SOURCE, SYMBOL, 2, 4)['close'].tolist() == [22, 3, 4]
+
+
+def test_read_series_asof_rolls_back_later_changes(store):
+    store.write_series(SOURCE, SYMBOL, columns([1, 2], [1, 2]), T0)
+    store.merge_series(SOURCE, SYMBOL, columns([2, 3], [20, 3]), T0 + timedelta(days=1))
+    before = store.read_series_asof(SOURCE, SYMBOL, T0 + timedelta(hours=1))
+    assert before[DATE_COLUMN].tolist() == [1, 2]
+    assert before['close'].tolist() == [1, 2]
+    after = store.read_series_asof(SOURCE, SYMBOL, T0 + timedelta(days=2))
+    assert after['close'].tolist() == [1, 20, 3]
+
+
+def test_rewrite_keeps_bitemporal_history(store):
+    store.write_series(SOURCE, SYMBOL, columns([1, 2], [1, 2]), T0)
+    store.merge_series(SOURCE, SYMBOL, columns([2], [20]), T0 + timedelta(days=1))
+    revisions = store.read_revisions(SOURCE, SYMBOL)
+
+    # Повторный импорт тех же данных (build_store) не трогает журналы
+    store.write_series(SOURCE, SYMBOL, columns([1, 2], [1, 20]), T0 + timedelta(days=2))
+    np.testing.assert_array_equal(store.read_revisions(SOURCE, SYMBOL), revisions)
+    assert store.read_series_asof(SOURCE, SYMBOL, T0 + timedelta(hours=1))['close'].tolist() == [1, 2]
+
+    # Перезапись с изменениями дописывает ревизии и вставки
+    store.write_series(SOURCE, SYMBOL, columns([1, 2, 3], [10, 20, 3]), T0 + timedelta(days=3))
+    assert len(store.read_revisions(SOURCE, SYMBOL)) == len(revisions) + 1
+    as_of = store.read_series_asof(SOURCE, SYMBOL, T0 + timedelta(days=2, hours=1))
+    assert as_of[DATE_COLUMN].tolist() == [1, 2]
+    assert as_of['close'].tolist() == [1, 20]
+
+
+def test_mapped_reader_survives_rewrite(tmp_path):
+    store = PairStore(str(tmp_path))
+    store.write_series(SOURCE, SYMBOL, columns([1, 2, 3], [1, 2, 3]), T0)
+    mapped = store.read_series(SOURCE, SYMBOL)['close']
+    store.write_series(SOURCE, SYMBOL, columns([1], [7]), T0)
+    # Колонка заменена новым файлом: отображенный старый остается целым
+    assert mapped.tolist() == [1, 2, 3]
+    assert store.read_series(SOURCE, SYMBOL)['close'].tolist() == [7]
+    assert not [name for name in os.listdir(store.series_dir(SOURCE, SYMBOL)) if name.endswith('.tmp')]
+
+
+def test_interrupted_append_is_invisible_and_repaired(tmp_path):
+    store = PairStore(str(tmp_path))
+    store.write_series(SOURCE, SYMBOL, columns([1, 2, 3], [1, 2, 3]), T0)
+    path = store.series_dir(SOURCE, SYMBOL)
+    # Прерванное дописывание: данные за концом файла без заголовка и meta.json
+    with open(os.path.join(path, 'close.npy'), 'ab') as f:
+        f.write(np.array([99.0]).tobytes())
+    assert store.read_series(SOURCE, SYMBOL)['close'].tolist() == [1, 2, 3]
+    store.append_series(SOURCE, SYMBOL, columns([4], [4]), T0)
+    assert store.read_series(SOURCE, SYMBOL)['close'].tolist() == [1, 2, 3, 4]
+
+    # Прерванное после заголовка: файл длиннее meta['rows'], читатель его не видит
+    with open(os.path.join(path, DATE_COLUMN + '.npy'), 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        f.write(np.array([5], dtype=np.int32).tobytes())
+        f.seek(0)
+        f.write(_npy_header(np.dtype(np.int32), 5))
+    assert store.read_series(SOURCE, SYMBOL)[DATE_COLUMN].tolist() == [1, 2, 3, 4]
+    store.append_series(SOURCE, SYMBOL, columns([5], [5]), T0)
+    series = store.read_series(SOURCE, SYMBOL)
+    assert series[DATE_COLUMN].tolist() == [1, 2, 3, 4, 5]
+    assert series['close'].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_torn_log_record_is_dropped(tmp_path):
+    store = PairStore(str(tmp_path))
+    store.write_series(SOURCE, SYMBOL, columns([1, 2], [1, 2]), T0)
+    store.merge_series(SOURCE, SYMBOL, columns([1], [10]), T0)
+    with open(os.path.join(store.series_dir(SOURCE, SYMBOL), REVISIONS_FILE), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    assert len(store.read_revisions(SOURCE, SYMBOL)) == 1
+    store.merge_series(SOURCE, SYMBOL, columns([2], [20]), T0)
+    revisions = store.read_revisions(SOURCE, SYMBOL)
+    assert revisions[['day', 'old', 'new']].tolist() == [(1, 1.0, 10.0), (2, 2.0, 20.0)]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from service.panel_server import PanelClient, PanelPublisher, read_registry
+from storage.derived import derived_store, update_source_derived
+from storage.pair_store import DATE_COLUMN, PairStore
+
+SOURCE = 'test'
+
+
+@pytest.fixture
+def publisher(tmp_path, rates_dir):
+    store = PairStore(str(tmp_path / 'pairs'))
+    days = np.arange(19000, 19030, dtype=np.int32)
+    for k, symbol in enumerate(['EUR/USD', 'USD/JPY']):
+        store.write_series(SOURCE, symbol, {DATE_COLUMN: days, 'close': np.linspace(1.0, 2.0, 30) + k})
+    derived_root = str(tmp_path / 'derived')
+    update_source_derived(store, SOURCE, root=derived_root)
+    publisher = PanelPublisher(store, SOURCE, derived=derived_store(derived_root), rates_dir=rates_dir,
+                               registry_path=str(tmp_path / 'registry.json'), keep=1)
+    yield publisher
+    publisher.shutdown()
+
+
+def test_client_maps_published_arrays(publisher):
+    publisher.publish()
+    client = PanelClient(publisher.registry_path)
+    with client.lease() as generation:
+        panel = generation.panel('close')
+        assert panel.symbols == ['EUR/USD', 'USD/JPY']
+        assert panel.values[-1].tolist() == [2.0, 3.0]
+        assert generation.absolute().currencies == ['USD', 'EUR', 'JPY']
+        with pytest.raises(KeyError):
+            generation.panel('days')
+    assert not generation.in_use()
+    client.close()
+
+
+def test_leased_generation_survives_switch(publisher):
+    publisher.publish()
+    client = PanelClient(publisher.registry_path)
+    old = client.latest().acquire()
+    close = old.panel('close').values
+    publisher.publish()
+    new = client.latest()
+    assert new.generation == old.generation + 1
+    # Аренда держит старое поколение отображенным, имя сегмента уже удалено демоном
+    assert close[0].tolist() == [1.0, 2.0]
+    assert old.arrays
+    with pytest.raises(BufferError):
+        old.close()
+
+    old.release()
+    client.latest()
+    assert not old.arrays
+    client.close()
+    assert not new.arrays
+
+
+def test_lease_counting(publisher):
+    publisher.publish()
+    client = PanelClient(publisher.registry_path)
+    generation = client.latest()
+    with generation, generation:
+        assert generation.leases == 2
+    assert generation.leases == 0
+    with pytest.raises(ValueError):
+        generation.release()
+    client.close()
+    with pytest.raises(ValueError):
+        generation.acquire()
+
+
+def test_shutdown_removes_registry(publisher):
+    publisher.publish()
+    publisher.shutdown()
+    assert read_registry(publisher.registry_path) is None
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from analysis.absolute_rates import Observations, solve_absolute_rates, solve_day_block_robust
+from analysis.parallel_solve import load_shared_observations, share_observations, solve_sharded
+
+
+def random_observations(n_days, n_currencies, per_day, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 1, (n_days, n_currencies))
+    days = np.repeat(np.arange(n_days), per_day).astype(np.int32)
+    base = rng.integers(0, n_currencies, len(days)).astype(np.int32)
+    quote = ((base + rng.integers(1, n_currencies, len(days))) % n_currencies).astype(np.int32)
+    log_rate = x[days, base] - x[days, quote] + rng.normal(0, 1e-3, len(days))
+    order = rng.permutation(len(days))
+    return Observations(days[order], base[order], quote[order], log_rate[order], rng.random(len(days)) + 0.5)
+
+
+def test_shared_observations_are_sorted_by_day(tmp_path):
+    obs = random_observations(20, 4, 5)
+    share_observations(obs, str(tmp_path))
+    shared = load_shared_observations(str(tmp_path))
+    assert isinstance(shared.day_idx, np.memmap)
+    assert np.all(np.diff(shared.day_idx) >= 0)
+    assert len(shared.log_rate) == len(obs.log_rate)
+
+
+def day_slice(obs, start, end):
+    keep = (obs.day_idx >= start) & (obs.day_idx < end)
+    return Observations(*(field[keep] for field in obs))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('robust', [False, True])
+def test_sharded_solution_matches_single_process(tmp_path, workers, robust):
+    obs = random_observations(53, 5, 8)
+    if robust:
+        expected = np.vstack([solve_day_block_robust(day_slice(obs, start, start + 4), start, min(4, 53 - start), 5)
+                              for start in range(0, 53, 4)])
+    else:
+        expected = solve_absolute_rates(obs, 53, 5, chunk_days=4)
+    result = solve_sharded(obs, 53, 5, workers=workers, chunk_days=4, robust=robust, work_dir=str(tmp_path))
+    np.testing.assert_allclose(result, expected, atol=1e-10)
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from sources.probe_runner import ProbeRunner, ProviderLimits, RateLimiter, run_concurrently
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b'{"ok": true}'):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = content
+
+
+class FakeSession:
+    """Медленный сервер: считает запросы, ошибки и ответы задаются заранее."""
+
+    def __init__(self, status_code=200, fail=False):
+        self.status_code = status_code
+        self.fail = fail
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.05)
+        if self.fail:
+            raise requests.ConnectionError('down')
+        return FakeResponse(self.status_code)
+
+
+def runner(session):
+    probe = ProbeRunner('test', ProviderLimits(4, 60_000))
+    probe.session = session
+    return probe
+
+
+def test_concurrent_identical_requests_hit_server_once():
+    session = FakeSession()
+    probe = runner(session)
+    responses = probe.map(lambda _: probe.get('https://x/api', {'a': 1}), range(8))
+    assert session.calls == 1
+    assert all(r.json() == {'ok': True} for r in responses)
+    assert probe.stats == {'requests': 1, 'cache_hits': 7, 'errors': 0}
+
+
+def test_errors_and_non_200_are_not_cached():
+    session = FakeSession(status_code=429)
+    probe = runner(session)
+    assert probe.get('https://x/api').status_code == 429
+    assert probe.get('https://x/api').status_code == 429
+    assert session.calls == 2
+
+    probe = runner(FakeSession(fail=True))
+    with pytest.raises(requests.ConnectionError):
+        probe.get('https://x/api')
+    assert probe.stats['errors'] == 1 and not probe.in_flight
+
+
+def test_rate_limiter_spaces_slots():
+    limiter = RateLimiter(requests_per_minute=1200)
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    assert time.monotonic() - started >= 3 * 0.05 - 0.01
+
+
+def test_run_concurrently_isolates_failures():
+    def broken():
+        raise RuntimeError('boom')
+
+    results = run_concurrently({'good': lambda: {'pairs': 3}, 'bad': broken})
+    assert results['good']['pairs'] == 3 and 'elapsed_sec' in results['good']
+    assert results['bad'] == {'error': 'boom'}
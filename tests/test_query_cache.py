@@ -0,0 +1,50 @@
+import numpy as np
+
+from service.query_cache import ENTRY_OVERHEAD, QueryCache
+
+
+def series(n: int) -> np.ndarray:
+    return np.arange(n, dtype=np.float64)
+
+
+def test_lru_eviction_by_bytes():
+    cache = QueryCache(max_bytes=3 * (80 + ENTRY_OVERHEAD))
+    for key in 'abc':
+        assert cache.put(key, series(10), end_row=10)
+    cache.get('a')                       # 'b' становится самым старым
+    cache.put('d', series(10), end_row=10)
+    assert cache.get('b') is None and cache.get('a') is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_value_larger_than_budget_is_not_cached():
+    cache = QueryCache(max_bytes=100)
+    assert not cache.put('big', series(100), end_row=100)
+    assert len(cache) == 0
+
+
+def test_hit_miss_counters():
+    cache = QueryCache()
+    cache.get('x')
+    cache.put('x', series(3), end_row=3)
+    cache.get('x')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_invalidate_from_keeps_older_rows_and_bumps_epoch():
+    cache = QueryCache()
+    cache.put('old', series(5), end_row=5)
+    cache.put('tail', series(5), end_row=8)
+    epoch = cache.epoch
+    assert cache.invalidate_from(6) == 1
+    assert cache.get('old') is not None and cache.get('tail') is None
+    assert cache.epoch == epoch + 1
+
+
+def test_cached_values_are_read_only():
+    cache = QueryCache()
+    value = series(3)
+    cache.put('x', value, end_row=3)
+    assert not cache.get('x').flags.writeable
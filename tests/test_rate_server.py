@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from storage.pair_store import days_to_dates
+from service.rate_server import RateAPI, RateServer, RequestError
+
+
+@pytest.fixture
+def api(rates_dir):
+    return RateAPI.from_store(rates_dir)
+
+
+def http(api, raw: bytes) -> bytes:
+    """Отправляет сырой запрос серверу на свободном порту и читает ответ до закрытия соединения."""
+    async def exchange():
+        server = await RateServer(api).serve('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(raw)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+    return asyncio.run(exchange())
+
+
+def get(api, target: str) -> bytes:
+    return http(api, f'GET {target} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n'.encode())
+
+
+def body_json(response: bytes):
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def date(api, row: int) -> str:
+    return str(days_to_dates(api.days[row]))
+
+
+def test_cross_rate_as_of(api):
+    response = get(api, f'/cross?pairs=EUR/USD&date={date(api, -1)}')
+    assert response.startswith(b'HTTP/1.1 200')
+    log_rates = api.rates.log_rates
+    assert body_json(response)['values'][0][0] == pytest.approx(np.exp(log_rates[-1, 1] - log_rates[-1, 0]))
+
+
+def test_date_before_solution_is_404(api):
+    assert get(api, '/cross?pairs=EUR/USD&date=1990-01-01').startswith(b'HTTP/1.1 404')
+
+
+def test_range_is_streamed_as_ndjson(api):
+    response = get(api, '/absolute?currencies=USD,JPY')
+    head, body = response.split(b'\r\n\r\n', 1)
+    assert b'Transfer-Encoding: chunked' in head
+    assert body.endswith(b'0\r\n\r\n')
+    lines = [line for line in body.split(b'\r\n') if line.startswith(b'{')][0].splitlines()
+    assert len(lines) == len(api.days)
+
+
+def test_convert(api):
+    row = 2
+    payload = body_json(get(api, f'/convert?from=EUR&to=USD,JPY&amount=100&date={date(api, row)}'))
+    expected = 100 * np.exp(api.rates.log_rates[row, 1] - api.rates.log_rates[row, [0, 2]])
+    np.testing.assert_allclose(payload['amounts'], expected)
+
+
+def test_unknown_currency_is_404(api):
+    assert get(api, f'/absolute?currencies=XXX&date={date(api, 0)}').startswith(b'HTTP/1.1 404')
+
+
+def test_invalid_content_length_is_400(api):
+    response = http(api, b'GET /health HTTP/1.1\r\nContent-Length: abc\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 400')
+
+
+def test_error_in_first_stream_block_returns_500(api, monkeypatch):
+    def broken(*args):
+        raise RuntimeError('boom')
+        yield
+    monkeypatch.setattr(RateAPI, '_stream', broken)
+    response = get(api, '/cross?pairs=EUR/USD&start=1990-01-01')
+    assert response.startswith(b'HTTP/1.1 500')
+    assert 'boom' in body_json(response)['error']
+
+
+def test_error_mid_stream_closes_connection(api, monkeypatch):
+    def broken(*args):
+        yield b'{"date": "2022-01-01"}\n'
+        raise RuntimeError('boom')
+    monkeypatch.setattr(RateAPI, '_stream', broken)
+    response = http(api, b'GET /cross?pairs=EUR/USD&start=1990-01-01 HTTP/1.1\r\n\r\n')   # keep-alive
+    assert response.startswith(b'HTTP/1.1 200')
+    assert not response.endswith(b'0\r\n\r\n')      # без завершающего блока клиент видит обрыв
+
+
+def test_handle_rejects_bad_pairs(api):
+    with pytest.raises(RequestError):
+        api.handle('/cross', {'pairs': ['EURUSD'], 'date': [date(api, 0)]})
+
+
+def append_days(rates_dir, count: int, shift: float = 0.0):
+    """Дописывает count дат в решение (и сдвигает старые на shift с середины)."""
+    import time
+    from analysis.absolute_rates import AbsoluteRates, load_absolute_rates, save_absolute_rates
+    rates = load_absolute_rates(rates_dir, mmap=False)
+    days = np.r_[rates.days, rates.days[-1] + 1 + np.arange(count)].astype(np.int32)
+    log_rates = np.r_[rates.log_rates, np.repeat(rates.log_rates[-1:], count, axis=0)]
+    log_rates[len(log_rates) // 2:] += shift
+    time.sleep(0.01)      # другое updated_at
+    save_absolute_rates(AbsoluteRates(days, rates.currencies, log_rates), rates_dir)
+
+
+def test_unknown_normalization_is_400_without_disk_access(api, rates_dir):
+    import os
+    response = get(api, f'/absolute?currencies=USD&date={date(api, 0)}&normalization=../log_rates')
+    assert response.startswith(b'HTTP/1.1 400')
+    assert not os.path.exists(os.path.join(rates_dir, 'normalized'))
+
+
+def test_refresh_on_append_keeps_cached_history(api, rates_dir):
+    b''.join(api.handle('/cross', {'pairs': ['EUR/USD'], 'end': [date(api, 4)]}))
+    append_days(rates_dir, 3)
+    assert api.refresh()
+    assert len(api.days) == 13
+    assert api.cache.stats()['invalidations'] == 0
+    b''.join(api.handle('/cross', {'pairs': ['EUR/USD'], 'end': [date(api, 4)]}))
+    assert api.cache.stats()['hits'] == 1
+
+
+def test_refresh_drops_series_touching_changed_rows(api, rates_dir):
+    b''.join(api.handle('/cross', {'pairs': ['EUR/USD']}))
+    append_days(rates_dir, 1, shift=0.5)
+    assert api.refresh()
+    assert len(api.cache) == 0
+
+
+def test_stream_keeps_its_solution_across_refresh(api, rates_dir, monkeypatch):
+    import service.rate_server as rate_server
+    monkeypatch.setattr(rate_server, 'STREAM_ROWS', 2)
+    chunks = api.handle('/absolute', {'currencies': ['USD']})
+    first = next(chunks)
+    append_days(rates_dir, 5)
+    api.refresh()
+    lines = (first + b''.join(chunks)).splitlines()
+    assert len(lines) == 10                          # строки старого решения, без новых дат
+    assert len(api.days) == 15
+
+
+def test_refresh_precomputes_configured_normalizations(api, rates_dir, monkeypatch):
+    api.normalizations = ['geometric', 'numeraire:EUR']
+    append_days(rates_dir, 2)
+    assert api.refresh()
+
+    def blocked(*args):
+        raise AssertionError('normalization computed inside the request')
+
+    monkeypatch.setattr(api, 'load_normalizations', blocked)
+    response = get(api, f'/absolute?currencies=EUR&date={date(api, -1)}&normalization=numeraire:EUR')
+    assert response.startswith(b'HTTP/1.1 200')
+    assert body_json(response)['values'] == [[1.0]]
+
+
+def test_request_normalization_is_computed_off_the_event_loop(api, monkeypatch):
+    import threading
+    threads = []
+    compute = api.load_normalizations
+
+    def recording(rates, names):
+        threads.append(threading.current_thread())
+        return compute(rates, names)
+
+    monkeypatch.setattr(api, 'load_normalizations', recording)
+    response = get(api, f'/absolute?currencies=USD&date={date(api, 0)}&normalization=geometric')
+    assert response.startswith(b'HTTP/1.1 200')
+    assert threads and threading.main_thread() not in threads
+    get(api, f'/absolute?currencies=USD&date={date(api, 1)}&normalization=geometric')
+    assert len(threads) == 1
@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+
+from analysis.pair_universe import PairUniverse
+from analysis.reciprocal import (BEST_SOURCE, best_series, build_index, consistency_report, load_index,
+                                 publish_best_series, reciprocal_deviation, save_index)
+from storage import snapshots
+from storage.pair_store import DATE_COLUMN, PairStore
+
+UNIVERSE = PairUniverse(['NZD/AUD', 'EUR/USD', 'AUD/NZD'])
+
+
+def test_index_uses_alphabetical_orientation():
+    index = build_index(UNIVERSE)
+    assert index.canonical == ['AUD/NZD'] and index.mirror == ['NZD/AUD']
+    assert index.lookup('NZD/AUD') == (0, False)
+    assert index.lookup('EUR/USD') is None
+
+
+def test_load_index_rebuilds_stale_file(tmp_path):
+    path = str(tmp_path / 'index.json')
+    assert load_index(UNIVERSE, path).canonical == ['AUD/NZD']
+    reordered = PairUniverse(['AUD/NZD', 'NZD/AUD'])
+    index = load_index(reordered, path)
+    assert index.canonical_idx.tolist() == [0] and index.mirror_idx.tolist() == [1]
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['canonical_idx'] == [0]
+
+
+def test_best_series_prefers_cleaner_side(tmp_path):
+    index = build_index(UNIVERSE)
+    # Столбцы в порядке UNIVERSE.symbols: NZD/AUD, EUR/USD, AUD/NZD
+    close = np.array([[0.9, 1.1, 1.0 / 0.9],
+                      [0.8, 1.1, 1.3],
+                      [np.nan, 1.1, 1.2],
+                      [0.5, 1.1, np.nan],
+                      [np.nan, 1.1, -1.0]])
+    flags = np.zeros(close.shape, dtype=np.uint8)
+    flags[1, 2] = 0b11
+    flags[1, 0] = 0b1
+    deviation = reciprocal_deviation(close, index)
+    np.testing.assert_allclose(deviation[0], 0.0, atol=1e-12)
+    assert np.isnan(deviation[2:, 0]).all()
+
+    merged, side = best_series(close, flags, index)
+    assert side[:, 0].tolist() == [0, 1, 0, 1, -1]
+    np.testing.assert_allclose(merged[:4, 0], [1.0 / 0.9, 1.25, 1.2, 2.0])
+    assert np.isnan(merged[4, 0])
+
+    report = consistency_report(deviation, side, index)
+    assert report.loc[0, 'days_both_sides'] == 2
+    assert report.loc[0, 'days_inconsistent'] == 1
+    assert report.loc[0, 'days_from_mirror'] == 2
+
+    store = PairStore(str(tmp_path))
+    days = np.arange(19000, 19005, dtype=np.int32)
+    assert publish_best_series(store, days, merged, side, index) == 1
+    series = store.read_series(BEST_SOURCE, 'AUD/NZD')
+    assert series[DATE_COLUMN].tolist() == days[:4].tolist()
+    assert series['side'].tolist() == [0, 1, 0, 1]
+
+
+def test_index_is_replaced_atomically_and_truncated_file_rebuilt(tmp_path, monkeypatch):
+    path = tmp_path / 'index.json'
+    save_index(build_index(UNIVERSE), str(path))
+    saved = path.read_text(encoding='utf-8')
+
+    def broken(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(snapshots.json, 'dump', broken)
+    with pytest.raises(OSError):
+        save_index(build_index(UNIVERSE), str(path))
+    monkeypatch.undo()
+    assert path.read_text(encoding='utf-8') == saved
+    assert [p.name for p in tmp_path.iterdir()] == ['index.json']
+
+    path.write_text(saved[:len(saved) // 2], encoding='utf-8')
+    assert load_index(UNIVERSE, str(path)).canonical == ['AUD/NZD']
+    assert json.loads(path.read_text(encoding='utf-8'))['mirror'] == ['NZD/AUD']
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from analysis.pair_universe import PairUniverse
+from analysis.reconciliation import PRIMARY_SOURCE, eur_rate_matrix, implied_cross_rates, reconcile
+from storage.pair_store import DATE_COLUMN, PairStore
+
+DAYS = np.arange(19000, 19005, dtype=np.int32)
+EUR_USD = np.array([1.10, 1.11, 1.12, 1.13, 1.14])
+EUR_JPY = np.array([160.0, 161.0, 162.0, 163.0, 164.0])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PairStore(str(tmp_path))
+    store.write_series('ecb', 'EUR/USD', {DATE_COLUMN: DAYS, 'close': EUR_USD})
+    store.write_series('ecb', 'EUR/JPY', {DATE_COLUMN: DAYS[1:], 'close': EUR_JPY[1:]})
+    usd_jpy = EUR_JPY / EUR_USD
+    usd_jpy[3] *= 1.05
+    store.write_series(PRIMARY_SOURCE, 'USD/JPY', {DATE_COLUMN: DAYS, 'close': usd_jpy})
+    store.write_series(PRIMARY_SOURCE, 'EUR/USD', {DATE_COLUMN: DAYS, 'close': EUR_USD})
+    return store
+
+
+def test_implied_cross_rates(store):
+    universe = PairUniverse(['EUR/USD', 'USD/JPY'])
+    rates = eur_rate_matrix(store, 'ecb', universe, DAYS)
+    assert rates[:, universe.currency_index['EUR']].tolist() == [1.0] * 5
+    implied = implied_cross_rates(rates, universe)
+    np.testing.assert_allclose(implied[:, 0], EUR_USD)
+    assert np.isnan(implied[0, 1])
+    np.testing.assert_allclose(implied[1:, 1], EUR_JPY[1:] / EUR_USD[1:])
+
+
+def test_reconcile_flags_only_deviating_days(store):
+    universe = PairUniverse(['EUR/USD', 'USD/JPY'])
+    discrepancies, summary = reconcile(store, universe, sources=['ecb', 'frankfurter'])
+    assert discrepancies['symbol'].tolist() == ['USD/JPY']
+    assert discrepancies['source'].tolist() == ['ecb']
+    np.testing.assert_allclose(discrepancies['log_deviation'], np.log(1.05))
+    summary = summary.set_index('symbol')
+    assert summary.loc['USD/JPY', 'days_compared'] == 4
+    assert summary.loc['USD/JPY', 'days_flagged'] == 1
+    assert summary.loc['EUR/USD', 'days_flagged'] == 0
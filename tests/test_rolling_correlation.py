@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.absolute_rates import AbsoluteRates, save_absolute_rates
+from analysis.rolling_correlation import load_correlations, log_returns, rolling_correlations
+
+CURRENCIES = ['USD', 'EUR', 'JPY', 'GBP']
+WINDOW, MIN_PERIODS = 10, 6
+
+
+@pytest.fixture
+def rates(tmp_path):
+    rng = np.random.default_rng(0)
+    log_rates = np.cumsum(rng.normal(0, 0.01, (60, len(CURRENCIES))), axis=0)
+    log_rates[rng.random(log_rates.shape) < 0.1] = np.nan
+    log_rates[:25, 3] = np.nan
+    rates = AbsoluteRates(np.arange(19000, 19060, dtype=np.int32), CURRENCIES, log_rates)
+    save_absolute_rates(rates, str(tmp_path / 'absolute'))
+    return rates
+
+
+def expected_correlations(log_rates):
+    returns = pd.DataFrame(log_returns(log_rates))
+    expected = np.full((len(returns), returns.shape[1], returns.shape[1]), np.nan)
+    for i in returns:
+        for j in returns:
+            rolling = returns[i].rolling(WINDOW, min_periods=MIN_PERIODS)
+            expected[:, i, j] = rolling.corr(returns[j])
+    return expected
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_matches_pandas_pairwise_rolling_corr(tmp_path, rates, workers):
+    output_dir = str(tmp_path / f'corr{workers}')
+    rolling_correlations(str(tmp_path / 'absolute'), output_dir, window=WINDOW, min_periods=MIN_PERIODS,
+                         block_days=7, workers=workers)
+    days, currencies, tensor = load_correlations(WINDOW, output_dir)
+    assert currencies == CURRENCIES
+    assert days.tolist() == rates.days.tolist()
+    expected = expected_correlations(rates.log_rates)
+    assert np.array_equal(np.isnan(tensor), np.isnan(expected))
+    np.testing.assert_allclose(tensor, expected, atol=1e-5, equal_nan=True)
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from storage.snapshots import SnapshotReader, SnapshotWriter, atomic_write
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_text(text):
+    return lambda f: f.write(text)
+
+
+def publish(writer, name, text):
+    writer.put(name, write_text(text), encoding='utf-8')
+    return writer.publish()
+
+
+def read(snapshot, name):
+    with open(snapshot.path(name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    atomic_write(path, write_text('old'), encoding='utf-8')
+
+    def failing(f):
+        f.write('partial')
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, failing, encoding='utf-8')
+    assert open(path, encoding='utf-8').read() == 'old'
+    assert os.listdir(tmp_path) == ['a.txt']
+
+
+def test_pinned_snapshot_is_isolated_from_new_versions(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    publish(writer, 'EURUSD.csv', 'v1')
+    snapshot = SnapshotReader(str(tmp_path)).pin()
+    publish(writer, 'EURUSD.csv', 'v2')
+    assert read(snapshot, 'EURUSD.csv') == 'v1'
+    assert open(tmp_path / 'EURUSD.csv', encoding='utf-8').read() == 'v2'
+
+
+def test_publish_accumulates_files(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    publish(writer, 'EURUSD.csv', 'a')
+    publish(writer, 'USDJPY.csv', 'b')
+    assert SnapshotReader(str(tmp_path)).pin().names() == ['EURUSD.csv', 'USDJPY.csv']
+
+
+def test_prune_keeps_leased_snapshot_across_many_publishes(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    publish(writer, 'EURUSD.csv', 'v0')
+    with SnapshotReader(str(tmp_path)).pin(lease=True) as snapshot:
+        for i in range(1, 30):
+            publish(writer, 'EURUSD.csv', f'v{i}')
+            writer.prune(keep=2, grace_seconds=0)
+        assert read(snapshot, 'EURUSD.csv') == 'v0'
+        assert snapshot.version in writer.versions()
+    writer.prune(keep=2, grace_seconds=0)
+    assert len(writer.versions()) == 2
+    assert not os.path.exists(snapshot.path('EURUSD.csv'))
+
+
+def test_prune_respects_grace_period(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    for i in range(5):
+        publish(writer, 'EURUSD.csv', f'v{i}')
+    assert writer.prune(keep=1) == 0
+    assert len(writer.versions()) == 5
+
+
+def test_lease_of_dead_process_is_dropped(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    publish(writer, 'EURUSD.csv', 'v0')
+    code = ('import sys; sys.path.insert(0, sys.argv[2]); from storage.snapshots import SnapshotReader; '
+            'SnapshotReader(sys.argv[1]).pin(lease=True)')
+    subprocess.run([sys.executable, '-c', code, str(tmp_path), ROOT], check=True)
+    for i in range(1, 4):
+        publish(writer, 'EURUSD.csv', f'v{i}')
+    writer.prune(keep=1, grace_seconds=0)
+    assert writer.versions() == [4]
+
+
+def test_adopt_existing_files(tmp_path):
+    (tmp_path / 'EURUSD.csv').write_text('old', encoding='utf-8')
+    writer = SnapshotWriter(str(tmp_path))
+    assert writer.adopt(['EURUSD.csv']) == 1
+    assert read(SnapshotReader(str(tmp_path)).pin(), 'EURUSD.csv') == 'old'
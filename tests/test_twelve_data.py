@@ -0,0 +1,51 @@
+import numpy as np
+
+from sources.twelve_data import concat_columns, csv_name_to_symbol, import_pairs_csv, parse_time_series_csv
+from storage.intraday_store import TIME_COLUMN, to_timestamps
+from storage.pair_store import DATE_COLUMN, PairStore, dates_to_days
+
+DAILY = b'''datetime;open;high;low;close
+2024-01-03;1.1;1.2;1.0;1.15
+not-a-date;1;1;1;1
+2024-01-02;1.0;1.1;0.9;1.05
+'''
+
+INTRADAY = b'''datetime;open;high;low;close
+2024-01-02 10:00:00;1;1;1;1.2
+2024-01-02 09:00:00;1;1;1;1.1
+'''
+
+
+def test_daily_csv_is_sorted_and_typed():
+    columns = parse_time_series_csv(DAILY)
+    assert columns[DATE_COLUMN].dtype == np.int32
+    assert columns[DATE_COLUMN].tolist() == dates_to_days(['2024-01-02', '2024-01-03']).tolist()
+    assert columns['close'].tolist() == [1.05, 1.15]
+    assert columns['low'].tolist() == [0.9, 1.0]
+
+
+def test_intraday_csv_uses_timestamps():
+    columns = parse_time_series_csv(INTRADAY, intraday=True)
+    assert DATE_COLUMN not in columns
+    assert columns[TIME_COLUMN].tolist() == to_timestamps(['2024-01-02T09:00:00', '2024-01-02T10:00:00']).tolist()
+    assert columns['close'].tolist() == [1.1, 1.2]
+
+
+def test_empty_responses_and_concat():
+    empty = parse_time_series_csv(b'  \n', intraday=True)
+    assert len(empty[TIME_COLUMN]) == 0 and empty[TIME_COLUMN].dtype == np.int64
+    joined = concat_columns([parse_time_series_csv(DAILY), parse_time_series_csv(b'')])
+    assert len(joined[DATE_COLUMN]) == 2
+    assert concat_columns([])[DATE_COLUMN].dtype == np.int32
+
+
+def test_import_pairs_csv(tmp_path):
+    pairs = tmp_path / 'pairs'
+    pairs.mkdir()
+    (pairs / 'EURUSD.csv').write_text('datetime,open,high,low,close\n2024-01-02,1,1.1,0.9,1.05\n')
+    (pairs / 'notes.txt').write_text('')
+    store = PairStore(str(tmp_path / 'store'))
+    assert csv_name_to_symbol('data/EURUSD.csv') == 'EUR/USD'
+    assert import_pairs_csv(store, str(pairs)) == {'EUR/USD': 1}
+    assert import_pairs_csv(store, str(pairs), symbols=['USD/JPY']) == {}
+    assert store.read_series('twelve_data', 'EUR/USD')['close'].tolist() == [1.05]